@@ -45,7 +45,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.RequestTimingMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,8 +90,42 @@ DATABASES = {
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'), 
+        # Keep connections open between requests for this many seconds;
+        # core.db checks they still work before a request reuses them
+        # after DB_HEALTH_CHECK_IDLE_SECONDS without use
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+DB_HEALTH_CHECK_IDLE_SECONDS = float(
+    os.environ.get('DB_HEALTH_CHECK_IDLE_SECONDS', 10)
+)
+
+# Replicas of the default database, one per host in DB_REPLICA_HOSTS. Safe
+# requests to the views of REPLICA_VIEW_APPS read from a healthy replica
+# (checked every REPLICA_CHECK_SECONDS), except for clients that sent any
+# other request in the last REPLICA_STICKY_SECONDS, who read from default.
+# Those pins are kept in REPLICA_STICKY_CACHE_ALIAS, which must name a cache
+# all worker processes share (e.g. memcached, added to CACHES); the API
+# refuses to start otherwise. Replicas are probed from within requests, so connecting to one gives up
+# after REPLICA_CONNECT_TIMEOUT seconds rather than the TCP timeout
+DATABASE_REPLICAS = []
+REPLICA_CONNECT_TIMEOUT = int(os.environ.get('REPLICA_CONNECT_TIMEOUT', 2))
+for index, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = dict(
+        DATABASES['default'], HOST=host.strip(), TEST={'MIRROR': 'default'},
+        OPTIONS={'connect_timeout': REPLICA_CONNECT_TIMEOUT}
+    )
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_VIEW_APPS = ('movie', 'user')
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+REPLICA_STICKY_CACHE_ALIAS = os.environ.get(
+    'REPLICA_STICKY_CACHE_ALIAS', 'default'
+)
+REPLICA_CHECK_SECONDS = float(os.environ.get('REPLICA_CHECK_SECONDS', 5))
 
 
 # Password validation
@@ -131,4 +170,129 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = 'vol/web/static'
 
-AUTH_USER_MODEL = 'core.User'
\ No newline at end of file
+# Uploads are streamed to a temporary file and hashed chunk by chunk, then
+# moved into place, so they keep the permissions set here
+FILE_UPLOAD_HANDLERS = ['core.files.HashingUploadHandler']
+FILE_UPLOAD_PERMISSIONS = 0o644
+
+AUTH_USER_MODEL = 'core.User'
+
+# API responses are compact JSON; the browsable API is only served in DEBUG
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': ['core.renderers.CompactJSONRenderer'] + (
+        ['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []
+    ),
+}
+
+
+# API pagination: default page size and the upper bound a client can
+# request with ?page_size=
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+
+# Responses of at least API_COMPRESSION_MIN_SIZE bytes are compressed with
+# the first of API_COMPRESSION_ENCODINGS the client accepts, when their media
+# type is one of API_COMPRESSION_TYPES. HTML pages (admin, browsable API) are
+# left alone: they carry CSRF tokens, which compression exposes to BREACH
+API_COMPRESSION_MIN_SIZE = int(os.environ.get('API_COMPRESSION_MIN_SIZE', 1024))
+API_COMPRESSION_LEVEL = int(os.environ.get('API_COMPRESSION_LEVEL', 6))
+API_COMPRESSION_ENCODINGS = ['gzip', 'deflate']
+API_COMPRESSION_TYPES = ('application/json', 'application/x-ndjson', 'text/csv')
+
+# Responses carry a Server-Timing header with query count, database,
+# serialize and render time when REQUEST_TIMING is set; requests taking at
+# least SLOW_REQUEST_MS are logged with their SQL to core.slow_requests
+REQUEST_TIMING = os.environ.get('REQUEST_TIMING', '1') == '1'
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+SLOW_REQUEST_MAX_QUERIES = int(os.environ.get('SLOW_REQUEST_MAX_QUERIES', 100))
+
+# Requests sent with an X-Profile header matching PROFILE_REQUEST_SECRET, and
+# a PROFILE_SAMPLE_RATE fraction of all requests, are profiled with cProfile
+# into PROFILE_DIR, which keeps the newest PROFILE_MAX_FILES profiles
+PROFILE_REQUEST_SECRET = os.environ.get('PROFILE_REQUEST_SECRET', '')
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', '/vol/web/profiles')
+PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', 100))
+
+# Request counts, latency histograms, query counts and cache hit rates are
+# served at /metrics/ in the Prometheus text format to scrapers sending
+# METRICS_TOKEN as a bearer token; without one it is only served when DEBUG
+# is on. Worker processes sharing METRICS_DIR are summed; they save their
+# counters there at most every METRICS_FLUSH_SECONDS. Empty METRICS_DIR on
+# deploy, as snapshots of exited workers are kept.
+METRICS_ENABLED = os.environ.get('METRICS', '1') == '1'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+# Silences core.slow_requests while the tests run
+TEST_RUNNER = 'core.tests.runner.TestRunner'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.slow_requests': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# Admin changelists of unfiltered tables estimated at ADMIN_ESTIMATED_COUNT_MIN
+# rows or more show the planner's row estimate instead of running COUNT(*)
+ADMIN_ESTIMATED_COUNT_MIN = int(
+    os.environ.get('ADMIN_ESTIMATED_COUNT_MIN', 100000)
+)
+
+# Token authentication cache: users are kept for AUTH_TOKEN_CACHE_TTL seconds
+# (0 disables it) in the Django cache named by AUTH_TOKEN_CACHE_ALIAS, else in
+# the default cache when all processes share it, else in a per-process LRU of
+# AUTH_TOKEN_CACHE_SIZE entries. Other processes do not see the LRU's
+# invalidations, so they accept a revoked token for up to the TTL
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 60))
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_ALIAS = os.environ.get('AUTH_TOKEN_CACHE_ALIAS')
+
+# Serialized movie and tag list pages are cached per user for
+# MOVIE_LIST_CACHE_TTL seconds (0, the default, disables it) in the cache
+# named by MOVIE_LIST_CACHE_ALIAS, which must be shared by every worker
+# process (e.g. memcached, added to CACHES)
+MOVIE_LIST_CACHE_TTL = int(os.environ.get('MOVIE_LIST_CACHE_TTL', 0))
+MOVIE_LIST_CACHE_ALIAS = os.environ.get('MOVIE_LIST_CACHE_ALIAS', 'default')
+
+# Bulk movie endpoint: largest accepted list and rows per INSERT/UPDATE
+MOVIE_BULK_MAX_ITEMS = int(os.environ.get('MOVIE_BULK_MAX_ITEMS', 10000))
+MOVIE_BULK_BATCH_SIZE = int(os.environ.get('MOVIE_BULK_BATCH_SIZE', 1000))
+
+# Incremental sync: changes sent per page, seconds a change must be old
+# before tokens move past it (longer than any transaction and replica lag),
+# and days tombstones are kept by compact_changes, after which older tokens
+# are refused
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 500))
+SYNC_SETTLE_SECONDS = int(os.environ.get('SYNC_SETTLE_SECONDS', 5))
+SYNC_TOMBSTONE_DAYS = int(os.environ.get('SYNC_TOMBSTONE_DAYS', 30))
+
+# Movies read from the database per chunk while streaming an export
+MOVIE_EXPORT_CHUNK_SIZE = int(os.environ.get('MOVIE_EXPORT_CHUNK_SIZE', 2000))
+
+# Movie imports: rows validated and written per transaction, and the number
+# of invalid rows listed in the import report
+MOVIE_IMPORT_BATCH_SIZE = int(os.environ.get('MOVIE_IMPORT_BATCH_SIZE', 1000))
+MOVIE_IMPORT_MAX_ERRORS = int(os.environ.get('MOVIE_IMPORT_MAX_ERRORS', 1000))
+
+# Resized copies of uploaded movie images as name: (width in pixels, Pillow
+# format). They are generated after the upload by MOVIE_IMAGE_WORKERS
+# background threads, or inline when it is 0
+MOVIE_IMAGE_VARIANTS = {
+    'thumbnail': (160, 'JPEG'),
+    'medium': (480, 'JPEG'),
+}
+MOVIE_IMAGE_WORKERS = int(os.environ.get('MOVIE_IMAGE_WORKERS', 2))
@@ -18,8 +18,12 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core import views as core_views
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('ready/', core_views.ready, name='ready'),
+    path('metrics/', core_views.metrics, name='metrics'),
     path('api/user/', include('user.urls')),
     path('api/movie/', include('movie.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,10 +1,85 @@
+from itertools import islice
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 # from django.utils.translation import gettext as _
 from core import models
+from core.authentication import invalidate_user_tokens
+from movie.cache import invalidate_user
+
+
+def estimated_count(queryset):
+    """Return the planner's row estimate of an unfiltered queryset
+
+    None is returned when the queryset is filtered or the database keeps
+    no estimate, and the rows have to be counted.
+    """
+    connection = connections[queryset.db]
+    if queryset.query.where or connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(queryset.model._meta.db_table)]
+        )
+        row = cursor.fetchone()
+
+    return int(row[0]) if row and row[0] > 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator using the row estimate of large unfiltered tables
+
+    Tables estimated at ADMIN_ESTIMATED_COUNT_MIN rows or more are not
+    counted with COUNT(*), which reads the whole table.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and \
+                estimate >= settings.ADMIN_ESTIMATED_COUNT_MIN:
+            return estimate
+
+        return super().count
+
+
+class LargeTableMixin:
+    """ModelAdmin mixin for tables too large to count on every page"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
-class UserAdmin(BaseUserAdmin):
+def movies_changed(queryset, batch_size=1000):
+    """Log changed movies and drop their owners' cached lists
+
+    Bulk updates send no signals, so the actions call this themselves.
+    The selection is read batch_size rows at a time, so selecting every
+    movie does not load the whole table.
+    """
+    rows = queryset.values_list('id', 'user_id') \
+        .iterator(chunk_size=batch_size)
+    user_ids = set()
+    while True:
+        movies = [
+            models.Movie(pk=movie_id, user_id=user_id)
+            for movie_id, user_id in islice(rows, batch_size)
+        ]
+        if not movies:
+            break
+        models.Change.objects.record(models.Change.MOVIE, movies)
+        user_ids.update(movie.user_id for movie in movies)
+
+    for user_id in user_ids:
+        invalidate_user(user_id)
+
+
+class UserAdmin(LargeTableMixin, BaseUserAdmin):
     ordering = ['id']
     list_display = ['email', 'name']
     fieldsets = (
@@ -22,8 +97,52 @@ class UserAdmin(BaseUserAdmin):
             'fields': ('email', 'password1', 'password2')
         }),
     )
+    search_fields = ('email',)
+    actions = ('activate_users', 'deactivate_users')
+
+    def set_active(self, queryset, active):
+        user_ids = list(queryset.values_list('id', flat=True))
+        queryset.update(is_active=active)
+        # update() sends no post_save, so drop the cached tokens here
+        for user_id in user_ids:
+            invalidate_user_tokens(user_id)
+
+    def activate_users(self, request, queryset):
+        self.set_active(queryset, True)
+    activate_users.short_description = 'Activate selected users'
+
+    def deactivate_users(self, request, queryset):
+        self.set_active(queryset, False)
+    deactivate_users.short_description = 'Deactivate selected users'
+
+
+class TagAdmin(LargeTableMixin, admin.ModelAdmin):
+    list_display = ('name', 'user')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    search_fields = ('name',)
+
+
+class MovieAdmin(LargeTableMixin, admin.ModelAdmin):
+    list_display = ('title', 'user', 'time_minutes', 'ticket_price_USD')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('tags',)
+    actions = ('clear_tags', 'remove_images')
+
+    def clear_tags(self, request, queryset):
+        models.Movie.tags.through.objects \
+            .filter(movie_id__in=queryset.values('id')).delete()
+        movies_changed(queryset)
+    clear_tags.short_description = 'Remove all tags from selected movies'
+
+    def remove_images(self, request, queryset):
+        # The files are left to clean_media, which skips shared images
+        queryset.update(image=None, image_variants='')
+        movies_changed(queryset)
+    remove_images.short_description = 'Remove images of selected movies'
 
 
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Movie)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Movie, MovieAdmin)
@@ -0,0 +1,190 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+
+from core.caches import is_shared
+from core.metrics import record_cache
+
+
+class LocalTokenCache:
+    """Per-process LRU of token key -> user with a time to live"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return a copy of the cached user for key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, expires = entry
+            if expires <= time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+
+        return copy.copy(user)
+
+    def set(self, key, user):
+        """Cache the user for key, evicting the least recently used"""
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (
+                copy.copy(user), time.monotonic() + self.ttl
+            )
+            self._user_keys.setdefault(user.pk, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def delete_user(self, user_id):
+        """Drop every cached token of a user"""
+        with self._lock:
+            for key in list(self._user_keys.get(user_id, ())):
+                self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[0].pk
+        keys = self._user_keys.get(user_id)
+        keys.discard(key)
+        if not keys:
+            del self._user_keys[user_id]
+
+
+class SharedTokenCache:
+    """Token key -> user cache stored in a Django cache backend
+
+    Unlike the local cache, invalidations are seen by every process that
+    shares the backend.
+    """
+    prefix = 'auth-token'
+
+    def __init__(self, alias, ttl):
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def get(self, key):
+        return self.cache.get(f'{self.prefix}:{key}')
+
+    def set(self, key, user):
+        self.cache.set_many({
+            f'{self.prefix}:{key}': user,
+            f'{self.prefix}-user:{user.pk}': key,
+        }, self.ttl)
+
+    def delete(self, key):
+        self.cache.delete(f'{self.prefix}:{key}')
+
+    def delete_user(self, user_id):
+        key = self.cache.get(f'{self.prefix}-user:{user_id}')
+        if key is not None:
+            self.cache.delete_many([
+                f'{self.prefix}:{key}',
+                f'{self.prefix}-user:{user_id}',
+            ])
+
+    def clear(self):
+        self.cache.clear()
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    """Return the token cache configured in settings, or None if disabled
+
+    Without AUTH_TOKEN_CACHE_ALIAS the default Django cache is used when
+    every process shares it, and a per-process LRU otherwise.
+    """
+    global _token_cache
+    if settings.AUTH_TOKEN_CACHE_TTL <= 0:
+        return None
+    if _token_cache is None:
+        alias = settings.AUTH_TOKEN_CACHE_ALIAS
+        if not alias and is_shared('default'):
+            alias = 'default'
+        if alias:
+            _token_cache = SharedTokenCache(
+                alias, settings.AUTH_TOKEN_CACHE_TTL
+            )
+        else:
+            _token_cache = LocalTokenCache(
+                settings.AUTH_TOKEN_CACHE_SIZE,
+                settings.AUTH_TOKEN_CACHE_TTL
+            )
+
+    return _token_cache
+
+
+@receiver(setting_changed)
+def reset_token_cache(setting, **kwargs):
+    """Rebuild the token cache when its settings are overridden"""
+    global _token_cache
+    if setting.startswith('AUTH_TOKEN_CACHE_') or setting == 'CACHES':
+        _token_cache = None
+
+
+def invalidate_token(key):
+    """Forget the cached user of a token"""
+    cache = get_token_cache()
+    if cache is not None:
+        cache.delete(key)
+
+
+def invalidate_user_tokens(user_id):
+    """Forget the cached tokens of a user"""
+    cache = get_token_cache()
+    if cache is not None:
+        cache.delete_user(user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication that caches the token -> user lookup
+
+    A cache hit authenticates the request without touching the database.
+    Entries are dropped when the token is deleted or the user is saved.
+    With a shared cache every process rejects a deactivated user on its
+    next request; with the per-process LRU only the process that made the
+    change forgets the entry, and the others keep accepting the token
+    until it expires, up to AUTH_TOKEN_CACHE_TTL seconds later.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        if cache is None:
+            return super().authenticate_credentials(key)
+
+        user = cache.get(key)
+        record_cache('auth_token', user is not None)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(key, user)
+            return (user, token)
+
+        return (user, self.get_model()(key=key, user=user))
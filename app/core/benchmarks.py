@@ -0,0 +1,85 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from core.authentication import CachedTokenAuthentication, get_token_cache
+from core.db import QueryCounter
+
+
+def measure(name, func, iterations, batch=1, database=connection):
+    """Call func `iterations` times and return its throughput figures
+
+    `batch` is the number of items each call handles, so that operations
+    per second count items rather than calls. Queries are counted on
+    `database`.
+    """
+    with QueryCounter([database]) as counter:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = time.perf_counter() - start
+
+    return {
+        'name': name,
+        'iterations': iterations,
+        'ops_per_second': iterations * batch / elapsed,
+        'us_per_op': elapsed / (iterations * batch) * 1e6,
+        'queries_per_op': counter.count / (iterations * batch),
+    }
+
+
+def token_auth(iterations):
+    """Compare TokenAuthentication with CachedTokenAuthentication"""
+    user = get_user_model().objects.create_user(
+        'benchmark@youremail.com',
+        'benchmarkpass'
+    )
+    token = Token.objects.create(user=user)
+    request = APIRequestFactory().get(
+        '/', HTTP_AUTHORIZATION=f'Token {token.key}'
+    )
+    cache = get_token_cache()
+    if cache is not None:
+        cache.clear()
+
+    return [
+        measure(type(auth).__name__,
+                lambda: auth.authenticate(request),
+                iterations)
+        for auth in (TokenAuthentication(), CachedTokenAuthentication())
+    ]
+
+
+def connection_setup(iterations):
+    """Compare connecting for every request with reusing a connection
+
+    A separate connection is used so the benchmark transaction stays open.
+    The persistent case includes the health check run before reuse.
+    """
+    database = connection.copy()
+
+    def per_request():
+        database.connect()
+        with database.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        database.close()
+
+    def persistent():
+        if database.connection is None or not database.is_usable():
+            database.connect()
+        with database.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    try:
+        return [
+            measure('new connection per request', per_request, iterations,
+                    database=database),
+            measure('persistent connection', persistent, iterations,
+                    database=database),
+        ]
+    finally:
+        database.close()
@@ -0,0 +1,12 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def is_shared(alias):
+    """Return whether every worker process sees the same cache `alias`
+
+    Local memory caches belong to a single process and the dummy cache
+    keeps nothing, so neither can carry state from one worker to another.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
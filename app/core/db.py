@@ -0,0 +1,75 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.db.utils import DatabaseError
+
+
+def database_ready(alias='default'):
+    """Return whether a query can be run on a database"""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError:
+        return False
+
+    return True
+
+
+def check_connections():
+    """Close persistent connections the database server has dropped
+
+    Connections kept open by CONN_MAX_AGE can be closed by a database
+    restart or an idle timeout. Closing them before the request uses them
+    makes Django reconnect instead of failing the request. Only connections
+    idle for DB_HEALTH_CHECK_IDLE_SECONDS are checked, so busy workers do
+    not pay a round trip on every request.
+    """
+    now = time.monotonic()
+    for conn in connections.all():
+        if conn.connection is None or conn.in_atomic_block:
+            continue
+        if not conn.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+        idle_since = getattr(conn, 'idle_since', None)
+        if idle_since is not None and \
+                now - idle_since < settings.DB_HEALTH_CHECK_IDLE_SECONDS:
+            continue
+        if not conn.is_usable():
+            conn.close()
+
+
+def mark_connections_idle():
+    """Note when the open connections of this thread were last used"""
+    now = time.monotonic()
+    for conn in connections.all():
+        if conn.connection is not None:
+            conn.idle_since = now
+
+
+class QueryCounter:
+    """Count the queries run inside a with block
+
+    Queries are counted on every connection of this thread, or on the
+    given `databases`. Unlike CaptureQueriesContext, it does not keep the
+    queries, so it keeps counting past the size of the debug query log.
+    """
+
+    def __init__(self, databases=None):
+        self.databases = databases
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.stack = ExitStack()
+        for database in self.databases or connections.all():
+            self.stack.enter_context(database.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stack.close()
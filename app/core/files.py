@@ -0,0 +1,115 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db import models
+from django.db.models.fields.files import ImageFieldFile
+from django.utils.deconstruct import deconstructible
+
+
+def content_hash(content):
+    """Return the sha256 hex digest of a file, reading it in chunks
+
+    Uploads hashed by HashingUploadHandler carry their digest already, so
+    they are not read a second time.
+    """
+    digest = getattr(content, 'sha256', None)
+    if digest:
+        return digest
+
+    hasher = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        hasher.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+
+    return hasher.hexdigest()
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploads to a temporary file while hashing them
+
+    Only one chunk of the request body is held in memory, and saving the
+    upload moves the temporary file instead of copying it.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that names files after the hash of their content
+
+    A file saved as uploads/movie/<name>.jpg is stored as
+    uploads/movie/ab/cd/<sha256>.jpg, so directories stay small and a file
+    that is already stored is not written again.
+    """
+
+    def content_name(self, name, content):
+        digest = content_hash(content)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            os.path.dirname(name), digest[:2], digest[2:4], digest + extension
+        ).replace('\\', '/')
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        if self.exists(name):
+            # Mark the file as in use for the orphaned media cleanup
+            os.utime(self.path(name))
+            return name
+
+        saved = super()._save(name, content)
+        if saved != name:
+            # The same content was stored concurrently under the same name
+            super().delete(saved)
+
+        return name
+
+
+class SharedImageFieldFile(ImageFieldFile):
+
+    def delete(self, save=True):
+        """Delete the file once no other row of the model refers to it"""
+        if not self:
+            return
+
+        shared = self.field.model._default_manager \
+            .filter(**{self.field.name: self.name}) \
+            .exclude(pk=self.instance.pk) \
+            .exists()
+        if not shared:
+            return super().delete(save)
+
+        if hasattr(self, '_file'):
+            self.close()
+            del self.file
+        self.name = None
+        setattr(self.instance, self.field.name, self.name)
+        self._committed = False
+        if save:
+            self.instance.save()
+    delete.alters_data = True
+
+
+class SharedImageField(models.ImageField):
+    """Image field whose files may be shared by several rows
+
+    The rows referring to a file are its reference count, so the column
+    should be indexed.
+    """
+    attr_class = SharedImageFieldFile
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+BENCHMARKS = {
+    'auth': 'core.benchmarks.token_auth',
+    'bulk-create': 'movie.benchmarks.bulk_create',
+    'compression': 'movie.benchmarks.response_compression',
+    'connections': 'core.benchmarks.connection_setup',
+    'list-serialization': 'movie.benchmarks.list_serialization',
+}
+
+
+class Command(BaseCommand):
+    """Django command to run a micro-benchmark against the database
+
+    Everything a benchmark writes is rolled back when it finishes.
+    """
+    help = 'Run a named micro-benchmark and report its throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(BENCHMARKS))
+        parser.add_argument('--iterations', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        benchmark = import_string(BENCHMARKS[options['name']])
+        with transaction.atomic():
+            results = benchmark(options['iterations'])
+            transaction.set_rollback(True)
+
+        for result in results:
+            line = '{name:<32} {ops_per_second:>12,.0f} ops/s ' \
+                '{us_per_op:>10.1f} us/op ' \
+                '{queries_per_op:>6.2f} queries/op'.format(**result)
+            if result.get('note'):
+                line += f'  {result["note"]}'
+            self.stdout.write(line)
@@ -0,0 +1,140 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.models import Movie
+
+
+UPLOAD_DIR = 'uploads/movie'
+
+
+def scan_files(path):
+    """Yield a DirEntry for every file below path, walking it iteratively"""
+    directories = [path]
+    while directories:
+        try:
+            with os.scandir(directories.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+def image_name(name):
+    """Return the name of the image a stored file belongs to
+
+    Variants are named <image>.<variant>.<extension>, so they belong to
+    the image named without their last two suffixes.
+    """
+    directory, filename = os.path.split(name)
+    if filename.count('.') > 1:
+        filename = filename.rsplit('.', 2)[0]
+
+    return f'{directory}/{filename}'
+
+
+class Command(BaseCommand):
+    """Django command to delete uploaded movie images no movie refers to
+
+    Files are checked against the database in batches, so memory use does
+    not grow with the number of files or movies.
+    """
+    help = 'Delete (or list with --dry-run) orphaned movie images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='files checked against the database per query'
+        )
+        parser.add_argument(
+            '--max-rate', type=float, default=0,
+            help='deletions per second, 0 for no limit'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='seconds since a file was last written before it can go'
+        )
+
+    def handle(self, *args, **options):
+        storage = Movie._meta.get_field('image').storage
+        self.location = storage.location
+        self.dry_run = options['dry_run']
+        self.max_rate = options['max_rate']
+        self.verbosity = options['verbosity']
+        self.cutoff = time.time() - options['min_age']
+        self.start = time.monotonic()
+        self.first_deletion = None
+        self.scanned = self.orphans = self.deleted = self.freed = 0
+
+        batch = []
+        for entry in scan_files(storage.path(UPLOAD_DIR)):
+            self.scanned += 1
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > self.cutoff:
+                continue
+            batch.append((entry.path, stat.st_size))
+            if len(batch) >= options['batch_size']:
+                self.collect(batch)
+                batch = []
+        if batch:
+            self.collect(batch)
+
+        elapsed = time.monotonic() - self.start
+        self.stdout.write(self.style.SUCCESS(
+            f'Scanned {self.scanned} files in {elapsed:.1f}s '
+            f'({self.scanned / max(elapsed, 1e-6):,.0f} files/s): '
+            f'{self.orphans} orphaned ({self.freed / 2 ** 20:.1f} MiB), '
+            f'{self.deleted} deleted'
+        ))
+
+    def collect(self, batch):
+        """Delete the files of a batch whose image no movie refers to"""
+        images = {}
+        for path, size in batch:
+            name = os.path.relpath(path, self.location).replace('\\', '/')
+            images[path] = image_name(name)
+
+        referenced = set(
+            Movie.objects
+            .filter(image__in=set(images.values()))
+            .values_list('image', flat=True)
+            .iterator()
+        )
+
+        for path, size in batch:
+            if images[path] in referenced:
+                continue
+            self.orphans += 1
+            self.freed += size
+            if self.verbosity >= 2:
+                self.stdout.write(os.path.relpath(path, self.location))
+            if not self.dry_run:
+                self.delete(path)
+
+    def delete(self, path):
+        if self.max_rate > 0:
+            # Paced from the first deletion, as scanning takes no I/O budget
+            if self.first_deletion is None:
+                self.first_deletion = time.monotonic()
+            delay = self.first_deletion + self.deleted / self.max_rate \
+                - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        try:
+            # Storing an identical upload touches the file, so a file reused
+            # since it was scanned is left alone
+            if os.stat(path).st_mtime > self.cutoff:
+                return
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        self.deleted += 1
@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from core.models import Change
+
+
+class Command(BaseCommand):
+    """Django command to trim the change log behind incremental sync
+
+    A change followed by a later change of the same object tells a client
+    nothing the later one does not, so only the latest change of each
+    object is kept. Tombstones go after SYNC_TOMBSTONE_DAYS, as do the
+    changes of deleted users.
+    """
+    help = 'Delete superseded changes and expired tombstones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='changes deleted per query'
+        )
+
+    def handle(self, *args, **options):
+        superseded = Change.objects.annotate(superseded=Exists(
+            Change.objects.filter(
+                kind=OuterRef('kind'),
+                object_id=OuterRef('object_id'),
+                id__gt=OuterRef('id'),
+            )
+        )).filter(superseded=True)
+        expired = Change.objects.filter(
+            deleted=True,
+            created__lt=timezone.now()
+            - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+        )
+        orphaned = Change.objects.exclude(
+            user_id__in=get_user_model().objects.values('id')
+        )
+
+        counts = [
+            self.delete(queryset, options['batch_size'])
+            for queryset in (superseded, expired, orphaned)
+        ]
+
+        self.stdout.write(self.style.SUCCESS(
+            'Deleted {} superseded changes, {} expired tombstones and {} '
+            'changes of deleted users'.format(*counts)
+        ))
+
+    def delete(self, queryset, batch_size):
+        """Delete the changes of queryset in batches, walking it by id"""
+        deleted = last = 0
+        while True:
+            ids = list(
+                queryset.filter(id__gt=last).order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return deleted
+            deleted += Change.objects.filter(id__in=ids).delete()[0]
+            last = ids[-1]
@@ -0,0 +1,70 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from movie.cache import invalidate_user
+from movie.catalog import IMPORT_FORMATS, import_movies
+
+
+class Command(BaseCommand):
+    """Django command to import a movie catalog file for a user
+
+    The file is read incrementally and written in batches, so it can be
+    much larger than memory.
+    """
+    help = 'Create movies for a user from an NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='owner email')
+        parser.add_argument('--input', choices=sorted(IMPORT_FORMATS))
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.MOVIE_IMPORT_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["user"]}')
+
+        input_format = options['input'] or (
+            'csv' if options['path'].lower().endswith('.csv') else 'ndjson'
+        )
+        self.verbosity = options['verbosity']
+        self.next_progress = 10
+        with open(options['path'], 'rb') as file:
+            report = import_movies(
+                user,
+                IMPORT_FORMATS[input_format](file),
+                options['batch_size'],
+                progress=self.progress
+            )
+        if report['created']:
+            invalidate_user(user.pk)
+
+        for error in report['errors']:
+            self.stderr.write(
+                f'line {error["line"]}: {json.dumps(error["errors"])}'
+            )
+        if report['failed'] > len(report['errors']):
+            self.stderr.write(
+                f'{report["failed"] - len(report["errors"])} more errors '
+                f'not listed'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            '{created} movies created, {failed} rows failed in '
+            '{seconds:.1f}s ({rows_per_second:,.0f} rows/s)'.format(**report)
+        ))
+
+    def progress(self, report):
+        """Report progress after every batch, or every 10s by default"""
+        if self.verbosity >= 2 or \
+                report['seconds'] >= self.next_progress:
+            self.next_progress = report['seconds'] + 10
+            self.stdout.write(
+                '{rows} rows read, {created} created, {failed} failed '
+                '({rows_per_second:,.0f} rows/s)'.format(**report)
+            )
@@ -0,0 +1,197 @@
+import json
+import math
+import random
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.db import QueryCounter
+from core.management.commands.seed_data import SEED_EMAIL
+from core.models import Movie, Tag
+
+
+SCENARIOS = (
+    'auth', 'movie-list', 'movie-detail', 'movie-create', 'movie-update',
+    'tag-list', 'image-upload',
+)
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of sorted values"""
+    index = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+    return values[index]
+
+
+class Command(BaseCommand):
+    """Django command to load test the API against data from seed_data
+
+    Requests go through the whole Django stack in process (middleware,
+    authentication, views and database) but not through the network, and
+    everything they write is rolled back at the end. Uploaded images are
+    stored once, since they all have the same content.
+    """
+    help = 'Report API throughput, latency percentiles and queries/request'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200, help='requests per scenario'
+        )
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help='seeded users the requests are spread over'
+        )
+        parser.add_argument(
+            '--scenarios', default=','.join(SCENARIOS),
+            help=f'comma separated, some of: {", ".join(SCENARIOS)}'
+        )
+        parser.add_argument('--output', help='write the results as JSON')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'].split(',')
+        unknown = set(scenarios).difference(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(unknown)}')
+
+        self.rng = random.Random(options['seed'])
+        self.users = self.load_users(options['users'])
+        self.client = APIClient(SERVER_NAME=self.host())
+        self.image = self.jpeg()
+
+        with transaction.atomic():
+            results = [
+                self.run(name, options['requests']) for name in scenarios
+            ]
+            transaction.set_rollback(True)
+
+        for result in results:
+            self.stdout.write(
+                '{scenario:<14} {requests_per_second:>10,.0f} req/s '
+                'p50 {p50_ms:>7.2f} ms  p95 {p95_ms:>7.2f} ms  '
+                'p99 {p99_ms:>7.2f} ms  {queries_per_request:>5.2f} '
+                'queries/req  {errors} errors'.format(**result)
+            )
+
+        if options['output']:
+            report = {
+                'timestamp': datetime.now(timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'dataset': {
+                    'users': get_user_model().objects.count(),
+                    'tags': Tag.objects.count(),
+                    'movies': Movie.objects.count(),
+                },
+                'results': results,
+            }
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+    def host(self):
+        """Return a host name the API accepts requests for"""
+        for host in settings.ALLOWED_HOSTS:
+            if host not in ('*', '.'):
+                return host.lstrip('.')
+        return 'localhost'
+
+    def load_users(self, count):
+        """Return the token, movie ids and tag ids of seeded users"""
+        tokens = Token.objects \
+            .filter(user__email__startswith=SEED_EMAIL.split('{')[0]) \
+            .order_by('user_id') \
+            .values_list('key', 'user_id')[:count]
+        users = []
+        for key, user_id in tokens:
+            users.append({
+                'token': key,
+                'movies': list(Movie.objects.filter(user_id=user_id)
+                               .values_list('id', flat=True)[:100]),
+                'tags': list(Tag.objects.filter(user_id=user_id)
+                             .values_list('id', flat=True)[:20]),
+            })
+        users = [user for user in users if user['movies']]
+        if not users:
+            raise CommandError('No seeded movies, run seed_data first')
+
+        return users
+
+    def jpeg(self):
+        output = BytesIO()
+        Image.new('RGB', (640, 960), (120, 40, 40)).save(output, 'JPEG')
+        return output.getvalue()
+
+    def request(self, name, user):
+        """Return the client method, URL and arguments of a scenario"""
+        movie_id = self.rng.choice(user['movies'])
+        if name == 'auth':
+            return 'get', reverse('user:me'), {}
+        if name == 'movie-list':
+            return 'get', reverse('movie:movie-list'), {}
+        if name == 'movie-detail':
+            return 'get', reverse('movie:movie-detail', args=[movie_id]), {}
+        if name == 'movie-create':
+            return 'post', reverse('movie:movie-list'), {
+                'data': {
+                    'title': 'Load test movie',
+                    'tags': self.rng.sample(
+                        user['tags'], min(3, len(user['tags']))
+                    ),
+                    'time_minutes': 100,
+                    'ticket_price_USD': '9.50',
+                },
+                'format': 'json',
+            }
+        if name == 'movie-update':
+            return 'patch', reverse('movie:movie-detail', args=[movie_id]), {
+                'data': {'title': f'Load test {self.rng.random()}'},
+                'format': 'json',
+            }
+        if name == 'tag-list':
+            return 'get', reverse('movie:tag-list'), {}
+        return 'post', reverse('movie:movie-upload-image', args=[movie_id]), {
+            'data': {'image': SimpleUploadedFile(
+                'poster.jpg', self.image, content_type='image/jpeg'
+            )},
+            'format': 'multipart',
+        }
+
+    def run(self, name, count):
+        """Send count requests of a scenario and summarize them"""
+        latencies = []
+        queries = errors = 0
+        start = time.perf_counter()
+        for _ in range(count):
+            user = self.rng.choice(self.users)
+            method, url, kwargs = self.request(name, user)
+            with QueryCounter() as counter:
+                sent = time.perf_counter()
+                response = getattr(self.client, method)(
+                    url, HTTP_AUTHORIZATION=f'Token {user["token"]}',
+                    **kwargs
+                )
+                latencies.append(time.perf_counter() - sent)
+            queries += counter.count
+            if response.status_code >= 400:
+                errors += 1
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            'scenario': name,
+            'requests': count,
+            'errors': errors,
+            'requests_per_second': count / elapsed,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'queries_per_request': queries / count,
+        }
@@ -0,0 +1,166 @@
+import random
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from core.models import Change, Movie, Tag
+
+
+SEED_EMAIL = 'seed-user-{}@example.com'
+
+GENRES = (
+    'Drama', 'Comedy', 'Action', 'Thriller', 'Horror', 'Romance', 'Sci-Fi',
+    'Fantasy', 'Animation', 'Documentary', 'Crime', 'Mystery', 'Western',
+    'Musical', 'War', 'Family', 'Adventure', 'Biography', 'History', 'Noir',
+)
+ADJECTIVES = (
+    'Silent', 'Last', 'Dark', 'Golden', 'Broken', 'Hidden', 'Lost', 'Wild',
+    'Crimson', 'Frozen', 'Eternal', 'Distant', 'Secret', 'Burning', 'Final',
+)
+NOUNS = (
+    'River', 'Night', 'Empire', 'Garden', 'Storm', 'Kingdom', 'Road',
+    'Island', 'Promise', 'Shadow', 'City', 'Voyage', 'Harbor', 'Mountain',
+)
+NAMES = (
+    'Ana', 'Luis', 'Maria', 'Juan', 'Sofia', 'Diego', 'Camila', 'Andres',
+    'Valentina', 'Carlos', 'Laura', 'Miguel', 'Daniela', 'Jorge', 'Paula',
+)
+
+
+def tag_names(count):
+    """Return `count` distinct genre-like tag names"""
+    return [
+        GENRES[i % len(GENRES)] + (f' {i // len(GENRES)}'
+                                   if i >= len(GENRES) else '')
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    """Django command to generate a synthetic catalog for load testing
+
+    Users (with API tokens), tags and movies with tag links are written
+    with bulk inserts, a batch at a time, so millions of movies can be
+    generated with bounded memory. The data is reproducible from --seed.
+    """
+    help = 'Generate synthetic users, tags and movies at a given scale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument(
+            '--movies', type=int, default=100, help='movies per user'
+        )
+        parser.add_argument(
+            '--tags', type=int, default=20, help='tags per user'
+        )
+        parser.add_argument('--tags-per-movie', type=int, default=3)
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.MOVIE_BULK_BATCH_SIZE
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--password', default='seedpass',
+            help='password of every generated user'
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        self.start = time.monotonic()
+        self.created = self.linked = 0
+        rng = random.Random(options['seed'])
+
+        user_ids = self.create_users(options['users'], options['password'])
+        tag_ids = self.create_tags(user_ids, options['tags'])
+
+        movies = []
+        links = []
+        for user_id in user_ids:
+            for _ in range(options['movies']):
+                movies.append(self.movie(rng, user_id))
+                links.append(rng.sample(
+                    tag_ids[user_id],
+                    min(options['tags_per_movie'], len(tag_ids[user_id]))
+                ))
+                if len(movies) >= self.batch_size:
+                    self.flush(movies, links)
+        self.flush(movies, links)
+
+        elapsed = time.monotonic() - self.start
+        tags = sum(map(len, tag_ids.values()))
+        rows = len(user_ids) + tags + self.created + self.linked
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(user_ids)} users, {tags} tags, {self.created} '
+            f'movies and {self.linked} tag links in {elapsed:.1f}s '
+            f'({rows / max(elapsed, 1e-6):,.0f} rows/s)'
+        ))
+
+    def create_users(self, count, password):
+        """Create users and their tokens, returning the new user ids"""
+        User = get_user_model()
+        first = User.objects.filter(
+            email__startswith=SEED_EMAIL.split('{')[0]
+        ).count()
+        emails = [SEED_EMAIL.format(first + i) for i in range(count)]
+        password = make_password(password)
+        User.objects.bulk_create(
+            User(email=email, name=NAMES[i % len(NAMES)], password=password)
+            for i, email in enumerate(emails)
+        )
+        user_ids = list(
+            User.objects.filter(email__in=emails)
+            .order_by('id').values_list('id', flat=True)
+        )
+        Token.objects.bulk_create(
+            Token(key=Token().generate_key(), user_id=user_id)
+            for user_id in user_ids
+        )
+
+        return user_ids
+
+    def create_tags(self, user_ids, count):
+        """Create the tags of every user, returning their ids by user"""
+        names = tag_names(count)
+        Tag.objects.bulk_create(
+            (
+                Tag(user_id=user_id, name=name)
+                for user_id in user_ids for name in names
+            ),
+            batch_size=self.batch_size
+        )
+        tags = list(Tag.objects.filter(user_id__in=user_ids)
+                    .only('id', 'user_id'))
+        Change.objects.record(Change.TAG, tags)
+        tag_ids = {user_id: [] for user_id in user_ids}
+        for tag in tags:
+            tag_ids[tag.user_id].append(tag.id)
+
+        return tag_ids
+
+    def movie(self, rng, user_id):
+        title = f'The {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}'
+        return Movie(
+            user_id=user_id,
+            title=title,
+            time_minutes=max(60, int(rng.gauss(115, 25))),
+            ticket_price_USD=f'{rng.uniform(3, 25):.2f}',
+            link=f'https://example.com/movies/{rng.getrandbits(32):08x}',
+        )
+
+    def flush(self, movies, links):
+        """Write a batch of movies with their links and report progress"""
+        if not movies:
+            return
+
+        Movie.objects.bulk_create_with_tags(movies, links, self.batch_size)
+        self.created += len(movies)
+        self.linked += sum(map(len, links))
+        movies.clear()
+        links.clear()
+        if self.verbosity >= 2:
+            rate = self.created / max(time.monotonic() - self.start, 1e-6)
+            self.stdout.write(f'{self.created} movies ({rate:,.0f} movies/s)')
@@ -1,21 +1,40 @@
 import time
 
-from django.db import connections
-from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db import database_ready
 
 
 class Command(BaseCommand):
-    """Django Command to pause execution until database is avaliable"""
+    """Django Command to pause execution until database is avaliable
+
+    The database only counts as available once it answers a query. Retries
+    back off exponentially up to --max-delay seconds apart.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='seconds to wait before giving up'
+        )
+        parser.add_argument('--delay', type=float, default=0.5)
+        parser.add_argument('--max-delay', type=float, default=5)
 
-    def handle(self, *args, **option):
+    def handle(self, *args, **options):
         self.stdout.write('waiting for database...')
-        db_conn = None
-        while not db_conn:
-            try:
-                db_conn = connections['default']
-            except OperationalError:
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+        deadline = time.monotonic() + options['timeout']
+        delay = options['delay']
+        while not database_ready(options['database']):
+            if time.monotonic() + delay > deadline:
+                raise CommandError(
+                    f'Database unavailable after {options["timeout"]:g} '
+                    f'seconds'
+                )
+            self.stdout.write(
+                f'Database unavailable, waiting {delay:g} seconds...'
+            )
+            time.sleep(delay)
+            delay = min(delay * 2, options['max_delay'])
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
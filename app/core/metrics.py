@@ -0,0 +1,238 @@
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+import weakref
+
+from django.conf import settings
+
+
+# Every thread counts into its own dict, so recording takes no lock;
+# collecting copies each dict, which is atomic under the GIL. The counts of
+# finished threads are merged into _retired and their dicts dropped
+_shards = []
+_retired = {}
+_shards_lock = threading.Lock()
+_local = threading.local()
+_snapshot = {'pid': None, 'path': None, 'written': 0.0}
+
+METHODS = frozenset((
+    'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'TRACE',
+    'CONNECT',
+))
+
+
+def _retire(shard):
+    with _shards_lock:
+        for key, value in shard.items():
+            _retired[key] = _retired.get(key, 0) + value
+        _shards.remove(shard)
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = {}
+        with _shards_lock:
+            _shards.append(shard)
+        weakref.finalize(threading.current_thread(), _retire, shard)
+    return shard
+
+
+def increment(key, amount=1):
+    """Add `amount` to the counter `key` of this process"""
+    shard = _shard()
+    shard[key] = shard.get(key, 0) + amount
+
+
+def observe_request(route, method, status, seconds, queries):
+    """Record a request answered by `route` in the request metrics
+
+    Methods other than the standard ones are counted as OTHER, so clients
+    cannot add series at will.
+    """
+    if method not in METHODS:
+        method = 'OTHER'
+    shard = _shard()
+    buckets = settings.METRICS_LATENCY_BUCKETS
+    for key, amount in (
+        (('requests', route, method, str(status)), 1),
+        (('latency_bucket', route, bisect.bisect_left(buckets, seconds)), 1),
+        (('latency_sum', route), seconds),
+        (('queries', route), queries),
+    ):
+        shard[key] = shard.get(key, 0) + amount
+
+
+def record_cache(cache, hit):
+    """Count a lookup in `cache` as a hit or a miss"""
+    increment(('cache', cache, 'hit' if hit else 'miss'))
+
+
+def local_values():
+    """Return the counters of this process, summed over its threads"""
+    with _shards_lock:
+        shards = list(_shards)
+        values = dict(_retired)
+    for shard in shards:
+        for key, value in shard.copy().items():
+            values[key] = values.get(key, 0) + value
+
+    return values
+
+
+def reset():
+    """Zero the counters of this process"""
+    with _shards_lock:
+        _retired.clear()
+        for shard in _shards:
+            shard.clear()
+
+
+def _snapshot_path():
+    pid = os.getpid()
+    path = _snapshot['path']
+    if _snapshot['pid'] != pid or \
+            os.path.dirname(path) != settings.METRICS_DIR:
+        # A forked worker writes to its own file, not its parent's
+        path = os.path.join(
+            settings.METRICS_DIR, f'{pid}-{uuid.uuid4().hex[:8]}.json'
+        )
+        _snapshot.update(pid=pid, path=path, written=0.0)
+    return path
+
+
+def write_snapshot(force=False):
+    """Save the counters of this process to METRICS_DIR
+
+    Snapshots are written at most every METRICS_FLUSH_SECONDS unless
+    `force` is set, and replace the previous one of the process atomically.
+    """
+    if not settings.METRICS_DIR:
+        return
+    now = time.monotonic()
+    path = _snapshot_path()
+    if not force and now - _snapshot['written'] < \
+            settings.METRICS_FLUSH_SECONDS:
+        return
+
+    _snapshot['written'] = now
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as output:
+        json.dump([[list(key), value]
+                   for key, value in local_values().items()], output)
+    os.replace(temporary, path)
+
+
+def collect():
+    """Return the counters of every worker process
+
+    Without METRICS_DIR only this process is counted. With it, the
+    snapshots of all processes that wrote one are summed, including
+    processes that have exited, so counters never go backwards.
+    """
+    if not settings.METRICS_DIR:
+        return local_values()
+
+    write_snapshot(force=True)
+    values = {}
+    for entry in os.scandir(settings.METRICS_DIR):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path) as snapshot:
+                items = json.load(snapshot)
+        except (OSError, ValueError):
+            continue
+        for key, value in items:
+            key = tuple(key)
+            values[key] = values.get(key, 0) + value
+
+    return values
+
+
+def _labels(**labels):
+    return ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n')
+        )
+        for name, value in labels.items()
+    )
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(values):
+    """Return counters in the Prometheus text exposition format"""
+    requests = []
+    latency = {}
+    latency_sum = {}
+    queries = []
+    cache = []
+    for key, value in sorted(values.items(), key=lambda item: str(item[0])):
+        kind, *labels = key
+        if kind == 'requests':
+            route, method, status = labels
+            requests.append((
+                _labels(route=route, method=method, status=status), value
+            ))
+        elif kind == 'latency_bucket':
+            route, index = labels
+            counts = latency.setdefault(
+                route, [0] * (len(settings.METRICS_LATENCY_BUCKETS) + 1)
+            )
+            counts[min(index, len(counts) - 1)] += value
+        elif kind == 'latency_sum':
+            latency_sum[labels[0]] = value
+        elif kind == 'queries':
+            queries.append((_labels(route=labels[0]), value))
+        elif kind == 'cache':
+            cache.append((_labels(cache=labels[0], result=labels[1]), value))
+
+    lines = [
+        '# HELP http_requests_total Requests answered, by route and status.',
+        '# TYPE http_requests_total counter',
+    ]
+    lines.extend(f'http_requests_total{{{labels}}} {_number(value)}'
+                 for labels, value in requests)
+
+    lines.extend([
+        '# HELP http_request_duration_seconds Time to answer requests.',
+        '# TYPE http_request_duration_seconds histogram',
+    ])
+    bounds = [_number(float(bound))
+              for bound in settings.METRICS_LATENCY_BUCKETS] + ['+Inf']
+    name = 'http_request_duration_seconds'
+    for route, counts in sorted(latency.items()):
+        total = 0
+        for bound, count in zip(bounds, counts):
+            total += count
+            lines.append(
+                f'{name}_bucket{{{_labels(route=route, le=bound)}}} {total}'
+            )
+        lines.append(f'{name}_sum{{{_labels(route=route)}}} '
+                     f'{_number(float(latency_sum.get(route, 0)))}')
+        lines.append(f'{name}_count{{{_labels(route=route)}}} {total}')
+
+    lines.extend([
+        '# HELP db_queries_total Database queries run, by route.',
+        '# TYPE db_queries_total counter',
+    ])
+    lines.extend(f'db_queries_total{{{labels}}} {_number(value)}'
+                 for labels, value in queries)
+
+    lines.extend([
+        '# HELP cache_requests_total Cache lookups, by cache and result.',
+        '# TYPE cache_requests_total counter',
+    ])
+    lines.extend(f'cache_requests_total{{{labels}}} {_number(value)}'
+                 for labels, value in cache)
+
+    return '\n'.join(lines) + '\n'
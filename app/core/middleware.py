@@ -0,0 +1,396 @@
+import cProfile
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+import zlib
+from contextlib import ExitStack
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from core import metrics, routers
+from core.caches import is_shared
+from core.db import QueryCounter
+from core.timing import RequestTimer, set_timer
+
+
+logger = logging.getLogger(__name__)
+slow_request_logger = logging.getLogger('core.slow_requests')
+
+# zlib window bits selecting the container of each content coding
+WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+
+_stats = {'responses': 0, 'bytes_in': 0, 'bytes_out': 0, 'cpu_seconds': 0.0}
+_stats_lock = threading.Lock()
+
+
+def _record(encoding, bytes_in, bytes_out, cpu_seconds):
+    with _stats_lock:
+        _stats['responses'] += 1
+        _stats['bytes_in'] += bytes_in
+        _stats['bytes_out'] += bytes_out
+        _stats['cpu_seconds'] += cpu_seconds
+    logger.debug(
+        '%s: %d -> %d bytes (%d saved) in %.2f ms CPU',
+        encoding, bytes_in, bytes_out, bytes_in - bytes_out,
+        cpu_seconds * 1000
+    )
+
+
+def compression_stats():
+    """Return the bytes compressed and CPU time spent by this process"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def accepted_encoding(header, encodings):
+    """Return the encoding of `encodings` the client prefers, or None
+
+    `header` is an Accept-Encoding value; codings with q=0 are refused and
+    ties go to the first of `encodings`.
+    """
+    weights = {}
+    for item in header.lower().split(','):
+        coding, *params = item.split(';')
+        weight = 1.0
+        for param in params:
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+
+    return best
+
+
+def compress(data, encoding, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, level):
+    """Compress a streaming response, flushing after every chunk
+
+    Flushing keeps each chunk going out as soon as the view produces it.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+    bytes_in = bytes_out = 0
+    cpu_seconds = 0.0
+    for chunk in chunks:
+        start = time.thread_time()
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        cpu_seconds += time.thread_time() - start
+        bytes_in += len(chunk)
+        bytes_out += len(data)
+        yield data
+
+    data = compressor.flush()
+    bytes_out += len(data)
+    yield data
+    _record(encoding, bytes_in, bytes_out, cpu_seconds)
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with the best coding the client accepts
+
+    Like Django's GZipMiddleware, with deflate as well as gzip and a size
+    threshold (API_COMPRESSION_MIN_SIZE), but only for the API media types
+    of API_COMPRESSION_TYPES: pages with CSRF tokens are not compressed.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or \
+                not self.compressible_type(response.get('Content-Type', '')):
+            return response
+        if not response.streaming and \
+                len(response.content) < settings.API_COMPRESSION_MIN_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = accepted_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            settings.API_COMPRESSION_ENCODINGS
+        )
+        if encoding is None:
+            return response
+
+        level = settings.API_COMPRESSION_LEVEL
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding, level
+            )
+            del response['Content-Length']
+        else:
+            start = time.thread_time()
+            compressed = compress(response.content, encoding, level)
+            cpu_seconds = time.thread_time() - start
+            if len(compressed) >= len(response.content):
+                return response
+            _record(
+                encoding, len(response.content), len(compressed), cpu_seconds
+            )
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+
+        return response
+
+    def compressible_type(self, content_type):
+        media_type = content_type.split(';')[0].strip().lower()
+        return media_type in settings.API_COMPRESSION_TYPES
+
+
+class RequestTimingMiddleware:
+    """Report where the time of each request went
+
+    Query count and database time, the serialize and render spans and the
+    total are sent in a Server-Timing header. Requests taking at least
+    SLOW_REQUEST_MS are logged to core.slow_requests as JSON with their
+    SQL. The middleware removes itself unless REQUEST_TIMING is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = RequestTimer(settings.SLOW_REQUEST_MAX_QUERIES)
+        set_timer(timer)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timer))
+                response = self.get_response(request)
+        finally:
+            set_timer(None)
+
+        total = timer.elapsed()
+        metrics = [
+            f'db;dur={timer.db_seconds * 1000:.2f};'
+            f'desc="{timer.query_count} queries"'
+        ]
+        metrics.extend(
+            f'{name};dur={seconds * 1000:.2f}'
+            for name, seconds in sorted(timer.spans.items())
+        )
+        metrics.append(f'total;dur={total * 1000:.2f}')
+        response['Server-Timing'] = ', '.join(metrics)
+
+        if total * 1000 >= settings.SLOW_REQUEST_MS:
+            self.log_slow_request(request, response, timer, total)
+
+        return response
+
+    def log_slow_request(self, request, response, timer, total):
+        entry = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 3),
+            'db_ms': round(timer.db_seconds * 1000, 3),
+            'queries': timer.query_count,
+            'spans': {
+                name: round(seconds * 1000, 3)
+                for name, seconds in timer.spans.items()
+            },
+            'sql': timer.queries,
+        }
+        slow_request_logger.warning(
+            json.dumps(entry), extra={'request_timing': entry}
+        )
+
+
+class ProfilingMiddleware:
+    """Profile sampled requests with cProfile and keep the newest profiles
+
+    A request is profiled when its X-Profile header matches
+    PROFILE_REQUEST_SECRET, or at random with probability
+    PROFILE_SAMPLE_RATE. The stats are dumped to PROFILE_DIR, named after
+    the time, view, action and duration, with the request details in a
+    JSON file alongside; only the newest PROFILE_MAX_FILES are kept. The
+    middleware removes itself when neither trigger is configured, and
+    requests not sampled run unprofiled.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILE_REQUEST_SECRET and \
+                not settings.PROFILE_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.sampled(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        elapsed = time.perf_counter() - start
+
+        name = self.save(request, response, profiler, elapsed)
+        if request.META.get('HTTP_X_PROFILE'):
+            response['X-Profile-Id'] = name
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, 'cls', view_func)
+        actions = getattr(view_func, 'actions', None) or {}
+        request.profile_view = (
+            f'{view.__module__}.{view.__name__}',
+            actions.get(request.method.lower(), request.method.lower())
+        )
+
+    def sampled(self, request):
+        header = request.META.get('HTTP_X_PROFILE')
+        if header is not None and settings.PROFILE_REQUEST_SECRET:
+            return hmac.compare_digest(
+                header.encode(), settings.PROFILE_REQUEST_SECRET.encode()
+            )
+        rate = settings.PROFILE_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def save(self, request, response, profiler, elapsed):
+        """Write the profile and its details, returning the file name"""
+        view, action = getattr(request, 'profile_view', ('unresolved', ''))
+        label = re.sub(r'[^\w.-]', '_', f'{view.split(".")[-1]}.{action}')
+        name = '{}-{}-{}-{:.0f}ms'.format(
+            datetime.utcnow().strftime('%Y%m%dT%H%M%S%f'),
+            uuid.uuid4().hex[:8], label,
+            elapsed * 1000
+        )
+        directory = settings.PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(os.path.join(directory, f'{name}.prof'))
+        with open(os.path.join(directory, f'{name}.json'), 'w') as output:
+            json.dump({
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'view': view,
+                'action': action,
+                'ms': round(elapsed * 1000, 3),
+            }, output)
+
+        self.rotate(directory)
+        return name
+
+    def rotate(self, directory):
+        """Delete all but the newest PROFILE_MAX_FILES profiles"""
+        profiles = sorted(
+            entry.name[:-len('.prof')] for entry in os.scandir(directory)
+            if entry.name.endswith('.prof')
+        )
+        for name in profiles[:-settings.PROFILE_MAX_FILES]:
+            for extension in ('.prof', '.json'):
+                try:
+                    os.remove(os.path.join(directory, name + extension))
+                except FileNotFoundError:
+                    pass
+
+
+class MetricsMiddleware:
+    """Record the count, status, latency and queries of every request
+
+    Requests are labelled with the name of the URL pattern that answered
+    them, e.g. movie:movie-list, and are served by core.views.metrics.
+    The middleware removes itself unless METRICS_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        metrics.observe_request(
+            match.view_name if match is not None else 'unmatched',
+            request.method, response.status_code, elapsed, counter.count
+        )
+        metrics.write_snapshot()
+
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Serve safe requests to the views of REPLICA_VIEW_APPS from replicas
+
+    The replica is chosen in process_view and used by ReplicaRouter until
+    the response is returned. Clients are pinned to the primary for
+    REPLICA_STICKY_SECONDS after any other request, so they read their own
+    writes. The middleware removes itself when there are no replicas, and
+    refuses to start unless the pins are kept in a cache every worker
+    process shares.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        if not is_shared(settings.REPLICA_STICKY_CACHE_ALIAS):
+            raise ImproperlyConfigured(
+                'Replica routing needs REPLICA_STICKY_CACHE_ALIAS to name a '
+                'cache shared by every worker process (e.g. memcached), or '
+                'clients may not read their own writes.'
+            )
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.set_read_database(None)
+
+        if request.method not in self.safe_methods:
+            routers.pin_to_primary(self.client(request))
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in self.safe_methods:
+            return
+        view = getattr(view_func, 'cls', view_func)
+        if view.__module__.split('.')[0] not in settings.REPLICA_VIEW_APPS:
+            return
+        if routers.pinned_to_primary(self.client(request)):
+            return
+
+        routers.set_read_database(routers.choose_replica())
+
+    def client(self, request):
+        """Return what identifies the client sending the request"""
+        return request.META.get('HTTP_AUTHORIZATION') or \
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME, '')
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-16 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_movie_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['user', 'title'], name='core_movie_user_title_idx', opclasses=['int4_ops', 'varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['user', 'time_minutes'], name='core_movie_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['user', 'ticket_price_USD'], name='core_movie_user_price_idx'),
+        ),
+    ]
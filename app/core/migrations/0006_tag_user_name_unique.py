@@ -0,0 +1,45 @@
+# Generated by Django 2.2.28 on 2026-10-16 19:41
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """Merge tags sharing a user and name into the oldest one"""
+    Tag = apps.get_model('core', 'Tag')
+    MovieTag = apps.get_model('core', 'Movie').tags.through
+    duplicates = Tag.objects.values('user', 'name') \
+        .annotate(count=Count('id'), keep=Min('id')) \
+        .filter(count__gt=1)
+    for group in duplicates.iterator():
+        dropped = Tag.objects.filter(user=group['user'], name=group['name']) \
+            .exclude(id=group['keep'])
+        tagged = set(MovieTag.objects.filter(tag_id=group['keep'])
+                     .values_list('movie_id', flat=True))
+        moved = set(MovieTag.objects.filter(tag__in=dropped)
+                    .values_list('movie_id', flat=True)) - tagged
+        MovieTag.objects.bulk_create(
+            MovieTag(movie_id=movie_id, tag_id=group['keep'])
+            for movie_id in moved
+        )
+        dropped.delete()
+
+    # The deletes leave deferred foreign key checks pending on core_tag,
+    # and Postgres refuses to ALTER a table with pending trigger events
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_movie_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_tags, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(fields=('user', 'name'), name='core_tag_user_name_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-16 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_tag_user_name_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='image_variants',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 2.2.28 on 2026-10-16 19:47
+
+import core.files
+import core.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_movie_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movie',
+            name='image',
+            field=core.files.SharedImageField(db_index=True, null=True, storage=core.files.ContentAddressedStorage(), upload_to=core.models.movie_image_file_path),
+        ),
+    ]
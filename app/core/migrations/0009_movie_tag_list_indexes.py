@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_movie_image_content_storage'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='movie',
+            options={'ordering': ('-id',)},
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['user', 'id'], name='core_movie_user_id_idx'),
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
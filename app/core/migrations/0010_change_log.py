@@ -0,0 +1,61 @@
+# Generated by Django 2.2.28 on 2026-10-16 20:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def log_existing_rows(apps, schema_editor):
+    """Log every tag, then every movie, so a first sync downloads them"""
+    Change = apps.get_model('core', 'Change')
+    connection = schema_editor.connection
+    for kind, model in (('tag', 'Tag'), ('movie', 'Movie')):
+        rows = apps.get_model('core', model).objects \
+            .order_by('id').values_list('id', 'user_id')
+        batch = []
+        for object_id, user_id in rows.iterator():
+            batch.append(
+                Change(user_id=user_id, kind=kind, object_id=object_id)
+            )
+            if len(batch) >= 1000:
+                Change.objects.bulk_create(batch, batch_size=max(
+                    connection.ops.bulk_batch_size(
+                        Change._meta.concrete_fields, batch
+                    ), 1
+                ))
+                batch = []
+        Change.objects.bulk_create(batch, batch_size=max(
+            connection.ops.bulk_batch_size(Change._meta.concrete_fields, batch),
+            1
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_movie_tag_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('movie', 'Movie'), ('tag', 'Tag')], max_length=5)),
+                ('object_id', models.IntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['user', 'id'], name='core_change_user_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['kind', 'object_id'], name='core_change_object_idx'),
+        ),
+        migrations.RunPython(log_existing_rows, migrations.RunPython.noop),
+    ]
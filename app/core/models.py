@@ -1,9 +1,12 @@
 import uuid
 import os
-from django.db import models
+from django.db import connections, models, transaction
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 from django.conf import settings
+from django.utils import timezone
+
+from core.files import ContentAddressedStorage, SharedImageField
 
 
 def movie_image_file_path(instance, filename):
@@ -48,31 +51,263 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class TagManager(models.Manager):
+
+    def get_or_create_names(self, user, names):
+        """Return a name -> tag dict for names, creating the missing tags
+
+        Existing tags are read with one query and the missing ones are
+        written with one batched INSERT. Rows that a concurrent request
+        inserted first are skipped by the unique (user, name) constraint
+        and read back with the newly created ones.
+        """
+        names = set(names)
+        tags = {
+            tag.name: tag for tag in self.filter(user=user, name__in=names)
+        }
+        missing = names - tags.keys()
+        if missing:
+            self.bulk_create(
+                (self.model(user=user, name=name) for name in missing),
+                ignore_conflicts=True
+            )
+            created = list(self.filter(user=user, name__in=missing))
+            Change.objects.record(Change.TAG, created)
+            tags.update((tag.name, tag) for tag in created)
+
+        return tags
+
+
 class Tag(models.Model):
     """Tag to be used for a Movie"""
     name = models.CharField(max_length=255)
+    # Looked up through the index of the unique (user, name) constraint
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
-
+        db_index=False
     )
 
+    objects = TagManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'name'],
+                name='core_tag_user_name_uniq'
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class MovieManager(models.Manager):
+
+    def _bulk_insert(self, model, objs, batch_size):
+        """bulk_create objs without exceeding the backend's batch limit"""
+        objs = list(objs)
+        max_size = connections[self.db].ops.bulk_batch_size(
+            model._meta.concrete_fields, objs
+        )
+        if batch_size:
+            batch_size = min(batch_size, max(max_size, 1))
+        return model.objects.using(self.db).bulk_create(
+            objs, batch_size=batch_size
+        )
+
+    def bulk_create_with_tags(self, movies, tag_ids, batch_size=None):
+        """Insert movies and their tag links with batched INSERTs
+
+        `tag_ids` holds the list of tag ids of each movie. Backends that
+        cannot return primary keys from a bulk insert save the movies one
+        by one, still inside the same transaction.
+        """
+        link_model = self.model.tags.through
+        with transaction.atomic(using=self.db):
+            features = connections[self.db].features
+            if features.can_return_ids_from_bulk_insert:
+                movies = self._bulk_insert(self.model, movies, batch_size)
+            else:
+                for movie in movies:
+                    movie.save(using=self.db)
+            self._bulk_insert(
+                link_model,
+                (
+                    link_model(movie_id=movie.pk, tag_id=tag_id)
+                    for movie, ids in zip(movies, tag_ids)
+                    for tag_id in ids
+                ),
+                batch_size
+            )
+            if features.can_return_ids_from_bulk_insert:
+                Change.objects.record(Change.MOVIE, movies)
+
+        return movies
+
+    def bulk_set_tags(self, movies, tag_ids, batch_size=None):
+        """Make the tag links of movies match tag_ids, writing only changes
+
+        The current links are read in one query, links to tags no longer
+        listed are deleted in one statement and only missing links are
+        inserted, so movies whose tags did not change cost no writes.
+        Returns the ids of the movies whose links changed; like other bulk
+        writes this sends no signals, so callers log those changes.
+        """
+        link_model = self.model.tags.through
+        links = link_model.objects.using(self.db)
+        wanted = {movie.pk: set(ids) for movie, ids in zip(movies, tag_ids)}
+        with transaction.atomic(using=self.db, savepoint=False):
+            kept = {}
+            stale = []
+            changed = set()
+            for link_id, movie_id, tag_id in links \
+                    .filter(movie_id__in=list(wanted)) \
+                    .values_list('id', 'movie_id', 'tag_id'):
+                if tag_id in wanted[movie_id]:
+                    kept.setdefault(movie_id, set()).add(tag_id)
+                else:
+                    stale.append(link_id)
+                    changed.add(movie_id)
+
+            # delete() would select the links again, as the m2m_changed
+            # receiver rules out Django's single statement fast delete
+            size = max(connections[self.db].ops.bulk_batch_size(
+                ['id'], stale
+            ), 1)
+            for start in range(0, len(stale), size):
+                links.filter(id__in=stale[start:start + size]) \
+                    ._raw_delete(self.db)
+
+            added = self._bulk_insert(
+                link_model,
+                (
+                    link_model(movie_id=movie.pk, tag_id=tag_id)
+                    for movie, ids in zip(movies, tag_ids)
+                    for tag_id in ids
+                    if tag_id not in kept.get(movie.pk, ())
+                ),
+                batch_size
+            )
+
+            changed.update(link.movie_id for link in added)
+
+        return changed
+
+
 class Movie(models.Model):
     """Movie object"""
+    # Looked up through the (user, ...) indexes below
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     title = models.CharField(max_length=255)
     time_minutes = models.IntegerField()
     ticket_price_USD = models.DecimalField(max_digits=5, decimal_places=2)
     link = models.CharField(max_length=255, blank=True)
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=movie_image_file_path)
+    # Identical images are stored once and shared by the movies using them
+    image = SharedImageField(
+        null=True,
+        upload_to=movie_image_file_path,
+        storage=ContentAddressedStorage(),
+        db_index=True
+    )
+    # JSON object of the resized copies of image: variant name -> file name
+    image_variants = models.TextField(blank=True, default='')
+
+    objects = MovieManager()
+
+    class Meta:
+        # Newest first, matching the list pagination and its index
+        ordering = ('-id',)
+        indexes = [
+            models.Index(
+                fields=['user', 'id'],
+                name='core_movie_user_id_idx',
+            ),
+            # varchar_pattern_ops lets Postgres use the index for prefix
+            # LIKE lookups regardless of the database collation
+            models.Index(
+                fields=['user', 'title'],
+                name='core_movie_user_title_idx',
+                opclasses=['int4_ops', 'varchar_pattern_ops'],
+            ),
+            models.Index(
+                fields=['user', 'time_minutes'],
+                name='core_movie_user_time_idx',
+            ),
+            models.Index(
+                fields=['user', 'ticket_price_USD'],
+                name='core_movie_user_price_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class ChangeManager(models.Manager):
+
+    def record(self, kind, objects, deleted=False):
+        """Log that movies or tags were written, or deleted if `deleted`
+
+        `objects` only need their pk and user_id, and are logged with
+        batched INSERTs.
+        """
+        changes = [
+            self.model(
+                user_id=obj.user_id, kind=kind, object_id=obj.pk,
+                deleted=deleted
+            )
+            for obj in {obj.pk: obj for obj in objects}.values()
+        ]
+        if not changes:
+            return
+        batch_size = max(connections[self.db].ops.bulk_batch_size(
+            self.model._meta.concrete_fields, changes
+        ), 1)
+        self.bulk_create(changes, batch_size=batch_size)
+
+
+class Change(models.Model):
+    """A movie or tag of a user that was written or deleted
+
+    Ids order the changes for incremental sync, and a deleted change is
+    the tombstone of its object. Only the latest change of an object is
+    needed; older ones are removed by compact_changes.
+    """
+    MOVIE = 'movie'
+    TAG = 'tag'
+    KINDS = ((MOVIE, 'Movie'), (TAG, 'Tag'))
+
+    id = models.BigAutoField(primary_key=True)
+    # Not a constraint: deleting a user logs tombstones for their rows
+    # after the cascade has collected the changes to delete
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name='+'
+    )
+    kind = models.CharField(max_length=5, choices=KINDS)
+    object_id = models.IntegerField()
+    deleted = models.BooleanField(default=False)
+    created = models.DateTimeField(default=timezone.now)
+
+    objects = ChangeManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'id'],
+                name='core_change_user_id_idx',
+            ),
+            models.Index(
+                fields=['kind', 'object_id'],
+                name='core_change_object_idx',
+            ),
+        ]
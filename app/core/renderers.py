@@ -0,0 +1,19 @@
+from rest_framework.renderers import JSONRenderer
+
+from core.timing import span
+
+
+class CompactJSONRenderer(JSONRenderer):
+    """JSON renderer that never indents, whatever the client asks for
+
+    Items are separated by bare commas and colons, so responses carry no
+    whitespace.
+    """
+    compact = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+    def get_indent(self, accepted_media_type, renderer_context):
+        return None
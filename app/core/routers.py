@@ -0,0 +1,89 @@
+import hashlib
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+
+from core.db import database_ready
+
+
+_local = threading.local()
+_health = {}
+
+
+def read_database():
+    """Return the replica reads of this thread go to, or None"""
+    return getattr(_local, 'database', None)
+
+
+def set_read_database(alias):
+    _local.database = alias
+
+
+def replica_healthy(alias):
+    """Return whether a replica answered its last check
+
+    Each replica is checked at most every REPLICA_CHECK_SECONDS per
+    process, so requests normally route without any extra query.
+    """
+    healthy, checked = _health.get(alias, (False, None))
+    now = time.monotonic()
+    if checked is None or now - checked >= settings.REPLICA_CHECK_SECONDS:
+        healthy = database_ready(alias)
+        _health[alias] = (healthy, now)
+
+    return healthy
+
+
+def choose_replica():
+    """Return a healthy replica at random, or None when none answers"""
+    replicas = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if replica_healthy(alias)
+    ]
+    return random.choice(replicas) if replicas else None
+
+
+def _pin_key(client):
+    return f'replica-pin:{hashlib.sha1(client.encode()).hexdigest()}'
+
+
+def pin_to_primary(client):
+    """Send the reads of `client` to the primary for a while after a write
+
+    `client` identifies who wrote, e.g. their Authorization header, so
+    that their next reads see the write before replicas catch up.
+    """
+    if client and settings.REPLICA_STICKY_SECONDS > 0:
+        caches[settings.REPLICA_STICKY_CACHE_ALIAS].set(
+            _pin_key(client), True, settings.REPLICA_STICKY_SECONDS
+        )
+
+
+def pinned_to_primary(client):
+    return bool(client) and caches[settings.REPLICA_STICKY_CACHE_ALIAS] \
+        .get(_pin_key(client), False)
+
+
+class ReplicaRouter:
+    """Send reads to the replica chosen for the request, writes to default
+
+    ReplicaRoutingMiddleware picks the replica for safe requests; any
+    other code reads from the primary. Objects read from a replica are
+    saved to the primary too.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_database()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_token, invalidate_user_tokens
+from core.db import check_connections, mark_connections_idle
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating requests with a deleted token"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_saved_user_tokens(sender, instance, **kwargs):
+    """Reload the user on the next request after any change"""
+    invalidate_user_tokens(instance.pk)
+
+
+@receiver(request_started)
+def check_reused_connections(sender, **kwargs):
+    """Replace dropped persistent connections before the request runs"""
+    check_connections()
+
+
+@receiver(request_finished)
+def note_idle_connections(sender, **kwargs):
+    """Start the idle time after which reused connections are checked"""
+    mark_connections_idle()
@@ -0,0 +1,22 @@
+import logging
+
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Test runner keeping slow request logs out of the test output
+
+    Many tests make requests slower than SLOW_REQUEST_MS; the tests of the
+    log capture it with assertLogs, which lowers the level again.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        logger = logging.getLogger('core.slow_requests')
+        self.slow_request_level = logger.level
+        logger.setLevel(logging.CRITICAL + 1)
+
+    def teardown_test_environment(self, **kwargs):
+        logging.getLogger('core.slow_requests') \
+            .setLevel(self.slow_request_level)
+        super().teardown_test_environment(**kwargs)
@@ -1,7 +1,18 @@
-from django.test import TestCase
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.admin import ACTION_CHECKBOX_NAME
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from core.authentication import get_token_cache
+from core.admin import movies_changed
+from core.models import Change, Movie, Tag
+from core.tests.utils import create_movies
 
 
 class AdminSiteTests(TestCase):
@@ -43,3 +54,128 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+
+class LargeTableAdminTests(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@tuemail.com',
+            password='password123'
+        )
+        self.client.force_login(self.admin_user)
+        self.user = get_user_model().objects.create_user(
+            email='test@tuemail.com',
+            password='password123'
+        )
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+
+    def test_movie_changelist_queries(self):
+        """Test the movie list loads owners with the page, not per row"""
+        url = reverse('admin:core_movie_changelist')
+        create_movies(self.user, 1)
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        create_movies(self.user, 50, tags=self.tags)
+
+        with self.assertNumQueries(4):
+            res = self.client.get(url)
+
+        self.assertContains(res, 'test@tuemail.com', count=51)
+
+    @override_settings(ADMIN_ESTIMATED_COUNT_MIN=1000)
+    @patch('core.admin.estimated_count', return_value=12345678)
+    def test_large_table_count_estimated(self, estimated_count):
+        """Test that large unfiltered tables are not counted"""
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(reverse('admin:core_movie_changelist'))
+
+        self.assertContains(res, '12345678 movies')
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] and 'core_movie' in query['sql']
+            for query in context.captured_queries
+        ))
+
+    def test_change_form_widgets(self):
+        """Test the movie form does not list every user and tag"""
+        create_movies(self.user, 1, tags=self.tags[:1])
+        movie = Movie.objects.get()
+
+        res = self.client.get(
+            reverse('admin:core_movie_change', args=[movie.id])
+        )
+
+        self.assertContains(res, 'vForeignKeyRawIdAdminField')
+        self.assertContains(res, 'admin-autocomplete')
+        self.assertContains(res, 'Tag 0')
+        self.assertNotContains(res, 'Tag 1')
+
+    def test_clear_tags_action(self):
+        """Test clearing the tags of movies in bulk"""
+        create_movies(self.user, 3, tags=self.tags)
+        movie_ids = list(Movie.objects.values_list('id', flat=True))
+
+        with patch('core.admin.invalidate_user') as invalidate_user:
+            self.client.post(reverse('admin:core_movie_changelist'), {
+                'action': 'clear_tags',
+                ACTION_CHECKBOX_NAME: movie_ids[:2],
+            })
+
+        self.assertEqual(
+            list(Movie.tags.through.objects.values_list('movie_id', flat=True)
+                 .distinct()),
+            movie_ids[2:]
+        )
+        invalidate_user.assert_called_once_with(self.user.id)
+
+    def test_movies_changed_batched(self):
+        """Test that changed movies are logged in batches"""
+        other = get_user_model().objects.create_user('other@tuemail.com')
+        create_movies(self.user, 3)
+        create_movies(other, 2)
+        Change.objects.all().delete()
+
+        with patch('core.admin.invalidate_user') as invalidate_user, \
+                patch.object(Change.objects, 'record',
+                             wraps=Change.objects.record) as record:
+            movies_changed(Movie.objects.all(), batch_size=2)
+
+        self.assertEqual(record.call_count, 3)
+        self.assertEqual(
+            sorted(Change.objects.values_list('object_id', flat=True)),
+            sorted(Movie.objects.values_list('id', flat=True))
+        )
+        self.assertEqual(
+            sorted(call[0][0] for call in invalidate_user.call_args_list),
+            [self.user.id, other.id]
+        )
+
+    def test_remove_images_action(self):
+        """Test removing the images of movies with one update"""
+        create_movies(self.user, 2, image='uploads/movie/ab/cd/a.jpg')
+        movie_ids = list(Movie.objects.values_list('id', flat=True))
+
+        self.client.post(reverse('admin:core_movie_changelist'), {
+            'action': 'remove_images',
+            ACTION_CHECKBOX_NAME: movie_ids,
+        })
+
+        self.assertFalse(Movie.objects.exclude(image=None).exists())
+
+    def test_deactivate_users_action(self):
+        """Test deactivated users can no longer use cached tokens"""
+        token = Token.objects.create(user=self.user)
+        get_token_cache().set(token.key, self.user)
+
+        self.client.post(reverse('admin:core_user_changelist'), {
+            'action': 'deactivate_users',
+            ACTION_CHECKBOX_NAME: [self.user.id],
+        })
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNone(get_token_cache().get(token.key))
@@ -0,0 +1,171 @@
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import LocalTokenCache, SharedTokenCache, \
+    get_token_cache
+
+
+ME_URL = reverse('user:me')
+MOVIES_URL = reverse('movie:movie-list')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the cached token authentication backend"""
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@tuemail.com',
+            password='password123',
+            name='daniel'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_request_skips_token_query(self):
+        """Test that only the first request looks up the token"""
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_invalid_token_rejected(self):
+        """Test that an unknown token is not authenticated"""
+        self.client.credentials(HTTP_AUTHORIZATION='Token wrong')
+        res = self.client.get(MOVIES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """Test that deleting a token invalidates the cached user"""
+        self.client.get(MOVIES_URL)
+        self.token.delete()
+
+        res = self.client.get(MOVIES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """Test that deactivating a user invalidates the cached user"""
+        self.client.get(MOVIES_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(MOVIES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_refreshes_cached_user(self):
+        """Test that updating the profile is visible on the next request"""
+        self.client.get(ME_URL)
+        self.client.patch(ME_URL, {'name': 'New Name'})
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'New Name')
+
+    @override_settings(AUTH_TOKEN_CACHE_TTL=0)
+    def test_cache_disabled(self):
+        """Test that every request looks up the token without a cache"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+    @override_settings(
+        AUTH_TOKEN_CACHE_ALIAS='tokens',
+        CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'tokens': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'tokens',
+            },
+        }
+    )
+    def test_shared_cache_backend(self):
+        """Test caching and invalidation through a Django cache"""
+        self.client.get(ME_URL)
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(MOVIES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_shared_default_cache_used(self):
+        """Test that a shared default cache is used without an alias"""
+        self.assertIsInstance(get_token_cache(), LocalTokenCache)
+
+        with tempfile.TemporaryDirectory() as location, self.settings(CACHES={
+            'default': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': location,
+            },
+        }):
+            self.assertIsInstance(get_token_cache(), SharedTokenCache)
+
+        self.assertIsInstance(get_token_cache(), LocalTokenCache)
+
+
+class LocalTokenCacheTests(TestCase):
+    """Test the in-process token cache"""
+
+    def setUp(self):
+        self.users = [
+            get_user_model()(pk=i, email=f'user{i}@tuemail.com')
+            for i in range(3)
+        ]
+
+    def test_least_recently_used_evicted(self):
+        """Test that the cache never grows beyond its size"""
+        cache = LocalTokenCache(max_size=2, ttl=60)
+        cache.set('a', self.users[0])
+        cache.set('b', self.users[1])
+        cache.get('a')
+        cache.set('c', self.users[2])
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a').pk, 0)
+
+    @patch('time.monotonic')
+    def test_entries_expire(self, monotonic):
+        """Test that entries are dropped after their time to live"""
+        cache = LocalTokenCache(max_size=2, ttl=60)
+        monotonic.return_value = 100
+        cache.set('a', self.users[0])
+
+        monotonic.return_value = 159
+        self.assertIsNotNone(cache.get('a'))
+        monotonic.return_value = 160
+        self.assertIsNone(cache.get('a'))
+
+    def test_delete_user(self):
+        """Test dropping every token of a user"""
+        cache = LocalTokenCache(max_size=5, ttl=60)
+        cache.set('a', self.users[0])
+        cache.set('b', self.users[0])
+        cache.set('c', self.users[1])
+
+        cache.delete_user(0)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
@@ -1,23 +1,206 @@
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import TestCase, override_settings
+
+from core.management.commands.clean_media import scan_files
+from core.management.commands.loadtest import SCENARIOS
+from core.models import Movie, Tag
 
 
 class CommandTests(TestCase):
 
     def test_wait_for_db_ready(self):
         """Test waiting for db when db is avaliable"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.return_value = True
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper'
+                   '.ensure_connection') as ec:
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(ec.call_count, 1)
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
-        """Test waiting for db"""
-        with patch('django.db.utils.ConnectionHandler.__getitem__') as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
-            call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+        """Test waiting for db backs off until a query succeeds"""
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper'
+                   '.ensure_connection') as ec:
+            ec.side_effect = [OperationalError] * 5 + [None]
+            call_command('wait_for_db', stdout=StringIO())
+            self.assertEqual(ec.call_count, 6)
+
+        delays = [call[0][0] for call in ts.call_args_list]
+        self.assertEqual(delays, [0.5, 1, 2, 4, 5])
+
+    @patch('core.management.commands.wait_for_db.database_ready',
+           return_value=False)
+    def test_wait_for_db_timeout(self, ready):
+        """Test waiting for db fails once the timeout is reached"""
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+    def test_benchmark_token_auth(self):
+        """Test the token authentication benchmark reports both backends"""
+        out = StringIO()
+        call_command('benchmark', 'auth', iterations=5, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('TokenAuthentication '))
+        self.assertIn('1.00 queries/op', lines[0])
+        self.assertTrue(lines[1].startswith('CachedTokenAuthentication '))
+        self.assertIn('0.20 queries/op', lines[1])
+
+    def test_benchmark_connections(self):
+        """Test the connection benchmark compares both connection modes"""
+        out = StringIO()
+        call_command('benchmark', 'connections', iterations=5, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('new connection per request '))
+        self.assertTrue(lines[1].startswith('persistent connection '))
+        self.assertIn('1.00 queries/op', lines[1])
+
+    def test_seed_data(self):
+        """Test generating users with tokens, tags and tagged movies"""
+        out = StringIO()
+        call_command(
+            'seed_data', users=3, movies=10, tags=4, tags_per_movie=2,
+            batch_size=7, stdout=out
+        )
+
+        users = get_user_model().objects.filter(auth_token__isnull=False)
+        self.assertEqual(users.count(), 3)
+        self.assertEqual(Tag.objects.count(), 12)
+        self.assertEqual(Movie.objects.count(), 30)
+        self.assertEqual(Movie.tags.through.objects.count(), 60)
+        movie = Movie.objects.first()
+        self.assertEqual({tag.user_id for tag in movie.tags.all()},
+                         {movie.user_id})
+        self.assertIn('Created 3 users, 12 tags, 30 movies', out.getvalue())
+
+    def test_loadtest(self):
+        """Test the load test reports every scenario and rolls back"""
+        call_command('seed_data', users=2, movies=5, stdout=StringIO())
+        movies = Movie.objects.count()
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command(
+                'loadtest', requests=4, output=output.name, stdout=StringIO()
+            )
+            report = json.load(output)
+
+        self.assertEqual(
+            [result['scenario'] for result in report['results']],
+            list(SCENARIOS)
+        )
+        for result in report['results']:
+            self.assertEqual(result['errors'], 0, result['scenario'])
+            self.assertGreater(result['queries_per_request'], 0)
+        self.assertEqual(report['dataset']['movies'], movies)
+        self.assertEqual(Movie.objects.count(), movies)
+
+    def test_loadtest_without_seed_data(self):
+        """Test that the load test asks for seed data when there is none"""
+        with self.assertRaisesMessage(CommandError, 'run seed_data first'):
+            call_command('loadtest', stdout=StringIO())
+
+
+class CleanMediaCommandTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.settings = override_settings(MEDIA_ROOT=self.media.name)
+        self.settings.enable()
+        user = get_user_model().objects.create_user(
+            'test@tuemail.com',
+            'testpassword'
+        )
+        self.movie = Movie.objects.create(
+            user=user,
+            title='Titanic',
+            time_minutes=194,
+            ticket_price_USD=5.00,
+            image='uploads/movie/ab/cd/used.jpg'
+        )
+        self.files = [
+            'uploads/movie/ab/cd/used.jpg',
+            'uploads/movie/ab/cd/used.jpg.thumbnail-160.jpg',
+            'uploads/movie/ab/ef/orphan.jpg',
+            'uploads/movie/ab/ef/orphan.jpg.thumbnail-160.jpg',
+            'uploads/movie/legacy.png',
+        ]
+        for name in self.files:
+            path = os.path.join(self.media.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'image')
+            os.utime(path, (0, 0))
+
+    def tearDown(self):
+        self.settings.disable()
+        self.media.cleanup()
+
+    def remaining(self):
+        return [
+            name for name in self.files
+            if os.path.exists(os.path.join(self.media.name, name))
+        ]
+
+    def test_clean_media_deletes_orphans(self):
+        """Test that images and variants no movie refers to are deleted"""
+        out = StringIO()
+        call_command('clean_media', batch_size=2, stdout=out)
+
+        self.assertEqual(self.remaining(), self.files[:2])
+        self.assertIn('Scanned 5 files', out.getvalue())
+        self.assertIn('3 orphaned', out.getvalue())
+        self.assertIn('3 deleted', out.getvalue())
+
+    def test_clean_media_dry_run(self):
+        """Test that a dry run lists orphans without deleting them"""
+        out = StringIO()
+        call_command('clean_media', dry_run=True, verbosity=2, stdout=out)
+
+        self.assertEqual(self.remaining(), self.files)
+        self.assertIn('uploads/movie/legacy.png', out.getvalue())
+        self.assertIn('0 deleted', out.getvalue())
+
+    def test_clean_media_keeps_recent_files(self):
+        """Test that files written recently are not deleted"""
+        os.utime(os.path.join(self.media.name, self.files[2]))
+
+        call_command('clean_media', stdout=StringIO())
+
+        self.assertEqual(self.remaining(), self.files[:3])
+
+    @patch('time.sleep')
+    def test_clean_media_rate_limit(self, sleep):
+        """Test that deletions are spread out to honour the rate limit"""
+        call_command('clean_media', max_rate=1, stdout=StringIO())
+
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(self.remaining(), self.files[:2])
+
+    def test_clean_media_rate_limit_after_slow_scan(self):
+        """Test that time spent scanning does not count toward the limit"""
+        clock = {'now': 0.0}
+
+        def slow_scan(path):
+            for entry in scan_files(path):
+                clock['now'] += 3600
+                yield entry
+
+        def sleep(seconds):
+            clock['now'] += seconds
+
+        with patch('time.monotonic', side_effect=lambda: clock['now']), \
+                patch('time.sleep', side_effect=sleep) as sleeps, \
+                patch('core.management.commands.clean_media.scan_files',
+                      slow_scan):
+            call_command('clean_media', max_rate=1, stdout=StringIO())
+
+        self.assertEqual([call[0][0] for call in sleeps.call_args_list],
+                         [1, 1])
+        self.assertEqual(self.remaining(), self.files[:2])
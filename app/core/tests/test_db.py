@@ -0,0 +1,86 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.db.utils import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.db import check_connections, mark_connections_idle
+
+
+READY_URL = reverse('ready')
+
+
+class ReadinessTests(TestCase):
+
+    def test_ready(self):
+        """Test the readiness probe succeeds when the database answers"""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'databases': {'default': True}})
+
+    def test_not_ready(self):
+        """Test the readiness probe fails when the database is down"""
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper'
+                   '.ensure_connection', side_effect=OperationalError):
+            res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {'databases': {'default': False}})
+
+
+class ConnectionHealthCheckTests(TransactionTestCase):
+
+    def setUp(self):
+        connection.ensure_connection()
+        self.settings_dict = connection.settings_dict
+        connection.settings_dict = dict(
+            self.settings_dict, CONN_HEALTH_CHECKS=True
+        )
+        connection.idle_since = None
+
+    def tearDown(self):
+        connection.settings_dict = self.settings_dict
+
+    def test_unusable_connection_closed(self):
+        """Test that a dropped persistent connection is closed"""
+        with patch.object(connection, 'is_usable', return_value=False), \
+                patch.object(connection, 'close') as close:
+            check_connections()
+
+        close.assert_called_once()
+
+    def test_usable_connection_kept(self):
+        """Test that a working persistent connection is reused"""
+        with patch.object(connection, 'close') as close:
+            check_connections()
+
+        close.assert_not_called()
+
+    def test_recently_used_connection_not_checked(self):
+        """Test that connections used in the last few seconds are trusted"""
+        mark_connections_idle()
+        with patch.object(connection, 'is_usable') as is_usable:
+            check_connections()
+
+        is_usable.assert_not_called()
+
+    @override_settings(DB_HEALTH_CHECK_IDLE_SECONDS=10)
+    def test_idle_connection_checked(self):
+        """Test that connections idle past the threshold are checked"""
+        mark_connections_idle()
+        connection.idle_since -= 11
+        with patch.object(connection, 'is_usable', return_value=True) \
+                as is_usable:
+            check_connections()
+
+        is_usable.assert_called_once()
+
+    def test_requests_check_only_idle_connections(self):
+        """Test that back to back requests do not ping the database"""
+        self.client.get(READY_URL)
+        with patch.object(connection, 'is_usable') as is_usable:
+            self.client.get(READY_URL)
+
+        is_usable.assert_not_called()
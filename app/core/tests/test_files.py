@@ -0,0 +1,106 @@
+import hashlib
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from core.files import ContentAddressedStorage, HashingUploadHandler
+from core.models import Movie
+
+
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.storage = ContentAddressedStorage(location=self.root.name)
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def test_save_names_file_by_content_hash(self):
+        """Test that files are stored under a sharded content hash"""
+        digest = hashlib.sha256(b'poster').hexdigest()
+
+        name = self.storage.save('uploads/movie/a.JPG', ContentFile(b'poster'))
+
+        self.assertEqual(
+            name,
+            f'uploads/movie/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        )
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'poster')
+
+    def test_identical_content_stored_once(self):
+        """Test that saving the same content twice shares one file"""
+        first = self.storage.save('uploads/movie/a.jpg', ContentFile(b'x'))
+        second = self.storage.save('uploads/movie/b.jpg', ContentFile(b'x'))
+        other = self.storage.save('uploads/movie/c.jpg', ContentFile(b'y'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        directory = os.path.dirname(self.storage.path(first))
+        self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_saved_digest_is_trusted(self):
+        """Test that a digest computed while uploading is not recomputed"""
+        upload = SimpleUploadedFile('a.jpg', b'poster')
+        upload.sha256 = 'ab' * 32
+
+        name = self.storage.save('uploads/movie/a.jpg', upload)
+
+        self.assertEqual(name, f'uploads/movie/ab/ab/{"ab" * 32}.jpg')
+
+
+class HashingUploadHandlerTests(TestCase):
+
+    def test_upload_hashed_in_chunks(self):
+        """Test that the handler hashes every chunk it writes to disk"""
+        handler = HashingUploadHandler()
+        handler.new_file('image', 'a.jpg', 'image/jpeg', None)
+        handler.receive_data_chunk(b'post', 0)
+        handler.receive_data_chunk(b'er', 4)
+
+        upload = handler.file_complete(6)
+
+        self.assertEqual(upload.sha256, hashlib.sha256(b'poster').hexdigest())
+        self.assertTrue(os.path.exists(upload.temporary_file_path()))
+        upload.close()
+
+
+class SharedImageFieldTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@tuemail.com',
+            'testpassword'
+        )
+
+    def sample_movie(self):
+        movie = Movie.objects.create(
+            user=self.user,
+            title='Titanic',
+            time_minutes=194,
+            ticket_price_USD=5.00
+        )
+        movie.image.save('a.jpg', ContentFile(b'poster'))
+        return movie
+
+    def test_shared_file_kept_until_last_reference(self):
+        """Test that a shared image is only deleted with its last movie"""
+        first = self.sample_movie()
+        second = self.sample_movie()
+        path = first.image.path
+        self.assertEqual(first.image.name, second.image.name)
+
+        first.image.delete()
+
+        first.refresh_from_db()
+        self.assertFalse(first.image)
+        self.assertTrue(os.path.exists(path))
+
+        second.image.delete()
+
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,167 @@
+import gc
+import json
+import os
+import tempfile
+import threading
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import metrics
+
+
+METRICS_URL = reverse('metrics')
+
+
+def sample(text, name):
+    """Return the value of the sample line starting with `name`"""
+    for line in text.splitlines():
+        if line.startswith(name + ' '):
+            return float(line.rsplit(' ', 1)[1])
+
+
+@override_settings(METRICS_TOKEN='scraper', MOVIE_LIST_CACHE_TTL=300)
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        metrics.reset()
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def scrape(self):
+        response = APIClient().get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer scraper'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_request_metrics(self):
+        """Test that requests are counted, timed and labelled by route"""
+        self.client.get(reverse('movie:movie-list'))
+        self.client.get(reverse('movie:movie-list'))
+        self.client.get(reverse('movie:movie-detail', args=[999]))
+
+        text = self.scrape()
+        route = 'route="movie:movie-list"'
+        self.assertEqual(sample(
+            text, f'http_requests_total{{{route},method="GET",status="200"}}'
+        ), 2)
+        self.assertEqual(sample(
+            text, 'http_requests_total{route="movie:movie-detail",'
+                  'method="GET",status="404"}'
+        ), 1)
+        self.assertEqual(sample(
+            text, f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}'
+        ), 2)
+        self.assertEqual(
+            sample(text, f'http_request_duration_seconds_count{{{route}}}'), 2
+        )
+        self.assertGreater(sample(text, f'db_queries_total{{{route}}}'), 0)
+        self.assertEqual(sample(
+            text, 'cache_requests_total{cache="movie_list",result="hit"}'
+        ), 1)
+        self.assertEqual(sample(
+            text, 'cache_requests_total{cache="auth_token",result="hit"}'
+        ), 2)
+
+    def test_histogram_buckets_cumulative(self):
+        """Test that latency buckets count every request at or below them"""
+        with override_settings(METRICS_LATENCY_BUCKETS=(0.1, 1)):
+            for seconds in (0.05, 0.1, 0.5, 3):
+                metrics.observe_request('tag-list', 'GET', 200, seconds, 1)
+            text = metrics.render(metrics.collect())
+
+        bucket = 'http_request_duration_seconds_bucket{route="tag-list",le='
+        self.assertEqual(sample(text, bucket + '"0.1"}'), 2)
+        self.assertEqual(sample(text, bucket + '"1.0"}'), 3)
+        self.assertEqual(sample(text, bucket + '"+Inf"}'), 4)
+        self.assertEqual(sample(
+            text, 'http_request_duration_seconds_sum{route="tag-list"}'
+        ), 3.65)
+
+    def test_threads_counted(self):
+        """Test that counts recorded from many threads are all collected"""
+        def record():
+            for _ in range(1000):
+                metrics.record_cache('test', True)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(metrics.collect()[('cache', 'test', 'hit')], 4000)
+
+    def test_finished_threads_merged(self):
+        """Test that finished threads keep their counts but not their shard"""
+        shards = len(metrics._shards)
+        for _ in range(50):
+            thread = threading.Thread(
+                target=metrics.record_cache, args=('test', True)
+            )
+            thread.start()
+            thread.join()
+        del thread
+        gc.collect()
+
+        self.assertLessEqual(len(metrics._shards), shards)
+        self.assertEqual(metrics.collect()[('cache', 'test', 'hit')], 50)
+
+    def test_unknown_methods_grouped(self):
+        """Test that non-standard methods share the OTHER label"""
+        for method in ('GET', 'FOO', 'BAR'):
+            metrics.observe_request('tag-list', method, 405, 0.01, 0)
+
+        values = metrics.collect()
+
+        self.assertEqual(values[('requests', 'tag-list', 'OTHER', '405')], 2)
+        self.assertEqual(values[('requests', 'tag-list', 'GET', '405')], 1)
+
+    def test_processes_aggregated(self):
+        """Test that snapshots of other worker processes are summed"""
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_DIR=directory):
+            with open(os.path.join(directory, '1-other.json'), 'w') as other:
+                json.dump([[['cache', 'test', 'hit'], 5]], other)
+            metrics.record_cache('test', True)
+
+            values = metrics.collect()
+
+            self.assertEqual(values[('cache', 'test', 'hit')], 6)
+            self.assertEqual(len(os.listdir(directory)), 2)
+
+    def test_token_required(self):
+        """Test that the scrape endpoint checks the bearer token"""
+        response = APIClient().get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer wrong'
+        )
+        self.assertEqual(response.status_code, 401)
+
+        self.scrape()
+
+    @override_settings(METRICS_TOKEN='')
+    def test_hidden_without_token(self):
+        """Test that without METRICS_TOKEN the endpoint is debug only"""
+        response = APIClient().get(METRICS_URL)
+        self.assertEqual(response.status_code, 404)
+
+        with self.settings(DEBUG=True):
+            response = APIClient().get(METRICS_URL)
+        self.assertEqual(response.status_code, 200)
+
+    def test_label_values_escaped(self):
+        """Test that quotes and newlines in labels are escaped"""
+        metrics.record_cache('a"b\nc', False)
+
+        text = metrics.render(metrics.collect())
+
+        self.assertIn('cache="a\\"b\\nc",result="miss"} 1', text)
@@ -0,0 +1,288 @@
+import gzip
+import json
+import os
+import pstats
+import tempfile
+import zlib
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, \
+    override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from core.middleware import CompressionMiddleware, accepted_encoding
+from core.models import Movie
+from core.renderers import CompactJSONRenderer
+from core.timing import RequestTimer, current_timer, span
+
+
+CONTENT = b'{"title":"Sample movie"},' * 100
+
+
+def json_response(content):
+    return HttpResponse(content, content_type='application/json')
+
+
+@override_settings(API_COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(SimpleTestCase):
+
+    def process(self, response, accept_encoding='gzip, deflate'):
+        request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_accepted_encoding(self):
+        """Test negotiating the preferred accepted coding"""
+        encodings = ['gzip', 'deflate']
+        self.assertEqual(accepted_encoding('gzip, deflate', encodings), 'gzip')
+        self.assertEqual(
+            accepted_encoding('gzip;q=0.5, deflate', encodings), 'deflate'
+        )
+        self.assertEqual(accepted_encoding('*;q=0.1', encodings), 'gzip')
+        self.assertIsNone(accepted_encoding('gzip;q=0, br', encodings))
+        self.assertIsNone(accepted_encoding('', encodings))
+
+    def test_gzip_response(self):
+        """Test that large responses are gzipped for clients accepting it"""
+        response = self.process(json_response(CONTENT))
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response.content), CONTENT)
+        self.assertEqual(
+            response['Content-Length'], str(len(response.content))
+        )
+
+    def test_deflate_response(self):
+        """Test that deflate is used when the client prefers it"""
+        response = self.process(json_response(CONTENT), 'deflate, gzip;q=0.5')
+
+        self.assertEqual(response['Content-Encoding'], 'deflate')
+        self.assertEqual(zlib.decompress(response.content), CONTENT)
+
+    def test_small_response_not_compressed(self):
+        """Test that responses below the size threshold are left alone"""
+        response = self.process(json_response(CONTENT[:1000]))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_media_not_compressed(self):
+        """Test that already compressed media types are left alone"""
+        response = self.process(
+            HttpResponse(CONTENT, content_type='image/jpeg')
+        )
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, CONTENT)
+
+    def test_html_not_compressed(self):
+        """Test that HTML pages, which may hold CSRF tokens, are left alone"""
+        response = self.process(HttpResponse(CONTENT))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, CONTENT)
+
+    def test_not_accepted(self):
+        """Test that clients not accepting a coding get identity"""
+        response = self.process(json_response(CONTENT), 'br')
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_streaming_response(self):
+        """Test that streaming responses are compressed chunk by chunk"""
+        response = self.process(
+            StreamingHttpResponse(
+                iter([CONTENT, CONTENT]), content_type='application/x-ndjson'
+            )
+        )
+        chunks = list(response.streaming_content)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), CONTENT * 2)
+
+
+class CompactJSONRendererTests(SimpleTestCase):
+
+    def test_indent_ignored(self):
+        """Test that the compact renderer never indents"""
+        class View(APIView):
+            renderer_classes = (CompactJSONRenderer,)
+
+            def get(self, request):
+                return Response({'id': 1, 'tags': [1, 2]})
+
+        request = APIRequestFactory().get(
+            '/', HTTP_ACCEPT='application/json; indent=4'
+        )
+        response = View.as_view()(request).render()
+
+        self.assertEqual(response.content, b'{"id":1,"tags":[1,2]}')
+
+
+class CompressionBenchmarkTests(TestCase):
+
+    def test_benchmark_compression(self):
+        """Test the compression benchmark reports sizes of each step"""
+        out = StringIO()
+        call_command('benchmark', 'compression', iterations=2, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[2].startswith('gzip level '))
+        self.assertIn('saved', lines[2])
+
+
+class RequestTimingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        Movie.objects.create(
+            user=self.user, title='Titanic', time_minutes=194,
+            ticket_price_USD='5.50'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def metrics(self, response):
+        """Return the Server-Timing metrics of a response by name"""
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_server_timing_header(self):
+        """Test that API responses report query, serialize and render time"""
+        response = self.client.get(reverse('movie:movie-list'))
+
+        metrics = self.metrics(response)
+        self.assertEqual(
+            set(metrics), {'db', 'serialize', 'render', 'total'}
+        )
+        self.assertRegex(metrics['db']['desc'], r'^"[1-9]\d* queries"$')
+        self.assertGreater(float(metrics['total']['dur']), 0)
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request_logged(self):
+        """Test that slow requests are logged as JSON with their SQL"""
+        url = reverse('movie:movie-list')
+        with self.assertLogs('core.slow_requests', 'WARNING') as logs:
+            self.client.get(url)
+
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['path'], url)
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(entry['queries'], len(entry['sql']))
+        self.assertIn('core_movie', ' '.join(q['sql'] for q in entry['sql']))
+        self.assertIn('serialize', entry['spans'])
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_timing_disabled(self):
+        """Test that the middleware is left out when timing is off"""
+        response = self.client.get(reverse('movie:movie-list'))
+
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertIsNone(current_timer())
+
+    def test_nested_spans_counted_once(self):
+        """Test that a span nested in one of the same name is not added"""
+        timer = RequestTimer()
+        with timer.span('serialize'):
+            with timer.span('serialize'):
+                pass
+            outer = timer.elapsed()
+
+        self.assertLessEqual(timer.spans['serialize'], outer)
+        with span('serialize'):
+            self.assertIsNone(current_timer())
+
+
+class ProfilingMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings = override_settings(
+            PROFILE_DIR=self.directory.name,
+            PROFILE_REQUEST_SECRET='s3cret',
+            PROFILE_SAMPLE_RATE=0,
+            PROFILE_MAX_FILES=2,
+        )
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        self.directory.cleanup()
+
+    def profiles(self):
+        return sorted(
+            name for name in os.listdir(self.directory.name)
+            if name.endswith('.prof')
+        )
+
+    def test_profile_requested_by_header(self):
+        """Test that a request with the secret header is profiled"""
+        response = self.client.get(
+            reverse('movie:movie-list'), HTTP_X_PROFILE='s3cret'
+        )
+
+        name = response['X-Profile-Id']
+        self.assertIn('-MovieViewSet.list-', name)
+        self.assertEqual(self.profiles(), [f'{name}.prof'])
+        path = os.path.join(self.directory.name, name)
+        self.assertGreater(pstats.Stats(f'{path}.prof').total_calls, 0)
+        with open(f'{path}.json') as details:
+            details = json.load(details)
+        self.assertEqual(details['view'], 'movie.views.MovieViewSet')
+        self.assertEqual(details['action'], 'list')
+        self.assertEqual(details['status'], 200)
+
+    def test_wrong_secret_not_profiled(self):
+        """Test that a header without the secret does not profile"""
+        response = self.client.get(
+            reverse('movie:movie-list'), HTTP_X_PROFILE='guess'
+        )
+
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertEqual(self.profiles(), [])
+
+    def test_sampled_requests_rotated(self):
+        """Test sampling every request keeps only the newest profiles"""
+        with override_settings(PROFILE_SAMPLE_RATE=1):
+            for _ in range(3):
+                self.client.post(reverse('user:token'), {
+                    'email': 'test@youremail.com', 'password': 'testpass'
+                })
+
+        profiles = self.profiles()
+        self.assertEqual(len(profiles), 2)
+        self.assertIn('-CreateTokenView.post-', profiles[0])
+        self.assertEqual(len(os.listdir(self.directory.name)), 4)
+
+    def test_profiling_disabled(self):
+        """Test that no request is profiled without a trigger configured"""
+        with override_settings(PROFILE_REQUEST_SECRET=''):
+            response = self.client.get(
+                reverse('movie:movie-list'), HTTP_X_PROFILE=''
+            )
+
+        self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertEqual(self.profiles(), [])
@@ -0,0 +1,45 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class MigrationTests(TransactionTestCase):
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def tearDown(self):
+        self.migrate(
+            MigrationExecutor(connection).loader.graph.leaf_nodes('core')[0]
+        )
+
+    def test_duplicate_tags_merged(self):
+        """Test that duplicate tags are merged before the unique constraint"""
+        apps = self.migrate(('core', '0005_movie_filter_indexes'))
+        User = apps.get_model('core', 'User')
+        Tag = apps.get_model('core', 'Tag')
+        Movie = apps.get_model('core', 'Movie')
+        user = User.objects.create(email='test@youremail.com')
+        kept = Tag.objects.create(user=user, name='Drama')
+        duplicate = Tag.objects.create(user=user, name='Drama')
+        movie = Movie.objects.create(
+            user=user, title='Rodrigo D', time_minutes=90,
+            ticket_price_USD='5.00'
+        )
+        movie.tags.add(duplicate)
+
+        apps = self.migrate(('core', '0006_tag_user_name_unique'))
+
+        Tag = apps.get_model('core', 'Tag')
+        Movie = apps.get_model('core', 'Movie')
+        self.assertEqual(
+            list(Tag.objects.values_list('id', flat=True)), [kept.id]
+        )
+        self.assertEqual(
+            list(Movie.objects.get(id=movie.id).tags
+                 .values_list('id', flat=True)),
+            [kept.id]
+        )
@@ -1,4 +1,5 @@
 from unittest.mock import patch
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
@@ -54,6 +55,37 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(tag), tag.name)
 
+    def test_tag_name_unique_per_user(self):
+        """Test that a user cannot have two tags with the same name"""
+        user = sample_user()
+        models.Tag.objects.create(user=user, name='Horror')
+        models.Tag.objects.create(
+            user=sample_user('other@tuemail.com'),
+            name='Horror'
+        )
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.Tag.objects.create(user=user, name='Horror')
+
+    def test_get_or_create_tag_names(self):
+        """Test resolving tag names, creating only the missing ones"""
+        user = sample_user()
+        horror = models.Tag.objects.create(user=user, name='Horror')
+
+        with self.assertNumQueries(4):
+            tags = models.Tag.objects.get_or_create_names(
+                user, ['Horror', 'Drama', 'Comedy']
+            )
+
+        self.assertEqual(tags['Horror'], horror)
+        self.assertEqual(
+            set(models.Tag.objects.values_list('name', flat=True)),
+            {'Horror', 'Drama', 'Comedy'}
+        )
+        with self.assertNumQueries(1):
+            again = models.Tag.objects.get_or_create_names(user, ['Drama'])
+        self.assertEqual(again['Drama'], tags['Drama'])
+
     def test_movie_str(self):
         """Test the movie string representation"""
         movie = models.Movie.objects.create(
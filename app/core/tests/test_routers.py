@@ -0,0 +1,197 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import routers
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Movie, Tag
+
+
+MOVIES_URL = reverse('movie:movie-list')
+
+
+def sample_movie(user, title, using='default', **params):
+    return Movie.objects.using(using).create(
+        user=user, title=title, time_minutes=100, ticket_price_USD='5.00',
+        **params
+    )
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica'], MOVIE_LIST_CACHE_TTL=0,
+    REPLICA_STICKY_SECONDS=10, REPLICA_STICKY_CACHE_ALIAS='shared'
+)
+class ReplicaRoutingTests(TestCase):
+    """Test routing reads to a second SQLite database standing in for a
+    replica; rows written to it directly play the part of replicated data
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        # Pins have to be in a cache shared between processes
+        cls.caches = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'shared': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': os.path.join(cls.directory.name, 'cache'),
+            },
+        })
+        cls.caches.enable()
+        connections.databases['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(cls.directory.name, 'replica.sqlite3'),
+        }
+        call_command('migrate', database='replica', verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        cls.caches.disable()
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        routers._health.clear()
+        caches['shared'].clear()
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        token = Token.objects.create(user=self.user)
+        self.user.save(using='replica')
+        token.save(using='replica')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def tearDown(self):
+        for model in (Movie, Tag, Token, get_user_model()):
+            model.objects.using('replica').all().delete()
+
+    def titles(self):
+        res = self.client.get(MOVIES_URL)
+        self.assertEqual(res.status_code, 200)
+        return [movie['title'] for movie in res.data['results']]
+
+    def test_safe_requests_read_replica(self):
+        """Test that movie lists are read from the replica"""
+        sample_movie(self.user, 'Primary movie')
+        sample_movie(self.user, 'Replica movie', using='replica')
+
+        self.assertEqual(self.titles(), ['Replica movie'])
+
+    def test_reads_stick_to_primary_after_write(self):
+        """Test that clients read their own writes until the pin expires"""
+        res = self.client.post(MOVIES_URL, {
+            'title': 'New movie', 'time_minutes': 90,
+            'ticket_price_USD': '4.00',
+        })
+        self.assertEqual(res.status_code, 201)
+        self.assertFalse(Movie.objects.using('replica').exists())
+
+        self.assertEqual(self.titles(), ['New movie'])
+
+        caches['shared'].clear()
+        self.assertEqual(self.titles(), [])
+
+    def test_new_token_reads_primary(self):
+        """Test that a token is usable before it reaches the replica"""
+        user = get_user_model().objects.create_user(
+            'new@youremail.com', 'testpass'
+        )
+        user.save(using='replica')
+        client = APIClient()
+        res = client.post(
+            reverse('user:token'),
+            {'email': 'new@youremail.com', 'password': 'testpass'}
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(
+            Token.objects.using('replica').filter(user=user).exists()
+        )
+
+        client.credentials(HTTP_AUTHORIZATION=f'Token {res.data["token"]}')
+        res = client.get(reverse('user:me'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['email'], 'new@youremail.com')
+
+    def test_export_streams_from_replica(self):
+        """Test that the export body is read from the replica it was
+        routed to, after the middleware has returned
+        """
+        sample_movie(self.user, 'Primary movie')
+        movie = sample_movie(self.user, 'Replica movie', using='replica')
+        tag = Tag.objects.using('replica').create(user=self.user, name='Drama')
+        Movie.tags.through.objects.using('replica').create(
+            movie=movie, tag=tag
+        )
+
+        res = self.client.get(reverse('movie:movie-export'))
+        self.assertEqual(res.status_code, 200)
+        lines = b''.join(res.streaming_content).decode().splitlines()
+
+        self.assertEqual(len(lines), 1)
+        self.assertIn('"Replica movie"', lines[0])
+        self.assertIn('"tags": ["Drama"]', lines[0])
+
+    def test_unhealthy_replica_falls_back(self):
+        """Test that reads go to the primary when the replica is down"""
+        sample_movie(self.user, 'Primary movie')
+        with patch('core.routers.database_ready', return_value=False):
+            self.assertEqual(self.titles(), ['Primary movie'])
+
+        self.assertEqual(routers._health['replica'][0], False)
+
+    def test_replica_rows_saved_to_primary(self):
+        """Test that objects read from the replica are written to default"""
+        movie = sample_movie(self.user, 'Movie')
+        replicated = sample_movie(
+            self.user, 'Movie', using='replica', id=movie.id
+        )
+
+        replicated.title = 'Renamed'
+        replicated.save()
+
+        self.assertEqual(Movie.objects.get().title, 'Renamed')
+        self.assertEqual(Movie.objects.using('replica').get().title, 'Movie')
+
+    def test_reads_outside_requests_use_primary(self):
+        """Test that code outside a routed request reads from default"""
+        sample_movie(self.user, 'Primary movie')
+
+        self.assertIsNone(routers.read_database())
+        self.assertEqual(Movie.objects.get().title, 'Primary movie')
+
+    @override_settings(REPLICA_STICKY_CACHE_ALIAS='default')
+    def test_local_sticky_cache_refused(self):
+        """Test that pins kept in one process's memory stop startup"""
+        with self.assertRaises(ImproperlyConfigured):
+            ReplicaRoutingMiddleware(lambda request: None)
+
+    def test_ready_without_replica(self):
+        """Test that a replica being down does not fail the probe"""
+        with patch('core.views.database_ready',
+                   side_effect=lambda alias: alias != 'replica'):
+            res = self.client.get(reverse('ready'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            res.json(), {'databases': {'default': True, 'replica': False}}
+        )
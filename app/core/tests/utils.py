@@ -0,0 +1,91 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.models import Movie, Tag
+
+
+def explain(queryset):
+    """Return the query plan of a queryset as text
+
+    Postgres is told to avoid sequential scans so that small test tables
+    still show the plan the indexes allow for a large catalog.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    return queryset.explain()
+
+
+def explain_sql(sql):
+    """Return the query plan of an SQL statement as text, like explain"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+        else:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def create_movies(user, count, tags=(), **params):
+    """Bulk create `count` movies for a user, each linked to `tags`"""
+    defaults = {
+        'title': 'Sample movie',
+        'time_minutes': 120,
+        'ticket_price_USD': 5.00,
+    }
+    defaults.update(params)
+    Movie.objects.bulk_create(
+        Movie(user=user, **defaults) for _ in range(count)
+    )
+    if tags:
+        movie_ids = Movie.objects.filter(user=user).order_by('-id') \
+            .values_list('id', flat=True)[:count]
+        Movie.tags.through.objects.bulk_create(
+            Movie.tags.through(movie_id=movie_id, tag_id=tag.id)
+            for movie_id in movie_ids for tag in tags
+        )
+
+
+class QueryBudgetMixin:
+    """Assert that API calls run a fixed number of queries at any scale
+
+    Subclasses set `self.user` in setUp. `assertQueryBudgetAtScale` grows
+    the user's catalog through `scales` and checks that calling func with
+    the newest movie always runs exactly `budget` queries, so an N+1
+    regression fails the test.
+    """
+    scales = (1, 100, 10000)
+    tags_per_movie = 2
+
+    def assertQueryBudget(self, budget, func):
+        """Assert that calling func runs exactly `budget` queries"""
+        with CaptureQueriesContext(connection) as context:
+            result = func()
+
+        executed = len(context.captured_queries)
+        if executed != budget:
+            queries = '\n'.join(
+                f'{i}. {query["sql"]}'
+                for i, query in enumerate(context.captured_queries, 1)
+            )
+            self.fail(
+                f'{executed} queries executed, {budget} expected\n{queries}'
+            )
+
+        return result
+
+    def assertQueryBudgetAtScale(self, budget, func):
+        """Assert the query budget of func for every catalog size"""
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(self.tags_per_movie)
+        ]
+        total = 0
+        for scale in self.scales:
+            create_movies(self.user, scale - total, tags=tags)
+            total = scale
+            movie = Movie.objects.filter(user=self.user).latest('id')
+            with self.subTest(movies=scale):
+                self.assertQueryBudget(budget, lambda: func(movie))
@@ -0,0 +1,94 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+_local = threading.local()
+
+
+class RequestTimer:
+    """Collect the time a request spends in the database and named spans
+
+    An instance is installed as an execute wrapper on every connection, so
+    it sees each query the request runs; the text and duration of the
+    first `max_queries` are kept for the slow request log.
+    """
+
+    def __init__(self, max_queries=100):
+        self.start = time.perf_counter()
+        self.max_queries = max_queries
+        self.queries = []
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.spans = {}
+        self.active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.query_count += 1
+            self.db_seconds += duration
+            if len(self.queries) < self.max_queries:
+                self.queries.append({
+                    'sql': sql,
+                    'ms': round(duration * 1000, 3),
+                    'database': context['connection'].alias,
+                })
+
+    @contextmanager
+    def span(self, name):
+        """Add the time spent in the with block to the span `name`
+
+        Spans of the same name nested in one another are counted once.
+        """
+        if name in self.active:
+            yield
+            return
+
+        self.active.add(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] = self.spans.get(name, 0.0) + \
+                time.perf_counter() - start
+            self.active.discard(name)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+
+def current_timer():
+    """Return the timer of the request handled by this thread, or None"""
+    return getattr(_local, 'timer', None)
+
+
+def set_timer(timer):
+    _local.timer = timer
+
+
+@contextmanager
+def span(name):
+    """Time the with block as `name` when the request is being timed"""
+    timer = current_timer()
+    if timer is None:
+        yield
+        return
+
+    with timer.span(name):
+        yield
+
+
+class TimedSerializerMixin:
+    """Serializer mixin timing to_representation as the `serialize` span"""
+
+    def to_representation(self, instance):
+        timer = current_timer()
+        if timer is None:
+            return super().to_representation(instance)
+
+        with timer.span('serialize'):
+            return super().to_representation(instance)
@@ -0,0 +1,48 @@
+import hmac
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+from core import metrics as registry
+from core.db import database_ready
+
+
+@require_GET
+def ready(request):
+    """Report whether the databases answer, for load balancer probes
+
+    Replicas are reported but not required, since reads fall back to the
+    primary when they are down.
+    """
+    databases = {alias: database_ready(alias) for alias in connections}
+    required = [
+        ready for alias, ready in databases.items()
+        if alias not in settings.DATABASE_REPLICAS
+    ]
+    status = 200 if all(required) else 503
+
+    return JsonResponse({'databases': databases}, status=status)
+
+
+@require_GET
+def metrics(request):
+    """Serve the request metrics of every worker for Prometheus to scrape
+
+    Scrapers must send METRICS_TOKEN as a bearer token. Without one the
+    endpoint is only served with DEBUG on, as it reveals the traffic of
+    every route.
+    """
+    if not settings.METRICS_TOKEN:
+        if not settings.DEBUG:
+            raise Http404
+    elif not hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', '').encode(),
+            f'Bearer {settings.METRICS_TOKEN}'.encode()):
+        return HttpResponse(status=401)
+
+    return HttpResponse(
+        registry.render(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
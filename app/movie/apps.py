@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class MovieConfig(AppConfig):
     name = 'movie'
+
+    def ready(self):
+        from movie import checks, signals  # noqa: F401
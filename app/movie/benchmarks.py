@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.benchmarks import measure
+from core.middleware import compress
+from core.models import Movie, Tag
+from core.renderers import CompactJSONRenderer
+
+from movie.rows import MovieRowSerializer
+from movie.serializers import MovieSerializer
+from movie.views import MovieViewSet
+
+
+BULK_SIZE = 500
+
+
+def bulk_create(iterations):
+    """Measure movies written per second through the bulk endpoint"""
+    user = get_user_model().objects.create_user(
+        'benchmark@youremail.com',
+        'benchmarkpass'
+    )
+    tags = [
+        Tag.objects.create(user=user, name=f'Tag {i}').id for i in range(5)
+    ]
+    payload = [
+        {
+            'title': f'Movie {i}',
+            'tags': tags[:i % len(tags)],
+            'time_minutes': 90 + i % 60,
+            'ticket_price_USD': '7.50',
+        }
+        for i in range(BULK_SIZE)
+    ]
+    view = MovieViewSet.as_view({'post': 'bulk'})
+    factory = APIRequestFactory()
+
+    def post():
+        request = factory.post('/', payload, format='json')
+        force_authenticate(request, user=user)
+        view(request)
+
+    return [measure(f'bulk create ({BULK_SIZE} movies/request)', post,
+                    iterations, batch=BULK_SIZE)]
+
+
+def _create_catalog(user, count):
+    tags = [
+        Tag.objects.create(user=user, name=f'Tag {i}').id for i in range(2)
+    ]
+    movies = [
+        Movie(user=user, title=f'Movie {i}', time_minutes=90 + i % 60,
+              ticket_price_USD='7.50')
+        for i in range(count)
+    ]
+    Movie.objects.bulk_create_with_tags(
+        movies, [tags] * count, batch_size=1000
+    )
+
+
+def list_serialization(iterations):
+    """Compare MovieSerializer with MovieRowSerializer on `iterations` rows
+
+    Both read the movies and their tags from the database, as a list page
+    does, and are measured in rows per second.
+    """
+    user = get_user_model().objects.create_user(
+        'benchmark@youremail.com',
+        'benchmarkpass'
+    )
+    _create_catalog(user, iterations)
+    queryset = Movie.objects.filter(user=user).order_by('-id')
+
+    def model_serializer():
+        MovieSerializer(
+            queryset.prefetch_related('tags'), many=True, context={}
+        ).data
+
+    def row_serializer():
+        serializer = MovieRowSerializer({})
+        serializer.to_representation(list(serializer.rows(queryset)))
+
+    return [
+        measure(f'MovieSerializer ({iterations} rows)',
+                model_serializer, 1, batch=iterations),
+        measure(f'MovieRowSerializer ({iterations} rows)',
+                row_serializer, 1, batch=iterations),
+    ]
+
+
+def response_compression(iterations):
+    """Measure the size and CPU cost of rendering and compressing a page
+
+    The page holds API_PAGE_SIZE movies; each result notes the bytes the
+    response takes on the wire.
+    """
+    user = get_user_model().objects.create_user(
+        'benchmark@youremail.com',
+        'benchmarkpass'
+    )
+    _create_catalog(user, settings.API_PAGE_SIZE)
+    movies = Movie.objects.filter(user=user).prefetch_related('tags')
+    data = {
+        'next': 'http://localhost/api/movie/movies/?cursor=cD0xMDA%3D',
+        'previous': None,
+        'results': MovieSerializer(movies, many=True, context={}).data,
+    }
+
+    results = []
+    renderers = (
+        ('JSON indent=4', JSONRenderer(), 'application/json; indent=4'),
+        ('compact JSON', CompactJSONRenderer(), 'application/json'),
+    )
+    for name, renderer, media_type in renderers:
+        result = measure(
+            name, lambda: renderer.render(data, media_type), iterations
+        )
+        size = len(renderer.render(data, media_type))
+        result['note'] = f'{size} bytes'
+        results.append(result)
+
+    content = CompactJSONRenderer().render(data)
+    for encoding in settings.API_COMPRESSION_ENCODINGS:
+        level = settings.API_COMPRESSION_LEVEL
+        result = measure(
+            f'{encoding} level {level}',
+            lambda: compress(content, encoding, level),
+            iterations
+        )
+        size = len(compress(content, encoding, level))
+        result['note'] = f'{size} bytes, {len(content) - size} saved'
+        results.append(result)
+
+    return results
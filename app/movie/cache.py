@@ -0,0 +1,90 @@
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from core.metrics import record_cache
+
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.MOVIE_LIST_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f'movie-list-version:{user_id}'
+
+
+def _new_version(user_id):
+    _cache().set(_version_key(user_id), uuid.uuid4().hex, None)
+
+
+def invalidate_user(user_id):
+    """Drop every cached list of a user by moving them to a new version
+
+    Inside a transaction the version moves again on commit: lists other
+    requests cached before the commit still hold the old rows.
+    """
+    if settings.MOVIE_LIST_CACHE_TTL > 0:
+        _new_version(user_id)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: _new_version(user_id))
+
+
+def list_cache_key(request):
+    """Return the cache key of a list request for the current user"""
+    cache = _cache()
+    version_key = _version_key(request.user.pk)
+    version = cache.get(version_key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(version_key, version, None):
+            version = cache.get(version_key)
+
+    url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+    return f'movie-list:{request.user.pk}:{version}:{url}'
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+    record_cache('movie_list', outcome == 'hits')
+
+
+def cache_stats():
+    """Return the list cache hit and miss counters of this process"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+class CachedListMixin:
+    """Serve list responses from a per-user cache of serialized pages
+
+    A hit skips both the query and the serializer. Pages are keyed by the
+    full request URL and by a per-user version that `invalidate_user`
+    replaces whenever that user's movies or tags change.
+    """
+
+    def list(self, request, *args, **kwargs):
+        ttl = settings.MOVIE_LIST_CACHE_TTL
+        if ttl <= 0:
+            return super().list(request, *args, **kwargs)
+
+        key = list_cache_key(request)
+        data = _cache().get(key)
+        if data is not None:
+            _record('hits')
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        _record('misses')
+        response = super().list(request, *args, **kwargs)
+        _cache().set(key, response.data, ttl)
+        response['X-Cache'] = 'MISS'
+        return response
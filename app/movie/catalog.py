@@ -0,0 +1,230 @@
+import csv
+import json
+import time
+from io import StringIO
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from rest_framework.settings import api_settings
+
+from core.models import Movie
+
+from movie.serializers import MovieImportSerializer
+
+
+FIELDS = ('id', 'title', 'tags', 'time_minutes', 'ticket_price_USD', 'link')
+
+
+def join_names(names):
+    """Return tag names as one CSV cell, quoting names that need it"""
+    buffer = StringIO()
+    csv.writer(buffer, lineterminator='').writerow(names)
+    return buffer.getvalue()
+
+
+def split_names(cell):
+    """Return the tag names of a CSV cell written by join_names"""
+    return next(csv.reader([cell]), [])
+
+
+def export_movies(queryset, chunk_size):
+    """Yield lists of up to chunk_size movies as dicts with tag names
+
+    Movies are read with a server-side cursor and the tags of each chunk
+    are loaded with one query, so memory does not depend on the number of
+    movies. The tags are read from the database of queryset.
+    """
+    rows = queryset.values_list(
+        'id', 'title', 'time_minutes', 'ticket_price_USD', 'link'
+    ).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+
+        tags = {}
+        links = Movie.tags.through.objects.using(queryset.db) \
+            .filter(movie_id__in=[row[0] for row in chunk]) \
+            .order_by('tag__name') \
+            .values_list('movie_id', 'tag__name')
+        for movie_id, name in links:
+            tags.setdefault(movie_id, []).append(name)
+
+        yield [
+            {
+                'id': movie_id,
+                'title': title,
+                'tags': tags.get(movie_id, []),
+                'time_minutes': time_minutes,
+                'ticket_price_USD': str(price),
+                'link': link,
+            }
+            for movie_id, title, time_minutes, price, link in chunk
+        ]
+
+
+def ndjson_lines(chunks):
+    """Encode chunks of movies as one JSON object per line"""
+    for chunk in chunks:
+        yield ''.join(
+            json.dumps(movie, cls=DjangoJSONEncoder) + '\n'
+            for movie in chunk
+        )
+
+
+def csv_lines(chunks):
+    """Encode chunks of movies as CSV, starting with the header row"""
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, FIELDS)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writeheader()
+    yield flush()
+    for chunk in chunks:
+        for movie in chunk:
+            writer.writerow(dict(movie, tags=join_names(movie['tags'])))
+        yield flush()
+
+
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+    'csv': (csv_lines, 'text/csv'),
+}
+
+
+def _decode_lines(file, bad_lines):
+    """Yield the lines of a binary file as text
+
+    Lines that are not valid UTF-8 are decoded with replacement characters
+    and their numbers added to bad_lines.
+    """
+    for number, line in enumerate(file, 1):
+        try:
+            yield line.decode('utf-8-sig' if number == 1 else 'utf-8')
+        except UnicodeDecodeError:
+            bad_lines.add(number)
+            yield line.decode('utf-8', 'replace')
+
+
+def read_ndjson(file):
+    """Yield (line number, movie, error) for each line of an NDJSON file"""
+    bad_lines = set()
+    for number, line in enumerate(_decode_lines(file, bad_lines), 1):
+        if number in bad_lines:
+            bad_lines.discard(number)
+            yield number, None, 'Invalid UTF-8.'
+            continue
+        if not line.strip():
+            continue
+
+        try:
+            movie = json.loads(line)
+        except ValueError:
+            yield number, None, 'Invalid JSON.'
+            continue
+        if not isinstance(movie, dict):
+            yield number, None, 'Expected a JSON object.'
+            continue
+
+        yield number, movie, None
+
+
+def read_csv(file):
+    """Yield (line number, movie, error) for each row of a CSV file
+
+    Tag names are read from the tags column as written by join_names, and
+    empty columns past the end of short rows are left out.
+    """
+    bad_lines = set()
+    reader = csv.DictReader(_decode_lines(file, bad_lines))
+    first_line = 2
+    for row in reader:
+        lines = range(first_line, reader.line_num + 1)
+        first_line = reader.line_num + 1
+        if any(line in bad_lines for line in lines):
+            bad_lines.difference_update(lines)
+            yield lines[0], None, 'Invalid UTF-8.'
+            continue
+
+        movie = {
+            key: value for key, value in row.items()
+            if key is not None and value is not None
+        }
+        if 'tags' in movie:
+            movie['tags'] = split_names(movie['tags'])
+        yield lines[0], movie, None
+
+
+IMPORT_FORMATS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+def import_movies(user, rows, batch_size, progress=None):
+    """Create movies for user from (line number, movie, error) tuples
+
+    Rows are validated like the bulk endpoint does and written batch_size
+    at a time, each batch in its own transaction. Invalid rows are skipped
+    and reported by line number, up to MOVIE_IMPORT_MAX_ERRORS of them.
+    progress is called with the report after every batch.
+    """
+    serializer = MovieImportSerializer(many=True, context={'user': user})
+    report = {'rows': 0, 'created': 0, 'failed': 0, 'errors': []}
+    start = time.perf_counter()
+
+    def fail(line, errors):
+        report['failed'] += 1
+        if len(report['errors']) < settings.MOVIE_IMPORT_MAX_ERRORS:
+            report['errors'].append({'line': line, 'errors': errors})
+
+    def update_rate():
+        report['seconds'] = time.perf_counter() - start
+        report['rows_per_second'] = \
+            report['rows'] / max(report['seconds'], 1e-6)
+
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        report['rows'] += len(batch)
+
+        lines = []
+        data = []
+        for line, movie, error in batch:
+            if error:
+                fail(line, {api_settings.NON_FIELD_ERRORS_KEY: [error]})
+            else:
+                # Imported movies are always new, whatever ids they had
+                movie.pop('id', None)
+                lines.append(line)
+                data.append(movie)
+
+        valid = []
+        items, errors = serializer.validate_items(data)
+        for line, attrs, item_errors in zip(lines, items, errors):
+            if item_errors:
+                fail(line, item_errors)
+            else:
+                valid.append(dict(attrs, user=user))
+
+        if valid:
+            with transaction.atomic():
+                serializer.create_movies(valid)
+            report['created'] += len(valid)
+
+        update_rate()
+        if progress is not None:
+            progress(report)
+
+    update_rate()
+    return report
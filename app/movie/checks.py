@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from core.caches import is_shared
+
+
+@register()
+def check_list_cache(app_configs, **kwargs):
+    """Check that cached list pages live in a cache all workers share
+
+    Writes drop the cached pages of a user by moving their version in the
+    cache; in a per-process cache the other workers would keep serving
+    stale pages until they expire.
+    """
+    if settings.MOVIE_LIST_CACHE_TTL <= 0 or \
+            is_shared(settings.MOVIE_LIST_CACHE_ALIAS):
+        return []
+
+    return [Error(
+        'MOVIE_LIST_CACHE_TTL is set but MOVIE_LIST_CACHE_ALIAS names a '
+        'cache local to each process.',
+        hint='Point MOVIE_LIST_CACHE_ALIAS at a shared cache such as '
+             'memcached, or set MOVIE_LIST_CACHE_TTL to 0.',
+        id='movie.E001',
+    )]
@@ -0,0 +1,90 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import ListSerializer
+
+
+class SparseFieldsMixin:
+    """Model serializer mixin building only the fields in context['fields']
+
+    Every field is built when the context has no field list, and nested
+    serializers, which share the context, always build every field.
+    """
+
+    def get_field_names(self, declared_fields, info):
+        names = super().get_field_names(declared_fields, info)
+        requested = self.context.get('fields')
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        if requested is None or parent is not None:
+            return names
+
+        return [name for name in names if name in requested]
+
+
+class SparseFieldsViewMixin:
+    """Trim read responses to the fields listed in ?fields=
+
+    The requested fields are passed to the serializer, and select_fields
+    loads only the model columns behind them and prefetches only the
+    requested relations.
+    """
+    fields_param = 'fields'
+    sparse_actions = ('list', 'retrieve')
+    requested_fields = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.sparse_actions:
+            self.requested_fields = self.get_requested_fields(request)
+
+    def get_requested_fields(self, request):
+        """Return the set of fields asked for, or None for every field"""
+        value = request.query_params.get(self.fields_param)
+        if not value:
+            return None
+
+        requested = {name.strip() for name in value.split(',')} - {''}
+        available = self.get_serializer_class()(context={}).fields
+        unknown = requested.difference(available)
+        if unknown:
+            raise ValidationError({self.fields_param: [
+                f'Unknown fields: {", ".join(sorted(unknown))}. Expected '
+                f'some of: {", ".join(available)}.'
+            ]})
+
+        return requested
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.requested_fields
+        return context
+
+    def select_fields(self, queryset):
+        """Load only what the serializer of this request reads"""
+        columns = {queryset.model._meta.pk.name}
+        relations = []
+        narrow = self.requested_fields is not None
+        for field in self.get_serializer().fields.values():
+            name = field.source.split('.')[0]
+            try:
+                model_field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # Computed from the whole object, so load every column
+                narrow = False
+                continue
+            if model_field.many_to_many or model_field.one_to_many:
+                relations.append(name)
+            else:
+                columns.add(name)
+
+        if narrow:
+            ordering = getattr(self.paginator, 'ordering', None) or ()
+            if isinstance(ordering, str):
+                ordering = (ordering,)
+            columns.update(field.lstrip('-') for field in ordering)
+            queryset = queryset.only(*columns)
+        if relations:
+            queryset = queryset.prefetch_related(*relations)
+
+        return queryset
@@ -0,0 +1,105 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Exists, OuterRef
+from django.utils.translation import ugettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import Movie
+
+
+MovieTag = Movie.tags.through
+
+
+class MovieFilter(BaseFilterBackend):
+    """Filter movies with query parameters
+
+    ?tags=1,2              movies with any of the tags
+    ?tags=1,2&tags_match=all
+                           movies with every one of the tags
+    ?title=word            title contains word, ignoring case
+    ?title_prefix=word     title starts with word
+    ?min_time=&max_time=   time_minutes range, inclusive
+    ?min_price=&max_price= ticket_price_USD range, inclusive
+
+    Every filter is resolved in the list query itself; tag filters use a
+    single EXISTS or grouped subquery on the movie/tag link table.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        if params.get('tags'):
+            queryset = self._filter_tags(
+                queryset,
+                self._params_to_ints(params, 'tags'),
+                params.get('tags_match', 'any')
+            )
+        if params.get('title'):
+            queryset = queryset.filter(title__icontains=params['title'])
+        if params.get('title_prefix'):
+            queryset = queryset.filter(
+                title__startswith=params['title_prefix']
+            )
+
+        ranges = (
+            ('time_minutes', 'min_time', 'max_time', self._param_to_int),
+            ('ticket_price_USD', 'min_price', 'max_price',
+             self._param_to_decimal),
+        )
+        for field, min_param, max_param, convert in ranges:
+            if params.get(min_param):
+                queryset = queryset.filter(**{
+                    f'{field}__gte': convert(params, min_param)
+                })
+            if params.get(max_param):
+                queryset = queryset.filter(**{
+                    f'{field}__lte': convert(params, max_param)
+                })
+
+        return queryset
+
+    def _filter_tags(self, queryset, tag_ids, match):
+        """Keep the movies linked to any or all of the tags"""
+        if match == 'any':
+            links = MovieTag.objects.filter(
+                movie_id=OuterRef('pk'),
+                tag_id__in=tag_ids
+            )
+            return queryset.annotate(has_tags=Exists(links)) \
+                .filter(has_tags=True)
+        if match == 'all':
+            tag_ids = set(tag_ids)
+            movie_ids = MovieTag.objects.filter(tag_id__in=tag_ids) \
+                .values('movie_id') \
+                .annotate(matched=Count('tag_id')) \
+                .filter(matched=len(tag_ids)) \
+                .values('movie_id')
+            return queryset.filter(pk__in=movie_ids)
+
+        raise ValidationError({'tags_match': [_('Expected "any" or "all".')]})
+
+    def _params_to_ints(self, params, name):
+        """Convert a comma separated list of IDs to a list of integers"""
+        try:
+            return [int(str_id) for str_id in params[name].split(',')]
+        except ValueError:
+            raise ValidationError(
+                {name: [_('Expected a comma separated list of ids.')]}
+            )
+
+    def _param_to_int(self, params, name):
+        try:
+            return int(params[name])
+        except ValueError:
+            raise ValidationError({name: [_('A valid integer is required.')]})
+
+    def _param_to_decimal(self, params, name):
+        try:
+            value = Decimal(params[name])
+        except InvalidOperation:
+            value = None
+        if value is None or not value.is_finite():
+            raise ValidationError({name: [_('A valid number is required.')]})
+
+        return value
@@ -0,0 +1,132 @@
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from PIL import Image
+
+from core.models import Change, Movie
+
+from movie.cache import invalidate_user
+
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp', 'PNG': 'png'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_name(image_name, variant, width, image_format):
+    """Return the file name of a variant of an image
+
+    Variants sit next to their image, so the image a variant belongs to is
+    the variant name without its last two suffixes. Image names are content
+    hashes, so a variant name always stands for the same bytes.
+    """
+    extension = FORMAT_EXTENSIONS.get(image_format, image_format.lower())
+    return f'{image_name}.{variant}-{width}.{extension}'
+
+
+def render_variant(image, width, image_format):
+    """Return the bytes of image resized to width and encoded in a format"""
+    if image.width > width:
+        height = max(round(image.height * width / image.width), 1)
+        image = image.resize((width, height), Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    output = BytesIO()
+    image.save(output, image_format, quality=85, optimize=True)
+    return output.getvalue()
+
+
+def _open_image(image_name):
+    storage = Movie._meta.get_field('image').storage
+    with storage.open(image_name) as image_file:
+        image = Image.open(image_file)
+        image.load()
+
+    return image
+
+
+def generate_variants(movie_id, user_id, image_name):
+    """Write the variants of a movie image and record them on the movie
+
+    The movie is only updated if it still has the same image, so a slow
+    job never overwrites the variants of a newer upload. Variants already
+    rendered for the same image, e.g. by another movie, are reused.
+    """
+    variants = {}
+    image = None
+    for variant, (width, image_format) in \
+            settings.MOVIE_IMAGE_VARIANTS.items():
+        name = variant_name(image_name, variant, width, image_format)
+        if not default_storage.exists(name):
+            if image is None:
+                image = _open_image(image_name)
+            name = default_storage.save(
+                name, ContentFile(render_variant(image, width, image_format))
+            )
+        variants[variant] = name
+
+    updated = Movie.objects.filter(pk=movie_id, image=image_name) \
+        .update(image_variants=json.dumps(variants))
+    if updated:
+        Change.objects.record(
+            Change.MOVIE, [Movie(pk=movie_id, user_id=user_id)]
+        )
+        invalidate_user(user_id)
+
+    return variants
+
+
+def _run(movie_id, user_id, image_name):
+    try:
+        generate_variants(movie_id, user_id, image_name)
+    except Exception:
+        logger.exception('Could not generate variants of %s', image_name)
+
+
+def _run_in_worker(movie_id, user_id, image_name):
+    """Generate variants in a worker thread with its own connection"""
+    close_old_connections()
+    try:
+        _run(movie_id, user_id, image_name)
+    finally:
+        connection.close()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.MOVIE_IMAGE_WORKERS,
+                thread_name_prefix='movie-image'
+            )
+    return _executor
+
+
+def schedule_variants(movie):
+    """Generate the variants of a movie image once the upload is committed
+
+    The request only pays for writing the original; resizing happens in
+    the worker pool, or inline when MOVIE_IMAGE_WORKERS is 0.
+    """
+    if not movie.image or not settings.MOVIE_IMAGE_VARIANTS:
+        return
+
+    args = (movie.pk, movie.user_id, movie.image.name)
+    if settings.MOVIE_IMAGE_WORKERS > 0:
+        transaction.on_commit(
+            lambda: _get_executor().submit(_run_in_worker, *args)
+        )
+    else:
+        transaction.on_commit(lambda: _run(*args))
@@ -0,0 +1,19 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class MoviePagination(CursorPagination):
+    """Keyset pagination over the movie primary key"""
+    ordering = '-id'
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+
+
+class TagPagination(MoviePagination):
+    """Keyset pagination over the tag name
+
+    Names are unique per user, so the name alone orders the page and the
+    (user, name) unique index returns it without sorting.
+    """
+    ordering = '-name'
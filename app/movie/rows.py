@@ -0,0 +1,123 @@
+import decimal
+
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from core.models import Movie
+from core.timing import span
+
+from movie.serializers import MovieSerializer
+
+
+def compile_converter(field):
+    """Return a function giving the representation of a column value
+
+    Plain integer, text and decimal fields get a function doing only what
+    their to_representation does for database values; anything else falls
+    back to the field itself.
+    """
+    field_type = type(field)
+    if field_type is serializers.IntegerField:
+        return int
+    if field_type is serializers.CharField:
+        return str
+    if field_type is serializers.DecimalField and not field.localize and \
+            field.decimal_places is not None and \
+            getattr(field, 'coerce_to_string',
+                    api_settings.COERCE_DECIMAL_TO_STRING):
+        exponent = decimal.Decimal('.1') ** field.decimal_places
+        context = decimal.getcontext().copy()
+        if field.max_digits is not None:
+            context.prec = field.max_digits
+        rounding = field.rounding
+
+        def convert_decimal(value):
+            if not isinstance(value, decimal.Decimal):
+                value = decimal.Decimal(str(value).strip())
+            quantized = value.quantize(
+                exponent, rounding=rounding, context=context
+            )
+            return '{0:f}'.format(quantized)
+        return convert_decimal
+
+    return field.to_representation
+
+
+class MovieRowSerializer:
+    """Read-only MovieSerializer(many=True) for movie list pages
+
+    Movie columns are read as tuples with values_list() and tag ids with
+    one query on the link table, then every field is converted by a
+    function compiled once per request. The output is the same data as
+    MovieSerializer gives, including ?fields= trimming.
+    """
+
+    def __init__(self, context):
+        self.columns = ['id']
+        self.fields = []
+        self.tag_fields = []
+        for name, field in MovieSerializer(context=context).fields.items():
+            if field.write_only:
+                continue
+            if field.source == 'tags':
+                self.tag_fields.append(name)
+                self.fields.append((name, None, None))
+                continue
+            if field.source not in self.columns:
+                self.columns.append(field.source)
+            self.fields.append((
+                name,
+                self.columns.index(field.source),
+                compile_converter(field)
+            ))
+
+    def rows(self, queryset):
+        """Return the movies of queryset as named tuples of the columns"""
+        return queryset.prefetch_related(None) \
+            .values_list(*self.columns, named=True)
+
+    def to_representation(self, rows):
+        tags = self.tag_ids(rows) if self.tag_fields else {}
+        data = []
+        with span('serialize'):
+            for row in rows:
+                item = {}
+                for name, index, convert in self.fields:
+                    if index is None:
+                        item[name] = tags.get(row[0], [])
+                    else:
+                        value = row[index]
+                        item[name] = None if value is None else \
+                            convert(value)
+                data.append(item)
+
+        return data
+
+    def tag_ids(self, rows):
+        """Return the ids of the tags of each movie, keyed by movie id"""
+        tags = {}
+        links = Movie.tags.through.objects \
+            .filter(movie_id__in=[row[0] for row in rows]) \
+            .order_by('tag_id') \
+            .values_list('movie_id', 'tag_id')
+        for movie_id, tag_id in links:
+            tags.setdefault(movie_id, []).append(tag_id)
+
+        return tags
+
+
+class RowListMixin:
+    """List movies with MovieRowSerializer instead of model instances"""
+
+    def list(self, request, *args, **kwargs):
+        serializer = MovieRowSerializer(self.get_serializer_context())
+        queryset = serializer.rows(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                serializer.to_representation(page)
+            )
+
+        return Response(serializer.to_representation(queryset))
@@ -1,9 +1,20 @@
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
+from rest_framework.utils import html
+from rest_framework.settings import api_settings
+
+from core.models import Change, Tag, Movie
+from core.timing import TimedSerializerMixin
 
-from core.models import Tag, Movie
+from movie.fieldsets import SparseFieldsMixin
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                    serializers.ModelSerializer):
     """Serializer for tag object"""
 
     class Meta:
@@ -11,29 +22,382 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name')
         read_only_Fields = ('id',)
 
+    def validate_name(self, name):
+        """Check that the user has no other tag with this name"""
+        user = self.context['request'].user
+        if Tag.objects.filter(user=user, name=name).exists():
+            raise serializers.ValidationError(
+                _('A tag with this name already exists.')
+            )
+
+        return name
+
+
+class TagReferenceField(serializers.Field):
+    """A tag given by id, or by name to be created when missing
+
+    Strings made only of ASCII digits are read as ids, since form encoded
+    requests send every id as a string.
+    """
+    default_error_messages = {
+        'invalid': _('Expected a tag id or name.'),
+        'max_length': _(
+            'Ensure tag names have no more than {max_length} characters.'
+        ),
+    }
+    max_length = Tag._meta.get_field('name').max_length
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = data.strip()
+            if data.isascii() and data.isdigit():
+                data = int(data)
+            elif len(data) > self.max_length:
+                self.fail('max_length', max_length=self.max_length)
+        elif isinstance(data, bool) or not isinstance(data, int):
+            self.fail('invalid')
+
+        if not data:
+            self.fail('invalid')
+
+        return data
+
+    def to_representation(self, value):
+        return value.pk
+
+
+class TagNameField(serializers.CharField):
+    """A tag given by name only, whatever characters the name is made of"""
+    default_error_messages = {
+        'invalid': _('Expected a tag name.'),
+    }
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault(
+            'max_length', Tag._meta.get_field('name').max_length
+        )
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid')
+        return super().to_internal_value(data)
+
+
+class TagListField(serializers.ListField):
+    """Tags of a movie, given by id or by name and represented by id
+
+    Ids are listed in ascending order, so the output does not depend on
+    the order the database returns the tags in.
+    """
+    child = TagReferenceField()
 
-class MovieSerializer(serializers.ModelSerializer):
-    """Serialize a movie"""
+    def get_value(self, dictionary):
+        # Form encoded requests leave empty lists out of the payload
+        if html.is_html_input(dictionary) and \
+                self.field_name not in dictionary and \
+                not getattr(self.root, 'partial', False):
+            return []
+        return super().get_value(dictionary)
 
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Tag.objects.all()
-    )
+    def to_representation(self, value):
+        return sorted(tag.pk for tag in value.all())
+
+
+def check_tag_ids(user, tag_lists):
+    """Return the errors of each tag list, checking every id in one query"""
+    tag_ids = {
+        ref for tags in tag_lists for ref in tags if isinstance(ref, int)
+    }
+    known = set()
+    if tag_ids:
+        known.update(Tag.objects.filter(user=user, pk__in=tag_ids)
+                     .values_list('pk', flat=True))
+
+    message = serializers.PrimaryKeyRelatedField \
+        .default_error_messages['does_not_exist']
+    return [
+        [
+            message.format(pk_value=ref) for ref in tags
+            if isinstance(ref, int) and ref not in known
+        ]
+        for tags in tag_lists
+    ]
+
+
+def resolve_tags(user, tag_lists):
+    """Return the tag ids of each tag list, creating named tags in bulk"""
+    names = {ref for tags in tag_lists for ref in tags if isinstance(ref, str)}
+    tags_by_name = {}
+    if names:
+        tags_by_name = Tag.objects.get_or_create_names(user, names)
+
+    return [
+        list(dict.fromkeys(
+            ref if isinstance(ref, int) else tags_by_name[ref].pk
+            for ref in tags
+        ))
+        for tags in tag_lists
+    ]
+
+
+class ImageVariantsField(serializers.Field):
+    """URLs of the resized copies of a movie image that are ready"""
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return {}
+
+        storage = Movie._meta.get_field('image').storage
+        request = self.context.get('request')
+        urls = {}
+        for variant, name in json.loads(value).items():
+            url = storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[variant] = url
+
+        return urls
+
+
+class MovieSerializer(TimedSerializerMixin, SparseFieldsMixin,
+                      serializers.ModelSerializer):
+    """Serialize a movie
+
+    Tags are given by id or by name; named tags the user does not have
+    yet are created along with the movie.
+    """
+
+    tags = TagListField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Movie
         fields = (
             'id', 'title', 'tags', 'time_minutes', 'ticket_price_USD',
-            'link',
+            'link', 'image_variants',
         )
         read_only_fields = ('id',)
 
+    def validate_tags(self, tags):
+        """Check that tag ids refer to tags of the user"""
+        errors = check_tag_ids(self.context['request'].user, [tags])[0]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        return tags
+
+    def create(self, validated_data):
+        """Create a movie, resolving its tags by id or name"""
+        tags = validated_data.pop('tags', None)
+        with transaction.atomic(savepoint=False):
+            movie = super().create(validated_data)
+            if tags:
+                Movie.objects.bulk_set_tags([movie], resolve_tags(
+                    validated_data['user'], [tags]
+                ))
+
+        return movie
+
+    def update(self, instance, validated_data):
+        """Update a movie, writing only the tag links that changed
+
+        Saving the movie afterwards drops the owner's cached lists and
+        logs the change.
+        """
+        tags = validated_data.pop('tags', None)
+        with transaction.atomic(savepoint=False):
+            if tags is not None:
+                Movie.objects.bulk_set_tags([instance], resolve_tags(
+                    self.context['request'].user, [tags]
+                ))
+            return super().update(instance, validated_data)
+
+
+class MovieBulkListSerializer(serializers.ListSerializer):
+    """Validate and write a list of movies with batched queries
+
+    Tag ids of every item are checked against the user's tags in a single
+    query and tag names are resolved for the whole list at once. When
+    updating, `instance` is the queryset of the user's movies and the items
+    to update are picked from it by id in a single query.
+    """
+    default_error_messages = {
+        'max_items': _('Ensure this list has no more than {max_items} items.'),
+        'does_not_exist': serializers.PrimaryKeyRelatedField
+        .default_error_messages['does_not_exist'],
+        'required': _('This field is required.'),
+        'duplicate': _('Movie {pk_value} is listed more than once.'),
+    }
+
+    def get_user(self):
+        """Return the owner of the movies, from the context or the request"""
+        if 'user' in self.context:
+            return self.context['user']
+        return self.context['request'].user
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            return super().to_internal_value(data)
+        if len(data) > settings.MOVIE_BULK_MAX_ITEMS:
+            message = self.error_messages['max_items'].format(
+                max_items=settings.MOVIE_BULK_MAX_ITEMS
+            )
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [message]
+            }, code='max_items')
+
+        items, errors = self.validate_items(data)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        return items
+
+    def validate_items(self, data):
+        """Return the validated data and the errors of every item
+
+        Items with errors have empty validated data; valid items have no
+        errors.
+        """
+        items = []
+        errors = []
+        for item in data:
+            try:
+                items.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                items.append({})
+                errors.append(exc.detail)
+
+        self._check_tags(items, errors)
+        if self.instance is not None:
+            self._check_movies(items, errors)
+
+        return items, errors
+
+    def _check_tags(self, items, errors):
+        tag_errors = check_tag_ids(
+            self.get_user(),
+            [attrs.get('tags', ()) for attrs in items]
+        )
+        for item_errors, missing in zip(errors, tag_errors):
+            if missing:
+                item_errors['tags'] = missing
+
+    def _check_movies(self, items, errors):
+        movie_ids = [attrs['id'] for attrs in items if 'id' in attrs]
+        self.instance_map = self.instance.in_bulk(movie_ids)
+        seen = set()
+        for attrs, item_errors in zip(items, errors):
+            if item_errors:
+                continue
+            if 'id' not in attrs:
+                item_errors['id'] = [self.error_messages['required']]
+            elif attrs['id'] not in self.instance_map:
+                item_errors['id'] = [
+                    self.error_messages['does_not_exist'].format(
+                        pk_value=attrs['id']
+                    )
+                ]
+            elif attrs['id'] in seen:
+                item_errors['id'] = [
+                    self.error_messages['duplicate'].format(
+                        pk_value=attrs['id']
+                    )
+                ]
+            seen.add(attrs.get('id'))
+
+    def create(self, validated_data):
+        return self._reload(self.create_movies(validated_data))
+
+    def create_movies(self, validated_data):
+        """Insert the movies and their tags without reading them back"""
+        tag_ids = resolve_tags(
+            self.get_user(),
+            [attrs.pop('tags', []) for attrs in validated_data]
+        )
+        for attrs in validated_data:
+            attrs.pop('id', None)
+        movies = [Movie(**attrs) for attrs in validated_data]
+
+        return Movie.objects.bulk_create_with_tags(
+            movies, tag_ids, batch_size=settings.MOVIE_BULK_BATCH_SIZE
+        )
+
+    def update(self, instance, validated_data):
+        movies = []
+        fields = set()
+        tagged_movies = []
+        tag_ids = []
+        for attrs in validated_data:
+            movie = self.instance_map[attrs.pop('id')]
+            if 'tags' in attrs:
+                tagged_movies.append(movie)
+                tag_ids.append(attrs.pop('tags'))
+            for attr, value in attrs.items():
+                setattr(movie, attr, value)
+            fields.update(attrs)
+            movies.append(movie)
+
+        with transaction.atomic():
+            tag_ids = resolve_tags(self.get_user(), tag_ids)
+            changed = set()
+            if fields:
+                Movie.objects.bulk_update(
+                    movies, fields, batch_size=settings.MOVIE_BULK_BATCH_SIZE
+                )
+                changed.update(movie.pk for movie in movies)
+            if tagged_movies:
+                changed.update(Movie.objects.bulk_set_tags(
+                    tagged_movies, tag_ids,
+                    batch_size=settings.MOVIE_BULK_BATCH_SIZE
+                ))
+            Change.objects.record(
+                Change.MOVIE,
+                [movie for movie in movies if movie.pk in changed]
+            )
+
+        return self._reload(movies)
+
+    def _reload(self, movies):
+        """Return the written movies, in order, with their tags loaded"""
+        written = Movie.objects.prefetch_related('tags') \
+            .in_bulk([movie.pk for movie in movies])
+        return [written[movie.pk] for movie in movies]
+
+
+class MovieBulkSerializer(MovieSerializer):
+    """Serialize a movie written through the bulk endpoint"""
+    id = serializers.IntegerField(required=False)
+    tags = TagListField(required=False)
+
+    class Meta(MovieSerializer.Meta):
+        list_serializer_class = MovieBulkListSerializer
+
+    def validate_tags(self, tags):
+        """Leave tag ids to be checked for the whole list at once"""
+        return tags
+
+
+class MovieImportSerializer(MovieBulkSerializer):
+    """Serialize a movie read from an import file
+
+    Export files list tags by name, so every tag is read as a name, even
+    one made only of digits.
+    """
+    tags = serializers.ListField(child=TagNameField(), required=False)
+
 
 class MovieDetailSerializer(MovieSerializer):
     tags = TagSerializer(many=True, read_only=True)
 
 
-class MovieImageSerializer(serializers.ModelSerializer):
+class MovieImageSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
     """ Serializer for uploading images to movie"""
     class Meta:
         model = Movie
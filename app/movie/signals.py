@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_delete
+from django.dispatch import receiver
+
+from core.models import Change, Movie, Tag
+from movie.cache import invalidate_user
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_owner_lists(sender, instance, **kwargs):
+    """Drop the cached lists of the owner of a changed movie or tag"""
+    invalidate_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Movie.tags.through)
+def invalidate_tagged_lists(sender, instance, action, **kwargs):
+    """Drop the cached lists when the tags of a movie change"""
+    if action.startswith('post_'):
+        invalidate_user(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def start_new_user_lists(sender, instance, created, **kwargs):
+    """Give new users a fresh version so reused ids never see old pages"""
+    if created:
+        invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def log_change(sender, instance, **kwargs):
+    """Log written and deleted movies and tags for incremental sync"""
+    kind = Change.MOVIE if sender is Movie else Change.TAG
+    Change.objects.record(
+        kind, [instance], deleted=kwargs['signal'] is post_delete
+    )
+
+
+@receiver(pre_delete, sender=Tag)
+def log_untagged_movies(sender, instance, **kwargs):
+    """Log the movies that lose a tag being deleted"""
+    Change.objects.record(
+        Change.MOVIE, instance.movie_set.only('id', 'user_id')
+    )
+
+
+@receiver(m2m_changed, sender=Movie.tags.through)
+def log_tagged_movies(sender, instance, action, reverse, pk_set, **kwargs):
+    """Log the movies whose tags were added, removed or cleared"""
+    if not reverse:
+        if action.startswith('post_'):
+            Change.objects.record(Change.MOVIE, [instance])
+    elif action == 'pre_clear':
+        Change.objects.record(
+            Change.MOVIE, instance.movie_set.only('id', 'user_id')
+        )
+    elif action in ('post_add', 'post_remove') and pk_set:
+        Change.objects.record(
+            Change.MOVIE, Movie.objects.filter(pk__in=pk_set)
+            .only('id', 'user_id')
+        )
@@ -0,0 +1,121 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import Change, Movie, Tag
+
+from movie.serializers import MovieSerializer, TagSerializer
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class ExpiredToken(ValueError):
+    pass
+
+
+def make_token(change_id):
+    """Return the sync token of the changes up to change_id
+
+    The token also records when it was issued, so tokens older than the
+    tombstones kept by compact_changes can be refused.
+    """
+    return f'{change_id}.{int(time.time())}'
+
+
+def read_token(token):
+    """Return the change id of a sync token, or 0 for no token"""
+    if not token:
+        return 0
+    try:
+        change_id, issued = (int(part) for part in token.split('.'))
+    except ValueError:
+        raise InvalidToken(token)
+    if change_id < 0:
+        raise InvalidToken(token)
+
+    if time.time() - issued > settings.SYNC_TOMBSTONE_DAYS * 86400:
+        raise ExpiredToken(token)
+
+    return change_id
+
+
+def changes_since(user, since, limit):
+    """Return the latest change of each object changed after `since`
+
+    Up to `limit` changes are read in id order. Returns the changes as a
+    {(kind, object_id): deleted} dict, the id the next sync can start
+    from and whether more changes follow.
+
+    Ids are handed out before transactions commit, so a change may still
+    appear below an id already seen. The returned id therefore stops
+    before changes younger than SYNC_SETTLE_SECONDS: they are sent now
+    and again by the next sync, by which time earlier ones have committed.
+    """
+    rows = list(
+        Change.objects
+        .filter(user=user, id__gt=since)
+        .order_by('id')
+        .values_list('id', 'kind', 'object_id', 'deleted', 'created')
+        [:limit + 1]
+    )
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    settled = timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    latest = {}
+    next_id = since
+    settling = False
+    for change_id, kind, object_id, deleted, created in rows:
+        latest[(kind, object_id)] = deleted
+        settling = settling or created > settled
+        if not settling:
+            next_id = change_id
+
+    return latest, next_id, more and next_id > since
+
+
+def sync_page(user, since, limit, context):
+    """Return the movies and tags changed after `since` and the next token
+
+    Written objects are serialized in full; deleted ones are listed by id
+    in `deleted`. An object deleted after its change was logged is listed
+    as deleted too, ahead of its tombstone.
+    """
+    latest, next_id, more = changes_since(user, since, limit)
+    written = {Change.MOVIE: set(), Change.TAG: set()}
+    deleted = {Change.MOVIE: set(), Change.TAG: set()}
+    for (kind, object_id), is_deleted in latest.items():
+        (deleted if is_deleted else written)[kind].add(object_id)
+
+    movies = list(
+        Movie.objects
+        .filter(user=user, id__in=written[Change.MOVIE])
+        .prefetch_related('tags')
+        .order_by('id')
+    ) if written[Change.MOVIE] else []
+    tags = list(
+        Tag.objects
+        .filter(user=user, id__in=written[Change.TAG])
+        .order_by('id')
+    ) if written[Change.TAG] else []
+    deleted[Change.MOVIE].update(
+        written[Change.MOVIE] - {movie.pk for movie in movies}
+    )
+    deleted[Change.TAG].update(
+        written[Change.TAG] - {tag.pk for tag in tags}
+    )
+
+    return {
+        'movies': MovieSerializer(movies, many=True, context=context).data,
+        'tags': TagSerializer(tags, many=True, context=context).data,
+        'deleted': {
+            'movies': sorted(deleted[Change.MOVIE]),
+            'tags': sorted(deleted[Change.TAG]),
+        },
+        'next': make_token(next_id),
+        'more': more,
+    }
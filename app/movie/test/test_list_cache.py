@@ -0,0 +1,193 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, \
+    override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Movie, Tag
+
+from movie.cache import cache_stats
+from movie.checks import check_list_cache
+
+
+MOVIES_URL = reverse('movie:movie-list')
+TAGS_URL = reverse('movie:tag-list')
+
+
+def detail_url(movie_id):
+    """Return movie detail URL"""
+    return reverse('movie:movie-detail', args=[movie_id])
+
+
+def sample_movie(user, **params):
+    """Create and return a sample movie"""
+    defaults = {
+        'title': 'Sample movie',
+        'time_minutes': 120,
+        'ticket_price_USD': 5.00,
+    }
+    defaults.update(params)
+
+    return Movie.objects.create(user=user, **defaults)
+
+
+@override_settings(MOVIE_LIST_CACHE_TTL=300)
+class MovieListCacheTests(TestCase):
+    """Test the per-user cache of movie and tag list pages"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_second_request_served_from_cache(self):
+        """Test that a repeated list request skips the database"""
+        sample_movie(user=self.user)
+        before = cache_stats()
+
+        res = self.client.get(MOVIES_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(MOVIES_URL)
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.data, res.data)
+        after = cache_stats()
+        self.assertEqual(after['hits'] - before['hits'], 1)
+        self.assertEqual(after['misses'] - before['misses'], 1)
+
+    def test_query_parameters_cached_separately(self):
+        """Test that each page has its own cache entry"""
+        sample_movie(user=self.user)
+        sample_movie(user=self.user)
+        self.client.get(MOVIES_URL)
+
+        res = self.client.get(MOVIES_URL, {'page_size': 1})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_limited_to_user(self):
+        """Test that users never see each other's cached pages"""
+        sample_movie(user=self.user)
+        self.client.get(MOVIES_URL)
+        user2 = get_user_model().objects.create_user(
+            'other@youremail.com',
+            'pass123'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(MOVIES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'], [])
+
+    def test_create_invalidates_cache(self):
+        """Test that creating a movie refreshes the list"""
+        self.client.get(MOVIES_URL)
+        payload = {
+            'title': 'Test movie',
+            'time_minutes': 30,
+            'ticket_price_USD': 10.00,
+        }
+        self.client.post(MOVIES_URL, payload)
+
+        res = self.client.get(MOVIES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_update_invalidates_cache(self):
+        """Test that updating a movie refreshes the list"""
+        movie = sample_movie(user=self.user)
+        self.client.get(MOVIES_URL)
+        self.client.patch(detail_url(movie.id), {'title': 'New title'})
+
+        res = self.client.get(MOVIES_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'New title')
+
+    def test_tag_change_invalidates_cache(self):
+        """Test that tagging a movie refreshes both lists"""
+        movie = sample_movie(user=self.user)
+        self.client.get(MOVIES_URL)
+        self.client.get(TAGS_URL)
+
+        res = self.client.post(TAGS_URL, {'name': 'Drama'})
+        movie.tags.add(res.data['id'])
+
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 1)
+        res = self.client.get(MOVIES_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results'][0]['tags']), 1)
+
+    def test_delete_invalidates_cache(self):
+        """Test that deleting a movie refreshes the list"""
+        movie = sample_movie(user=self.user)
+        self.client.get(MOVIES_URL)
+        self.client.delete(detail_url(movie.id))
+
+        res = self.client.get(MOVIES_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    @override_settings(MOVIE_LIST_CACHE_TTL=0)
+    def test_cache_disabled(self):
+        """Test that lists always hit the database without a cache"""
+        self.client.get(MOVIES_URL)
+
+        res = self.client.get(MOVIES_URL)
+
+        self.assertNotIn('X-Cache', res)
+        self.assertFalse(Tag.objects.exists())
+
+
+@override_settings(MOVIE_LIST_CACHE_TTL=300)
+class MovieListCacheCommitTests(TransactionTestCase):
+    """Test the list cache around the transactions of writes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_page_cached_before_commit_dropped(self):
+        """Test that a page cached while a write was uncommitted expires"""
+        with transaction.atomic():
+            sample_movie(user=self.user)
+            # Stands in for a list another request cached mid-transaction
+            res = self.client.get(MOVIES_URL)
+            self.assertEqual(res['X-Cache'], 'MISS')
+            self.assertEqual(self.client.get(MOVIES_URL)['X-Cache'], 'HIT')
+
+        res = self.client.get(MOVIES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+
+class ListCacheCheckTests(SimpleTestCase):
+
+    @override_settings(MOVIE_LIST_CACHE_TTL=300)
+    def test_local_cache_rejected(self):
+        """Test that caching lists in a per-process cache is an error"""
+        errors = check_list_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['movie.E001'])
+
+    def test_disabled_cache_accepted(self):
+        """Test that the check passes while the list cache is off"""
+        with self.settings(MOVIE_LIST_CACHE_TTL=0):
+            self.assertEqual(check_list_cache(None), [])
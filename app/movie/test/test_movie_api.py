@@ -1,10 +1,13 @@
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -12,6 +15,7 @@ from rest_framework.test import APIClient
 
 from core.models import Movie, Tag
 
+from movie.pagination import MoviePagination
 from movie.serializers import MovieSerializer, MovieDetailSerializer
 
 
@@ -79,7 +83,7 @@ class PrivateMovieApiTests(TestCase):
         movies = Movie.objects.all().order_by('-id')
         serializer = MovieSerializer(movies, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_movies_limited_to_user(self):
         """Test retrieving movies for user"""
@@ -95,8 +99,43 @@ class PrivateMovieApiTests(TestCase):
         movies = Movie.objects.filter(user=self.user)
         serializer = MovieSerializer(movies, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_movies_paginated_with_cursor(self):
+        """Test walking the movie list page by page with cursors"""
+        movies = [sample_movie(user=self.user) for _ in range(5)]
+        expected = [movie.id for movie in reversed(movies)]
+
+        res = self.client.get(MOVIES_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+
+        seen = [movie['id'] for movie in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            self.assertLessEqual(len(res.data['results']), 2)
+            seen.extend(movie['id'] for movie in res.data['results'])
+
+        self.assertEqual(seen, expected)
+        self.assertIsNotNone(res.data['previous'])
+
+    def test_movies_page_size_capped(self):
+        """Test that the requested page size is limited by the server"""
+        for _ in range(3):
+            sample_movie(user=self.user)
+
+        with patch.object(MoviePagination, 'max_page_size', 2):
+            res = self.client.get(MOVIES_URL, {'page_size': 50})
+
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_movies_invalid_cursor(self):
+        """Test that a tampered cursor is rejected"""
+        res = self.client.get(MOVIES_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_view_movie_detail(self):
         """Test viewing a movie detail"""
@@ -142,6 +181,78 @@ class PrivateMovieApiTests(TestCase):
         self.assertIn(tag1, tags)
         self.assertIn(tag2, tags)
 
+    def test_create_movie_with_tag_names(self):
+        """Test creating a movie with new and existing tags by name"""
+        existing = sample_tag(user=self.user, name='Drama')
+        payload = {
+            'title': 'Los viajes del viento',
+            'tags': ['Drama', 'Road movie', 'Music', 'Music'],
+            'time_minutes': 117,
+            'ticket_price_USD': '6.00',
+        }
+        res = self.client.post(MOVIES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        movie = Movie.objects.get(id=res.data['id'])
+        names = sorted(tag.name for tag in movie.tags.all())
+        self.assertEqual(names, ['Drama', 'Music', 'Road movie'])
+        self.assertIn(existing.id, res.data['tags'])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_create_movie_with_digit_like_tag_name(self):
+        """Test that non-ASCII digits are read as a tag name, not an id"""
+        payload = {
+            'title': 'La estrategia del caracol',
+            'tags': ['²', '٣'],
+            'time_minutes': 116,
+            'ticket_price_USD': '6.00',
+        }
+        res = self.client.post(MOVIES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        names = Tag.objects.filter(user=self.user).values_list(
+            'name', flat=True
+        )
+        self.assertEqual(sorted(names), ['²', '٣'])
+
+    def test_create_movie_tag_names_batched(self):
+        """Test that missing tags are created with one INSERT"""
+        payload = {
+            'title': 'Pájaros de verano',
+            'tags': [f'Tag {i}' for i in range(10)],
+            'time_minutes': 125,
+            'ticket_price_USD': '6.00',
+        }
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.post(MOVIES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        tag_inserts = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('INSERT')
+            and 'core_tag"' in query['sql']
+        ]
+        self.assertEqual(len(tag_inserts), 1)
+        self.assertEqual(len(res.data['tags']), 10)
+
+    def test_create_movie_with_other_user_tag(self):
+        """Test that tags of other users cannot be referenced by id"""
+        user2 = get_user_model().objects.create_user(
+            'other@youremail.com',
+            'pass123'
+        )
+        tag = sample_tag(user=user2)
+        payload = {
+            'title': 'Test movie',
+            'tags': [tag.id],
+            'time_minutes': 30,
+            'ticket_price_USD': 10.00
+        }
+        res = self.client.post(MOVIES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
     def test_partial_update_movie(self):
         """Test updating a movie with patch"""
         movie = sample_movie(user=self.user)
@@ -206,6 +317,25 @@ class MovieImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.movie.image.path))
 
+    def test_upload_same_image_shares_file(self):
+        """Test that identical images uploaded to two movies share a file"""
+        other = sample_movie(user=self.user, title='Titanic')
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            for movie in (self.movie, other):
+                ntf.seek(0)
+                self.client.post(
+                    image_upload_url(movie.id),
+                    {'image': ntf},
+                    format='multipart'
+                )
+
+        self.movie.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.movie.image.name, other.image.name)
+        other.image.delete()
+        self.assertTrue(os.path.exists(self.movie.image.path))
+
     def test_upload_image_bad_request(self):
         """ Test uploading an invalid image"""
         url = image_upload_url(self.movie.id)
@@ -0,0 +1,229 @@
+from django.contrib.auth import get_user_model
+from unittest.mock import patch
+
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Movie, Tag
+
+
+MOVIES_URL = reverse('movie:movie-list')
+BULK_URL = reverse('movie:movie-bulk')
+
+
+def sample_movie(user, **params):
+    """Create and return a sample movie"""
+    defaults = {
+        'title': 'Sample movie',
+        'time_minutes': 120,
+        'ticket_price_USD': 5.00,
+    }
+    defaults.update(params)
+
+    return Movie.objects.create(user=user, **defaults)
+
+
+def movie_payload(i, **params):
+    """Return the payload of the i-th movie of a bulk request"""
+    payload = {
+        'title': f'Movie {i}',
+        'time_minutes': 90 + i,
+        'ticket_price_USD': '7.50',
+    }
+    payload.update(params)
+    return payload
+
+
+class MovieBulkApiTests(TestCase):
+    """Test creating and updating movies in bulk"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag1 = Tag.objects.create(user=self.user, name='Drama')
+        self.tag2 = Tag.objects.create(user=self.user, name='Comedy')
+
+    def test_bulk_create_movies(self):
+        """Test creating a list of movies with tags"""
+        payload = [
+            movie_payload(0, tags=[self.tag1.id, self.tag2.id]),
+            movie_payload(1),
+            movie_payload(2, tags=[self.tag2.id]),
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        for item, data in zip(payload, res.data):
+            movie = Movie.objects.get(id=data['id'], user=self.user)
+            self.assertEqual(movie.title, item['title'])
+            self.assertEqual(
+                sorted(tag.id for tag in movie.tags.all()),
+                sorted(item.get('tags', []))
+            )
+            self.assertEqual(
+                sorted(data['tags']),
+                sorted(item.get('tags', []))
+            )
+
+    def test_bulk_create_batches_inserts(self):
+        """Test that tag links are written with a single INSERT"""
+        payload = [
+            movie_payload(i, tags=[self.tag1.id, self.tag2.id])
+            for i in range(50)
+        ]
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.post(BULK_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        inserts = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('INSERT')
+        ]
+        link_inserts = [sql for sql in inserts if 'core_movie_tags' in sql]
+        self.assertEqual(len(link_inserts), 1)
+        if connection.features.can_return_ids_from_bulk_insert:
+            self.assertEqual(len(inserts), 2)
+        self.assertEqual(Movie.tags.through.objects.count(), 100)
+
+    def test_bulk_create_respects_backend_batch_limit(self):
+        """Test writing more tag links than one INSERT can hold"""
+        payload = [
+            movie_payload(i, tags=[self.tag1.id, self.tag2.id])
+            for i in range(600)
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Movie.tags.through.objects.count(), 1200)
+
+    def test_bulk_create_with_tag_names(self):
+        """Test that tag names shared by several items are created once"""
+        payload = [
+            movie_payload(0, tags=['Drama', 'Western']),
+            movie_payload(1, tags=['Western', self.tag2.id]),
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        western = Tag.objects.get(user=self.user, name='Western')
+        self.assertEqual(
+            sorted(res.data[0]['tags']),
+            sorted([self.tag1.id, western.id])
+        )
+        self.assertEqual(
+            sorted(res.data[1]['tags']),
+            sorted([western.id, self.tag2.id])
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_create_invalid_items(self):
+        """Test that one invalid item rejects the whole list"""
+        other_user = get_user_model().objects.create_user(
+            'other@youremail.com',
+            'pass123'
+        )
+        other_tag = Tag.objects.create(user=other_user, name='Horror')
+        payload = [
+            movie_payload(0),
+            movie_payload(1, title=''),
+            movie_payload(2, tags=[other_tag.id]),
+        ]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertIn('tags', res.data[2])
+        self.assertFalse(Movie.objects.exists())
+
+    @override_settings(MOVIE_BULK_MAX_ITEMS=2)
+    def test_bulk_create_too_many_items(self):
+        """Test that lists over the size limit are rejected"""
+        payload = [movie_payload(i) for i in range(3)]
+        res = self.client.post(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Movie.objects.exists())
+
+    def test_bulk_partial_update(self):
+        """Test updating titles and tags of several movies with PATCH"""
+        movie1 = sample_movie(user=self.user)
+        movie1.tags.add(self.tag1)
+        movie2 = sample_movie(user=self.user)
+        payload = [
+            {'id': movie1.id, 'title': 'Updated 1', 'tags': [self.tag2.id]},
+            {'id': movie2.id, 'title': 'Updated 2'},
+        ]
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        movie1.refresh_from_db()
+        movie2.refresh_from_db()
+        self.assertEqual(movie1.title, 'Updated 1')
+        self.assertEqual(list(movie1.tags.all()), [self.tag2])
+        self.assertEqual(movie2.title, 'Updated 2')
+        self.assertEqual(res.data[0]['tags'], [self.tag2.id])
+
+    def test_bulk_update_requires_own_movies(self):
+        """Test that updates need the id of one of the user's movies"""
+        other_user = get_user_model().objects.create_user(
+            'other@youremail.com',
+            'pass123'
+        )
+        other_movie = sample_movie(user=other_user)
+        payload = [
+            {'id': other_movie.id, 'title': 'Stolen'},
+            {'title': 'No id'},
+        ]
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+        self.assertIn('id', res.data[1])
+        other_movie.refresh_from_db()
+        self.assertEqual(other_movie.title, 'Sample movie')
+
+    def test_bulk_update_rejects_repeated_ids(self):
+        """Test that a movie can be listed only once per update"""
+        movie = sample_movie(user=self.user)
+        payload = [
+            {'id': movie.id, 'title': 'First', 'tags': [self.tag1.id]},
+            {'id': movie.id, 'title': 'Second', 'tags': [self.tag1.id]},
+        ]
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        movie.refresh_from_db()
+        self.assertEqual(movie.title, 'Sample movie')
+
+    def test_bulk_update_failure_creates_no_tags(self):
+        """Test that tags named by a failed update are rolled back"""
+        movie = sample_movie(user=self.user)
+        payload = [{'id': movie.id, 'tags': ['Horror']}]
+        with patch.object(Movie.objects, 'bulk_set_tags',
+                          side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertFalse(Tag.objects.filter(name='Horror').exists())
+
+    def test_bulk_create_invalidates_list_cache(self):
+        """Test that bulk writes refresh the cached movie list"""
+        self.client.get(MOVIES_URL)
+        self.client.post(BULK_URL, [movie_payload(0)], format='json')
+
+        res = self.client.get(MOVIES_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
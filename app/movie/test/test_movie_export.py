@@ -0,0 +1,109 @@
+import csv
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Movie, Tag
+
+
+EXPORT_URL = reverse('movie:movie-export')
+
+
+def sample_movie(user, **params):
+    """Create and return a sample movie"""
+    defaults = {
+        'title': 'Sample movie',
+        'time_minutes': 120,
+        'ticket_price_USD': 5.00,
+    }
+    defaults.update(params)
+
+    return Movie.objects.create(user=user, **defaults)
+
+
+class MovieExportApiTests(TestCase):
+    """Test streaming the movies of a user"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.drama = Tag.objects.create(user=self.user, name='Drama')
+        self.tag2 = Tag.objects.create(user=self.user, name='Action, War')
+        self.movie1 = sample_movie(user=self.user, title='Titanic')
+        self.movie1.tags.add(self.drama, self.tag2)
+        self.movie2 = sample_movie(user=self.user, title='Up', link='x')
+
+    def export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return b''.join(res.streaming_content).decode()
+
+    def test_export_ndjson(self):
+        """Test exporting movies as one JSON object per line"""
+        other = get_user_model().objects.create_user('other@youremail.com')
+        sample_movie(user=other, title='Not mine')
+
+        lines = self.export().splitlines()
+
+        self.assertEqual([json.loads(line) for line in lines], [
+            {
+                'id': self.movie2.id,
+                'title': 'Up',
+                'tags': [],
+                'time_minutes': 120,
+                'ticket_price_USD': '5.00',
+                'link': 'x',
+            },
+            {
+                'id': self.movie1.id,
+                'title': 'Titanic',
+                'tags': ['Action, War', 'Drama'],
+                'time_minutes': 120,
+                'ticket_price_USD': '5.00',
+                'link': '',
+            },
+        ])
+
+    def test_export_csv(self):
+        """Test exporting movies as CSV with the tag names in one column"""
+        rows = list(csv.DictReader(StringIO(self.export(output='csv'))))
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1]['title'], 'Titanic')
+        self.assertEqual(rows[1]['tags'], '"Action, War",Drama')
+        self.assertEqual(rows[0]['tags'], '')
+
+    def test_export_filtered(self):
+        """Test that the export honours the movie list filters"""
+        lines = self.export(tags=str(self.drama.id)).splitlines()
+
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['id'], self.movie1.id)
+
+    def test_export_invalid_output(self):
+        """Test that an unknown export format is rejected"""
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(MOVIE_EXPORT_CHUNK_SIZE=2)
+    def test_export_loads_tags_per_chunk(self):
+        """Test that tags are loaded with one query per chunk of movies"""
+        for i in range(3):
+            sample_movie(user=self.user, title=f'Movie {i}')
+        res = self.client.get(EXPORT_URL)
+
+        with self.assertNumQueries(4):
+            lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 5)
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Movie, Tag
+
+
+MOVIES_URL = reverse('movie:movie-list')
+TAGS_URL = reverse('movie:tag-list')
+
+
+def detail_url(movie_id):
+    """Return movie detail URL"""
+    return reverse('movie:movie-detail', args=[movie_id])
+
+
+@override_settings(MOVIE_LIST_CACHE_TTL=0)
+class SparseFieldsApiTests(TestCase):
+    """Test trimming responses with ?fields="""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Drama')
+        self.movie = Movie.objects.create(
+            user=self.user,
+            title='Titanic',
+            time_minutes=194,
+            ticket_price_USD=5.00
+        )
+        self.movie.tags.add(self.tag)
+
+    def test_list_fields(self):
+        """Test that only the requested fields and columns are loaded"""
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(MOVIES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'],
+            [{'id': self.movie.id, 'title': 'Titanic'}]
+        )
+        self.assertEqual(len(context.captured_queries), 1)
+        sql = context.captured_queries[0]['sql']
+        self.assertIn('"title"', sql)
+        self.assertNotIn('"time_minutes"', sql)
+        self.assertNotIn('"image_variants"', sql)
+
+    def test_list_fields_with_tags(self):
+        """Test that tags are only prefetched when they are requested"""
+        with self.assertNumQueries(2):
+            res = self.client.get(MOVIES_URL, {'fields': 'tags'})
+
+        self.assertEqual(res.data['results'], [{'tags': [self.tag.id]}])
+
+    def test_retrieve_fields_keeps_nested_tags(self):
+        """Test that nested tags keep their fields when trimming"""
+        res = self.client.get(detail_url(self.movie.id), {'fields': 'tags'})
+
+        self.assertEqual(
+            res.data,
+            {'tags': [{'id': self.tag.id, 'name': 'Drama'}]}
+        )
+
+    def test_unknown_fields_rejected(self):
+        """Test that asking for an unknown field is a bad request"""
+        res = self.client.get(MOVIES_URL, {'fields': 'title,user'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', res.data)
+
+    def test_tag_fields_paginate(self):
+        """Test that tag pages still paginate on the trimmed columns"""
+        Tag.objects.create(user=self.user, name='Comedy')
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL, {'fields': 'id', 'page_size': 1})
+
+        self.assertEqual(res.data['results'], [{'id': self.tag.id}])
+        self.assertIsNotNone(res.data['next'])
+
+    def test_write_ignores_fields(self):
+        """Test that ?fields= does not trim create requests"""
+        payload = {
+            'title': 'Up',
+            'time_minutes': 96,
+            'ticket_price_USD': '4.00',
+        }
+        res = self.client.post(MOVIES_URL + '?fields=id', payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['title'], 'Up')
@@ -0,0 +1,169 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Movie, Tag
+from core.tests.utils import explain
+
+from movie.filters import MovieFilter
+
+
+MOVIES_URL = reverse('movie:movie-list')
+
+
+def sample_movie(user, **params):
+    """Create and return a sample movie"""
+    defaults = {
+        'title': 'Sample movie',
+        'time_minutes': 120,
+        'ticket_price_USD': 5.00,
+    }
+    defaults.update(params)
+
+    return Movie.objects.create(user=user, **defaults)
+
+
+class MovieFilterApiTests(TestCase):
+    """Test filtering the movie list"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.drama = Tag.objects.create(user=self.user, name='Drama')
+        self.comedy = Tag.objects.create(user=self.user, name='Comedy')
+        self.movie1 = sample_movie(
+            user=self.user, title='La vendedora de rosas',
+            time_minutes=115, ticket_price_USD=4.50
+        )
+        self.movie1.tags.add(self.drama)
+        self.movie2 = sample_movie(
+            user=self.user, title='El abrazo de la serpiente',
+            time_minutes=125, ticket_price_USD=9.00
+        )
+        self.movie2.tags.add(self.drama, self.comedy)
+        self.movie3 = sample_movie(
+            user=self.user, title='Rosas y espinas',
+            time_minutes=90, ticket_price_USD=12.00
+        )
+
+    def list_ids(self, **params):
+        res = self.client.get(MOVIES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {movie['id'] for movie in res.data['results']}
+
+    def test_filter_movies_by_any_tag(self):
+        """Test returning movies with any of the given tags"""
+        ids = self.list_ids(tags=f'{self.drama.id},{self.comedy.id}')
+
+        self.assertEqual(ids, {self.movie1.id, self.movie2.id})
+
+    def test_filter_movies_by_all_tags(self):
+        """Test returning movies with every one of the given tags"""
+        ids = self.list_ids(
+            tags=f'{self.drama.id},{self.comedy.id}',
+            tags_match='all'
+        )
+
+        self.assertEqual(ids, {self.movie2.id})
+
+    def test_filter_movies_by_title(self):
+        """Test filtering by title substring and prefix"""
+        self.assertEqual(
+            self.list_ids(title='ROSAS'),
+            {self.movie1.id, self.movie3.id}
+        )
+        self.assertEqual(self.list_ids(title_prefix='Rosas'), {self.movie3.id})
+
+    def test_filter_movies_by_ranges(self):
+        """Test filtering by running time and ticket price ranges"""
+        self.assertEqual(
+            self.list_ids(min_time=100, max_time=120),
+            {self.movie1.id}
+        )
+        self.assertEqual(
+            self.list_ids(min_price='4.50', max_price='9'),
+            {self.movie1.id, self.movie2.id}
+        )
+
+    def test_filter_invalid_parameters(self):
+        """Test that malformed filters are rejected"""
+        invalid = (
+            {'tags': '1,a'},
+            {'tags': '1', 'tags_match': 'some'},
+            {'min_time': 'long'},
+            {'max_price': 'NaN'},
+        )
+        for params in invalid:
+            with self.subTest(**params):
+                res = self.client.get(MOVIES_URL, params)
+                self.assertEqual(res.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_by_tags_single_query(self):
+        """Test that tag filters never run a query per tag"""
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(10)
+        ]
+        self.movie1.tags.add(*tags)
+        ids = ','.join(str(tag.id) for tag in tags)
+
+        for match in ('any', 'all'):
+            with self.subTest(match=match), self.assertNumQueries(2):
+                res = self.client.get(
+                    MOVIES_URL, {'tags': ids, 'tags_match': match}
+                )
+                self.assertEqual(len(res.data['results']), 1)
+
+
+class MovieFilterPlanTests(TestCase):
+    """Test that movie filters are answered from indexes"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+
+    def plan(self, **params):
+        """Return the query plan of the filtered movie list"""
+        request = type('Request', (), {'query_params': params})
+        queryset = Movie.objects.filter(user=self.user)
+        return explain(MovieFilter().filter_queryset(request, queryset, None))
+
+    def test_time_range_uses_index(self):
+        """Test that running time ranges scan the time index"""
+        plan = self.plan(min_time='90', max_time='120')
+
+        self.assertIn('core_movie_user_time_idx', plan)
+
+    def test_price_range_uses_index(self):
+        """Test that ticket price ranges scan the price index"""
+        plan = self.plan(min_price='5', max_price='10')
+
+        self.assertIn('core_movie_user_price_idx', plan)
+
+    @skipUnless(connection.vendor == 'postgresql',
+                'SQLite LIKE ignores case and cannot use the index')
+    def test_title_prefix_uses_index(self):
+        """Test that title prefixes scan the title index"""
+        plan = self.plan(title_prefix='Rosas')
+
+        self.assertIn('core_movie_user_title_idx', plan)
+
+    def test_tag_filters_use_link_index(self):
+        """Test that tag filters probe the movie/tag link indexes"""
+        for match in ('any', 'all'):
+            with self.subTest(match=match):
+                plan = self.plan(tags='1,2', tags_match=match)
+                self.assertIn('core_movie_tags_', plan)
@@ -0,0 +1,139 @@
+import json
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Movie
+
+from movie.images import generate_variants, schedule_variants
+
+
+MOVIES_URL = reverse('movie:movie-list')
+
+
+def image_upload_url(movie_id):
+    """Return URL for movie image upload"""
+    return reverse('movie:movie-upload-image', args=[movie_id])
+
+
+def sample_movie(user, **params):
+    """Create and return a sample movie"""
+    defaults = {
+        'title': 'Sample movie',
+        'time_minutes': 120,
+        'ticket_price_USD': 5.00,
+    }
+    defaults.update(params)
+
+    return Movie.objects.create(user=user, **defaults)
+
+
+@override_settings(MOVIE_IMAGE_VARIANTS={
+    'thumbnail': (40, 'JPEG'),
+    'medium': (80, 'PNG'),
+})
+class MovieImageVariantTests(TestCase):
+    """Test generating resized copies of uploaded movie images"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@youremail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.movie = sample_movie(user=self.user)
+
+    def tearDown(self):
+        self.movie.refresh_from_db()
+        if self.movie.image_variants:
+            storage = self.movie.image.storage
+            for name in json.loads(self.movie.image_variants).values():
+                storage.delete(name)
+        self.movie.image.delete()
+
+    def upload_image(self, size=(200, 100)):
+        url = image_upload_url(self.movie.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', size).save(ntf, format='JPEG')
+            ntf.seek(0)
+            return self.client.post(url, {'image': ntf}, format='multipart')
+
+    def test_upload_schedules_variants(self):
+        """Test that uploading an image leaves resizing to the workers"""
+        with patch('movie.views.schedule_variants') as schedule:
+            res = self.upload_image()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], self.movie.id)
+        schedule.assert_called_once()
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.image_variants, '')
+
+    def test_generate_variants(self):
+        """Test writing variants at their configured width and format"""
+        with patch('movie.views.schedule_variants'):
+            self.upload_image()
+        self.movie.refresh_from_db()
+
+        variants = generate_variants(
+            self.movie.id, self.user.id, self.movie.image.name
+        )
+
+        storage = self.movie.image.storage
+        with storage.open(variants['thumbnail']) as thumbnail:
+            image = Image.open(thumbnail)
+            self.assertEqual((image.format, image.size), ('JPEG', (40, 20)))
+        with storage.open(variants['medium']) as medium:
+            image = Image.open(medium)
+            self.assertEqual((image.format, image.size), ('PNG', (80, 40)))
+
+        res = self.client.get(MOVIES_URL)
+        urls = res.data['results'][0]['image_variants']
+        self.assertEqual(set(urls), {'thumbnail', 'medium'})
+        self.assertTrue(urls['thumbnail'].startswith('http://testserver/'))
+        self.assertTrue(urls['thumbnail'].endswith(variants['thumbnail']))
+
+    def test_stale_variants_not_recorded(self):
+        """Test that variants of a replaced image are not recorded"""
+        with patch('movie.views.schedule_variants'):
+            self.upload_image()
+        self.movie.refresh_from_db()
+        old_name = self.movie.image.name
+        with patch('movie.views.schedule_variants'):
+            self.upload_image(size=(300, 150))
+
+        variants = generate_variants(self.movie.id, self.user.id, old_name)
+
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.image_variants, '')
+        for name in variants.values():
+            self.movie.image.storage.delete(name)
+        self.movie.image.storage.delete(old_name)
+
+    @override_settings(MOVIE_IMAGE_WORKERS=0)
+    def test_schedule_runs_after_commit(self):
+        """Test that variants are generated once the upload commits"""
+        with patch('movie.views.schedule_variants'):
+            self.upload_image()
+        self.movie.refresh_from_db()
+
+        with patch('django.db.transaction.on_commit') as on_commit:
+            schedule_variants(self.movie)
+            self.movie.refresh_from_db()
+            self.assertEqual(self.movie.image_variants, '')
+            on_commit.call_args[0][0]()
+
+        self.movie.refresh_from_db()
+        self.assertEqual(
+            set(json.loads(self.movie.image_variants)),
+            {'thumbnail', 'medium'}
+        )
@@ -0,0 +1,219 @@
+import json
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Movie, Tag
+
+from movie.catalog import import_movies, read_csv, read_ndjson
+
+
+IMPORT_URL = reverse('movie:movie-import')
+EXPORT_URL = reverse('movie:movie-export')
+
+
+def ndjson(*movies):
+    """Return movies encoded as an NDJSON file"""
+    return ''.join(json.dumps(movie) + '\n' for movie in movies).encode()
+
+
+def movie_row(i, **params):
+    """Return the i-th movie of an import file"""
+    row = {
+        'title': f'Movie {i}',
+        'time_minutes': 90 + i,
+        'ticket_price_USD': '7.50',
+    }
+    row.update(params)
+    return row
+
+
+class MovieImportApiTests(TestCase):
+    """Test importing movies from uploaded files"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, content, **params):
+        url = IMPORT_URL
+        if params:
+            url += '?' + '&'.join(f'{k}={v}' for k, v in params.items())
+        return self.client.post(
+            url,
+            {'file': SimpleUploadedFile(name, content)},
+            format='multipart'
+        )
+
+    def test_import_ndjson(self):
+        """Test importing movies with tags by name from NDJSON"""
+        drama = Tag.objects.create(user=self.user, name='Drama')
+        content = ndjson(
+            movie_row(0, tags=['Drama', 'Comedy']),
+            movie_row(1, id=999),
+        )
+
+        res = self.upload('movies.ndjson', content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['failed'], 0)
+        movie = Movie.objects.get(user=self.user, title='Movie 0')
+        self.assertEqual(
+            sorted(tag.name for tag in movie.tags.all()),
+            ['Comedy', 'Drama']
+        )
+        self.assertIn(drama, movie.tags.all())
+        self.assertFalse(Movie.objects.filter(pk=999).exists())
+
+    def test_import_reports_invalid_rows(self):
+        """Test that invalid rows are skipped and reported by line"""
+        other = get_user_model().objects.create_user('other@youremail.com')
+        tag = Tag.objects.create(user=other, name='Not mine')
+        content = ndjson(movie_row(0)) + b'not json\n' + ndjson(
+            movie_row(2, time_minutes='long'),
+            movie_row(3, tags=[tag.id]),
+        ) + b'\xff\n'
+
+        res = self.upload('movies.ndjson', content)
+
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['failed'], 4)
+        errors = {
+            error['line']: error['errors'] for error in res.data['errors']
+        }
+        self.assertEqual(set(errors), {2, 3, 4, 5})
+        self.assertIn('time_minutes', errors[3])
+        self.assertIn('tags', errors[4])
+
+    def test_import_csv(self):
+        """Test importing movies from CSV with tag names in one column"""
+        content = (
+            'title,tags,time_minutes,ticket_price_USD,link\n'
+            'Titanic,"""Action, War"",Drama",194,5.00,\n'
+            'Up,,96,4.00,http://example.com\n'
+        ).encode()
+
+        res = self.upload('movies.csv', content)
+
+        self.assertEqual(res.data['created'], 2)
+        titanic = Movie.objects.get(user=self.user, title='Titanic')
+        self.assertEqual(
+            sorted(tag.name for tag in titanic.tags.all()),
+            ['Action, War', 'Drama']
+        )
+
+    def test_import_export_round_trip(self):
+        """Test that an exported CSV file imports the same movies"""
+        content = ndjson(movie_row(0, tags=['Drama']), movie_row(1))
+        self.upload('movies.ndjson', content)
+        res = self.client.get(EXPORT_URL, {'output': 'csv'})
+        exported = b''.join(res.streaming_content)
+
+        res = self.upload('movies.csv', exported)
+
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(Movie.objects.filter(title='Movie 0').count(), 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_import_export_round_trip_numeric_tag_names(self):
+        """Test that tags named with digits are imported as names, not ids"""
+        comedy = Tag.objects.create(user=self.user, name='Comedy')
+        names = sorted([str(comedy.id), '1984'])
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in names]
+
+        for output in ('ndjson', 'csv'):
+            Movie.objects.filter(user=self.user).delete()
+            Movie.objects.create(
+                user=self.user, title='Movie 0', time_minutes=90,
+                ticket_price_USD='7.50'
+            ).tags.set(tags)
+            res = self.client.get(EXPORT_URL, {'output': output})
+            exported = b''.join(res.streaming_content)
+            Movie.objects.filter(user=self.user).delete()
+
+            res = self.upload(f'movies.{output}', exported)
+
+            self.assertEqual(res.data['failed'], 0)
+            movie = Movie.objects.get(user=self.user)
+            self.assertEqual(
+                sorted(tag.name for tag in movie.tags.all()), names
+            )
+
+    def test_import_without_file(self):
+        """Test that an import without a file is rejected"""
+        res = self.client.post(IMPORT_URL, {}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(MOVIE_IMPORT_MAX_ERRORS=1)
+    def test_import_error_report_bounded(self):
+        """Test that the error report lists a bounded number of rows"""
+        res = self.upload('movies.ndjson', b'1\n2\n3\n')
+
+        self.assertEqual(res.data['failed'], 3)
+        self.assertEqual(len(res.data['errors']), 1)
+
+
+class ImportMoviesTests(TestCase):
+    """Test the movie import batches and command"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+
+    def test_import_in_batches(self):
+        """Test that rows are written one batch at a time"""
+        content = ndjson(*(movie_row(i, tags=['Drama']) for i in range(5)))
+        reports = []
+
+        report = import_movies(
+            self.user, read_ndjson(BytesIO(content)), 2,
+            progress=lambda report: reports.append(report['created'])
+        )
+
+        self.assertEqual(reports, [2, 4, 5])
+        self.assertEqual(report['created'], 5)
+        self.assertGreater(report['rows_per_second'], 0)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_read_csv_line_numbers(self):
+        """Test that CSV rows spanning lines report their first line"""
+        content = b'title,time_minutes\n"A\nB",1\nC,2\n'
+
+        rows = list(read_csv(BytesIO(content)))
+
+        self.assertEqual(
+            [(line, movie['title']) for line, movie, error in rows],
+            [(2, 'A\nB'), (4, 'C')]
+        )
+
+    def test_import_movies_command(self):
+        """Test importing a file from the command line"""
+        out = StringIO()
+        err = StringIO()
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as ntf:
+            ntf.write(ndjson(movie_row(0), movie_row(1, title='')))
+            ntf.flush()
+            call_command(
+                'import_movies', ntf.name, user=self.user.email,
+                stdout=out, stderr=err
+            )
+
+        self.assertIn('1 movies created, 1 rows failed', out.getvalue())
+        self.assertIn('line 2: {"title"', err.getvalue())
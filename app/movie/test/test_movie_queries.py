@@ -0,0 +1,233 @@
+import re
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Movie, Tag
+from core.tests.utils import QueryBudgetMixin, explain_sql
+
+
+MOVIES_URL = reverse('movie:movie-list')
+TAGS_URL = reverse('movie:tag-list')
+BULK_URL = reverse('movie:movie-bulk')
+
+# A sort step in a Postgres or SQLite query plan
+SORT = re.compile(r'\bSort\b|TEMP B-TREE FOR ORDER BY')
+
+
+def detail_url(movie_id):
+    """Return movie detail URL"""
+    return reverse('movie:movie-detail', args=[movie_id])
+
+
+@override_settings(MOVIE_LIST_CACHE_TTL=0)
+class MovieQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test that the movie API query count does not grow with the catalog"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_query_budget(self):
+        """Test listing movies loads all tags in a single query"""
+        def list_movies(movie):
+            res = self.client.get(MOVIES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                res.data['results'][0]['id'], movie.id
+            )
+            self.assertEqual(
+                len(res.data['results'][0]['tags']),
+                self.tags_per_movie
+            )
+
+        self.assertQueryBudgetAtScale(2, list_movies)
+
+    def test_retrieve_query_budget(self):
+        """Test retrieving a movie loads its nested tags in one query"""
+        def retrieve_movie(movie):
+            res = self.client.get(detail_url(movie.id))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data['tags']), self.tags_per_movie)
+
+        self.assertQueryBudgetAtScale(2, retrieve_movie)
+
+    def test_create_query_budget(self):
+        """Test creating a movie does not depend on the catalog size"""
+        tag = Tag.objects.create(user=self.user, name='Drama')
+        payload = {
+            'title': 'Amores Perros',
+            'tags': [tag.id],
+            'time_minutes': 154,
+            'ticket_price_USD': 7.00,
+        }
+
+        def create_movie(movie):
+            res = self.client.post(MOVIES_URL, payload)
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertQueryBudgetAtScale(6, create_movie)
+
+    def test_update_query_budget(self):
+        """Test updating a movie does not depend on the catalog size"""
+        tag = Tag.objects.create(user=self.user, name='Drama')
+        payload = {'title': 'Rodrigo D', 'tags': [tag.id]}
+
+        def update_movie(movie):
+            res = self.client.patch(detail_url(movie.id), payload)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertQueryBudgetAtScale(8, update_movie)
+
+
+@override_settings(MOVIE_LIST_CACHE_TTL=0)
+class ListPlanTests(TestCase):
+    """Test that list pages are read in order from an index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'seed_data', users=5, movies=2000, tags=200, tags_per_movie=1,
+            batch_size=500, stdout=StringIO()
+        )
+        cls.user = get_user_model().objects.order_by('id')[2]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def page_plans(self, url, table):
+        """Return the plans of the first two pages' queries on table"""
+        plans = []
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.get(url, {'page_size': 50})
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            url = res.data['next']
+            plans.extend(
+                explain_sql(query['sql'])
+                for query in context.captured_queries
+                if f'FROM "{table}"' in query['sql']
+            )
+
+        self.assertEqual(len(plans), 2)
+        return plans
+
+    def test_movie_list_plan(self):
+        """Test movie pages scan the (user, id) index without sorting"""
+        for plan in self.page_plans(MOVIES_URL, 'core_movie'):
+            self.assertIn('core_movie_user_id_idx', plan)
+            self.assertNotRegex(plan, SORT)
+
+    def test_tag_list_plan(self):
+        """Test tag pages scan the (user, name) index without sorting"""
+        for plan in self.page_plans(TAGS_URL, 'core_tag'):
+            # SQLite names the index of a unique constraint itself
+            self.assertRegex(
+                plan, r'core_tag_user_name_uniq|sqlite_autoindex_core_tag'
+            )
+            self.assertNotRegex(plan, SORT)
+
+
+class TagLinkWriteTests(TestCase):
+    """Test that movie updates write only the tag links that changed"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(6)
+        ]
+        self.movie = Movie.objects.create(
+            user=self.user, title='La estrategia del caracol',
+            time_minutes=115, ticket_price_USD='6.00'
+        )
+        self.movie.tags.set(self.tags[:4])
+
+    def link_writes(self, method, url, payload):
+        """Return the INSERT and DELETE statements run on the link table"""
+        with CaptureQueriesContext(connection) as context:
+            res = getattr(self.client, method)(url, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        writes = {'INSERT': 0, 'DELETE': 0}
+        for query in context.captured_queries:
+            statement = query['sql'].split(' ', 1)[0]
+            if statement in writes and '"core_movie_tags"' in query['sql']:
+                writes[statement] += 1
+        return writes
+
+    def tag_ids(self, movie):
+        return sorted(movie.tags.values_list('id', flat=True))
+
+    def test_unchanged_tags_not_written(self):
+        """Test that updates keeping the same tags write no links"""
+        ids = [tag.id for tag in reversed(self.tags[:4])]
+        for method in ('patch', 'put'):
+            with self.subTest(method=method):
+                writes = self.link_writes(method, detail_url(self.movie.id), {
+                    'title': 'Rodrigo D', 'tags': ids,
+                    'time_minutes': 93, 'ticket_price_USD': '6.00',
+                })
+                self.assertEqual(writes, {'INSERT': 0, 'DELETE': 0})
+
+        self.assertEqual(self.tag_ids(self.movie), sorted(ids))
+
+    def test_changed_tags_diffed(self):
+        """Test that a tag change runs one DELETE and one INSERT"""
+        ids = [tag.id for tag in self.tags[2:6]]
+
+        writes = self.link_writes(
+            'patch', detail_url(self.movie.id), {'tags': ids}
+        )
+
+        self.assertEqual(writes, {'INSERT': 1, 'DELETE': 1})
+        self.assertEqual(self.tag_ids(self.movie), ids)
+        self.assertEqual(
+            Movie.tags.through.objects.filter(
+                movie=self.movie, tag__in=self.tags[2:4]
+            ).count(), 2
+        )
+
+    def test_bulk_update_diffed(self):
+        """Test that bulk updates only write the links that changed"""
+        other = Movie.objects.create(
+            user=self.user, title='Perro come perro', time_minutes=106,
+            ticket_price_USD='6.00'
+        )
+        other.tags.set(self.tags[:2])
+        payload = [
+            {'id': self.movie.id, 'tags': [tag.id for tag in self.tags[:4]]},
+            {'id': other.id, 'tags': [tag.id for tag in self.tags[1:3]]},
+        ]
+
+        writes = self.link_writes('patch', BULK_URL, payload)
+
+        self.assertEqual(writes, {'INSERT': 1, 'DELETE': 1})
+        self.assertEqual(
+            self.tag_ids(other), [tag.id for tag in self.tags[1:3]]
+        )
+        self.assertEqual(
+            self.tag_ids(self.movie), [tag.id for tag in self.tags[:4]]
+        )
+
+        payload[1]['tags'].reverse()
+        writes = self.link_writes('patch', BULK_URL, payload)
+        self.assertEqual(writes, {'INSERT': 0, 'DELETE': 0})
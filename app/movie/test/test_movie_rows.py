@@ -0,0 +1,98 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Movie, Tag
+
+from movie.rows import MovieRowSerializer
+from movie.serializers import MovieSerializer
+
+
+MOVIES_URL = reverse('movie:movie-list')
+
+
+class MovieRowSerializerTests(TestCase):
+    """Test the row based movie list serializer"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        tag1 = Tag.objects.create(user=self.user, name='Drama')
+        tag2 = Tag.objects.create(user=self.user, name='Comedy')
+        movie = Movie.objects.create(
+            user=self.user,
+            title='Titanic',
+            time_minutes=194,
+            ticket_price_USD='5.5',
+            link='http://example.com',
+            image='uploads/movie/ab/cd/poster.jpg',
+            image_variants=json.dumps({
+                'thumbnail': 'uploads/movie/ab/cd/poster.jpg.thumbnail-160.jpg'
+            })
+        )
+        movie.tags.add(tag2, tag1)
+        Movie.objects.create(
+            user=self.user,
+            title='Up',
+            time_minutes=96,
+            ticket_price_USD=4
+        )
+        self.queryset = Movie.objects.filter(user=self.user).order_by('-id')
+        self.request = APIRequestFactory().get('/')
+
+    def assertSameOutput(self, context):
+        expected = MovieSerializer(
+            self.queryset.prefetch_related('tags'), many=True, context=context
+        ).data
+        serializer = MovieRowSerializer(context)
+        data = serializer.to_representation(serializer.rows(self.queryset))
+
+        self.assertEqual(
+            JSONRenderer().render(data), JSONRenderer().render(expected)
+        )
+
+    def test_same_output_as_model_serializer(self):
+        """Test that rows serialize to the same bytes as MovieSerializer"""
+        self.assertSameOutput({'request': self.request})
+
+    def test_same_output_with_fields(self):
+        """Test that trimmed rows match the trimmed MovieSerializer"""
+        self.assertSameOutput({'fields': {'title', 'ticket_price_USD'}})
+        self.assertSameOutput({'fields': {'tags'}})
+
+    @override_settings(MOVIE_LIST_CACHE_TTL=0)
+    def test_list_uses_rows(self):
+        """Test that the movie list is built from rows"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertNumQueries(2):
+            res = client.get(MOVIES_URL)
+
+        self.assertEqual(
+            res.data['results'],
+            MovieSerializer(
+                self.queryset, many=True,
+                context={'request': res.wsgi_request}
+            ).data
+        )
+
+    def test_benchmark_list_serialization(self):
+        """Test the list serialization benchmark reports both serializers"""
+        out = StringIO()
+        call_command(
+            'benchmark', 'list-serialization', iterations=10, stdout=out
+        )
+
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('MovieSerializer (10 rows) '))
+        self.assertTrue(lines[1].startswith('MovieRowSerializer (10 rows) '))
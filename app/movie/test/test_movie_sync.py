@@ -0,0 +1,268 @@
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Change, Movie, Tag
+
+
+SYNC_URL = reverse('movie:sync')
+
+
+def sample_movie(user, **params):
+    """Create and return a sample movie"""
+    defaults = {
+        'title': 'Sample movie',
+        'time_minutes': 120,
+        'ticket_price_USD': 5.00,
+    }
+    defaults.update(params)
+
+    return Movie.objects.create(user=user, **defaults)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class MovieSyncTests(TestCase):
+    """Test syncing the changes of movies and tags since a token"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=None, **params):
+        if since is not None:
+            params['since'] = since
+        res = self.client.get(SYNC_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_initial_sync(self):
+        """Test that a sync without a token sends every movie and tag"""
+        other = get_user_model().objects.create_user('other@email.com', 'pw')
+        sample_movie(other)
+        tag = Tag.objects.create(user=self.user, name='Drama')
+        movie = sample_movie(self.user, title='Rodrigo D')
+        movie.tags.add(tag)
+
+        data = self.sync()
+
+        self.assertEqual(len(data['movies']), 1)
+        self.assertEqual(data['movies'][0]['title'], 'Rodrigo D')
+        self.assertEqual(data['movies'][0]['tags'], [tag.id])
+        self.assertEqual(data['tags'], [{'id': tag.id, 'name': 'Drama'}])
+        self.assertEqual(data['deleted'], {'movies': [], 'tags': []})
+        self.assertFalse(data['more'])
+
+    def test_changes_since_token(self):
+        """Test that only objects changed after the token are sent"""
+        unchanged = sample_movie(self.user, title='Unchanged')
+        changed = sample_movie(self.user, title='Old title')
+        token = self.sync()['next']
+
+        changed.title = 'New title'
+        changed.save()
+        data = self.sync(token)
+
+        self.assertEqual(
+            [movie['title'] for movie in data['movies']], ['New title']
+        )
+        self.assertNotIn(unchanged.id, [m['id'] for m in data['movies']])
+        self.assertEqual(self.sync(data['next'])['movies'], [])
+
+    def test_deleted_objects_tombstoned(self):
+        """Test that deleted movies and tags are listed as deleted"""
+        tag = Tag.objects.create(user=self.user, name='Drama')
+        movie = sample_movie(self.user)
+        kept = sample_movie(self.user, title='Kept')
+        kept.tags.add(tag)
+        token = self.sync()['next']
+
+        movie_id, tag_id = movie.id, tag.id
+        movie.delete()
+        tag.delete()
+        data = self.sync(token)
+
+        self.assertEqual(
+            data['deleted'], {'movies': [movie_id], 'tags': [tag_id]}
+        )
+        self.assertEqual(len(data['movies']), 1)
+        self.assertEqual(data['movies'][0]['tags'], [])
+
+    def test_tag_changes_sync_movie(self):
+        """Test that changing the tags of a movie through the API syncs it"""
+        tag = Tag.objects.create(user=self.user, name='Drama')
+        movie = sample_movie(self.user)
+        token = self.sync()['next']
+
+        res = self.client.patch(
+            reverse('movie:movie-detail', args=[movie.id]),
+            {'tags': [tag.id]}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = self.sync(token)
+
+        self.assertEqual(data['movies'][0]['tags'], [tag.id])
+        self.assertEqual(data['tags'], [])
+
+    def test_bulk_writes_logged(self):
+        """Test that bulk created and updated movies are synced"""
+        res = self.client.post(reverse('movie:movie-bulk'), [
+            {'title': f'Movie {i}', 'time_minutes': 90,
+             'ticket_price_USD': '5.00', 'tags': ['Drama']}
+            for i in range(3)
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        data = self.sync()
+        self.assertEqual(len(data['movies']), 3)
+        self.assertEqual(len(data['tags']), 1)
+
+        first = res.data[0]['id']
+        res = self.client.patch(
+            reverse('movie:movie-bulk'),
+            [{'id': first, 'title': 'Renamed'}], format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        movies = self.sync(data['next'])['movies']
+        self.assertEqual([movie['title'] for movie in movies], ['Renamed'])
+
+    def test_paginated_sync(self):
+        """Test that following `next` while `more` is set sends everything"""
+        ids = {sample_movie(self.user, title=f'Movie {i}').id
+               for i in range(5)}
+
+        seen = set()
+        token = None
+        pages = 0
+        while True:
+            data = self.sync(token, limit=2)
+            pages += 1
+            seen.update(movie['id'] for movie in data['movies'])
+            token = data['next']
+            if not data['more']:
+                break
+
+        self.assertEqual(seen, ids)
+        self.assertEqual(pages, 3)
+
+    def test_limit_capped(self):
+        """Test that pages hold at most SYNC_PAGE_SIZE changes"""
+        for i in range(3):
+            sample_movie(self.user, title=f'Movie {i}')
+
+        with self.settings(SYNC_PAGE_SIZE=2):
+            data = self.sync(limit=100)
+
+        self.assertEqual(len(data['movies']), 2)
+        self.assertTrue(data['more'])
+
+    def test_invalid_limit_ignored(self):
+        """Test that limits that are not positive integers are ignored"""
+        sample_movie(self.user)
+
+        for limit in ('0', 'abc', '²'):
+            self.assertEqual(len(self.sync(limit=limit)['movies']), 1)
+
+    @override_settings(SYNC_SETTLE_SECONDS=60)
+    def test_token_waits_for_recent_changes(self):
+        """Test that the token does not pass changes that may still settle"""
+        old = sample_movie(self.user, title='Old')
+        Change.objects.filter(object_id=old.id).update(
+            created=timezone.now() - timedelta(minutes=5)
+        )
+        sample_movie(self.user, title='Recent')
+
+        data = self.sync()
+        self.assertEqual(len(data['movies']), 2)
+        self.assertFalse(data['more'])
+
+        movies = self.sync(data['next'])['movies']
+        self.assertEqual([movie['title'] for movie in movies], ['Recent'])
+
+    def test_invalid_token(self):
+        """Test that malformed tokens are rejected"""
+        res = self.client.get(SYNC_URL, {'since': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(SYNC_TOMBSTONE_DAYS=30)
+    def test_expired_token(self):
+        """Test that tokens older than the tombstones are refused"""
+        issued = int(time.time()) - 31 * 86400
+        res = self.client.get(SYNC_URL, {'since': f'1.{issued}'})
+
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+    def test_sync_requires_authentication(self):
+        """Test that syncing requires authentication"""
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0, SYNC_TOMBSTONE_DAYS=30)
+class CompactChangesTests(TestCase):
+    """Test trimming the change log"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@youremail.com',
+            'testpass'
+        )
+
+    def test_compact_changes(self):
+        """Test that only the latest live changes are kept"""
+        movie = sample_movie(self.user)
+        movie.title = 'Renamed'
+        movie.save()
+        recent = sample_movie(self.user)
+        recent_id = recent.id
+        recent.delete()
+        expired = sample_movie(self.user)
+        expired_id = expired.id
+        expired.delete()
+        Change.objects.filter(object_id=expired_id, deleted=True).update(
+            created=timezone.now() - timedelta(days=31)
+        )
+        other = get_user_model().objects.create_user('other@email.com', 'pw')
+        sample_movie(other)
+        other.delete()
+
+        call_command('compact_changes', stdout=StringIO())
+
+        self.assertEqual(
+            sorted(Change.objects.values_list('object_id', 'deleted')),
+            [(movie.id, False), (recent_id, True)]
+        )
+
+    def test_sync_after_compaction(self):
+        """Test that a sync from an older token still sees every change"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        movie = sample_movie(self.user)
+        deleted = sample_movie(self.user)
+        deleted_id = deleted.id
+        token = client.get(SYNC_URL).data['next']
+        movie.title = 'Renamed'
+        movie.save()
+        deleted.delete()
+
+        call_command('compact_changes', stdout=StringIO())
+        data = client.get(SYNC_URL, {'since': token}).data
+
+        self.assertEqual(
+            [movie['title'] for movie in data['movies']], ['Renamed']
+        )
+        self.assertEqual(data['deleted']['movies'], [deleted_id])
@@ -47,7 +47,7 @@ class PrivateTagsApiTests(TestCase):
         tag = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tag, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tag_limited_to_user(self):
         """Test that tags returned are for the authenticated user"""
@@ -60,8 +60,22 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+
+    def test_tags_paginated_with_cursor(self):
+        """Test walking the tag list page by page with cursors"""
+        names = ['Action', 'Comedy', 'Drama', 'Horror', 'Western']
+        for name in names:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        seen = [tag['name'] for tag in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(tag['name'] for tag in res.data['results'])
+
+        self.assertEqual(seen, sorted(names, reverse=True))
 
     def test_create_tag_successful(self):
         """Test creating a new tag"""
@@ -74,6 +88,14 @@ class PrivateTagsApiTests(TestCase):
         ).exists()
         self.assertTrue(exists)
 
+    def test_create_tag_duplicate_name(self):
+        """Test that a user cannot have two tags with the same name"""
+        Tag.objects.create(user=self.user, name='Drama')
+        res = self.client.post(TAGS_URL, {'name': 'Drama'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_create_tag_invalid(self):
         """Test creating a new tag with invalid payload"""
         payload = {'name': ''}
@@ -11,5 +11,6 @@ router.register('movies', views.MovieViewSet)
 app_name = 'movie'
 
 urlpatterns = [
+    path('sync/', views.SyncView.as_view(), name='sync'),
     path('', include(router.urls))
 ]
@@ -1,25 +1,44 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from core.authentication import CachedTokenAuthentication
 from core.models import Tag, Movie
 
 from movie import serializers
-
-
-class BaseMovieAttrViewSet(viewsets.GenericViewSet,
+from movie.cache import CachedListMixin, invalidate_user
+from movie.catalog import EXPORT_FORMATS, IMPORT_FORMATS, export_movies, \
+    import_movies
+from movie.fieldsets import SparseFieldsViewMixin
+from movie.filters import MovieFilter
+from movie.images import schedule_variants
+from movie.pagination import MoviePagination, TagPagination
+from movie.rows import RowListMixin
+from movie.sync import ExpiredToken, InvalidToken, read_token, sync_page
+
+
+class BaseMovieAttrViewSet(SparseFieldsViewMixin,
+                           CachedListMixin,
+                           viewsets.GenericViewSet,
                            mixins.ListModelMixin,
                            mixins.CreateModelMixin):
     """Base viewset for user own attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action in self.sparse_actions:
+            queryset = self.select_fields(queryset)
+
+        return queryset.order_by('-name')
 
     def perform_create(self, serializer):
         """Crete a new object"""
@@ -31,18 +50,28 @@ class TagViewSet(BaseMovieAttrViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    pagination_class = TagPagination
 
 
-class MovieViewSet(viewsets.ModelViewSet):
+class MovieViewSet(SparseFieldsViewMixin,
+                   CachedListMixin,
+                   RowListMixin,
+                   viewsets.ModelViewSet):
     """Manage movies in the database"""
     serializer_class = serializers.MovieSerializer
     queryset = Movie.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = MoviePagination
+    filter_backends = (MovieFilter,)
 
     def get_queryset(self):
         """Retrieve the movies for the authenticated user"""
-        return self.queryset.filter(user=self.request.user)
+        queryset = self.queryset.filter(user=self.request.user)
+        if self.action in self.sparse_actions:
+            queryset = self.select_fields(queryset)
+
+        return queryset.order_by('-id')
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -50,6 +79,8 @@ class MovieViewSet(viewsets.ModelViewSet):
             return serializers.MovieDetailSerializer
         elif self.action == 'upload_image':
             return serializers.MovieImageSerializer
+        elif self.action == 'bulk':
+            return serializers.MovieBulkSerializer
 
         return self.serializer_class
 
@@ -57,6 +88,86 @@ class MovieViewSet(viewsets.ModelViewSet):
         """Create a new movie"""
         serializer.save(user=self.request.user)
 
+    @action(methods=['POST', 'PUT', 'PATCH'], detail=False)
+    def bulk(self, request):
+        """Create (POST) or update (PUT/PATCH) a list of movies at once"""
+        if request.method == 'POST':
+            serializer = self.get_serializer(data=request.data, many=True)
+            success_status = status.HTTP_201_CREATED
+        else:
+            serializer = self.get_serializer(
+                self.get_queryset(),
+                data=request.data,
+                many=True,
+                partial=request.method == 'PATCH'
+            )
+            success_status = status.HTTP_200_OK
+
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors,
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.method == 'POST':
+            serializer.save(user=request.user)
+        else:
+            serializer.save()
+        invalidate_user(request.user.pk)
+
+        return Response(serializer.data, status=success_status)
+
+    @action(methods=['GET'], detail=False)
+    def export(self, request):
+        """Stream the (filtered) movies as NDJSON or CSV (?output=csv)"""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError(
+                {'output': [f'Expected one of: {", ".join(EXPORT_FORMATS)}.']}
+            )
+
+        encode, content_type = EXPORT_FORMATS[output]
+        queryset = self.filter_queryset(self.get_queryset())
+        # The body is read after the middleware has returned, so the
+        # queries are pinned to the database routed to now, and are not
+        # counted in the Server-Timing header or the request metrics
+        movies = export_movies(
+            queryset.using(queryset.db), settings.MOVIE_EXPORT_CHUNK_SIZE
+        )
+        response = StreamingHttpResponse(
+            encode(movies),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="movies.{output}"'
+
+        return response
+
+    @action(methods=['POST'], detail=False, url_path='import',
+            url_name='import')
+    def import_movies(self, request):
+        """Create movies from an uploaded NDJSON or CSV `file`"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': ['No file was submitted.']})
+
+        default = 'csv' if upload.name.lower().endswith('.csv') else 'ndjson'
+        input_format = request.query_params.get('input', default)
+        if input_format not in IMPORT_FORMATS:
+            raise ValidationError(
+                {'input': [f'Expected one of: {", ".join(IMPORT_FORMATS)}.']}
+            )
+
+        report = import_movies(
+            request.user,
+            IMPORT_FORMATS[input_format](upload),
+            settings.MOVIE_IMPORT_BATCH_SIZE
+        )
+        if report['created']:
+            invalidate_user(request.user.pk)
+
+        return Response(report, status=status.HTTP_200_OK)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """upload an image to a Movie"""
@@ -67,7 +178,8 @@ class MovieViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            movie = serializer.save(image_variants='')
+            schedule_variants(movie)
             return Response(
                serializer.data,
                status=status.HTTP_200_OK
@@ -77,3 +189,39 @@ class MovieViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+class SyncView(APIView):
+    """Movies and tags of the user changed since a sync token
+
+    Send the `next` token of the previous response as ?since= to receive
+    only what changed after it, and follow `next` while `more` is true.
+    Without a token every movie and tag is sent.
+    """
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        try:
+            since = read_token(request.query_params.get('since'))
+        except InvalidToken:
+            raise ValidationError({'since': ['Invalid sync token.']})
+        except ExpiredToken:
+            return Response(
+                {'detail': 'Sync token expired, sync again without one.'},
+                status=status.HTTP_410_GONE
+            )
+
+        limit = request.query_params.get('limit', '')
+        limit = min(
+            int(limit) if limit.isascii() and limit.isdigit() and int(limit)
+            else settings.SYNC_PAGE_SIZE,
+            settings.SYNC_PAGE_SIZE
+        )
+
+        return Response(sync_page(
+            request.user, since, limit, self.get_serializer_context()
+        ))
+
+    def get_serializer_context(self):
+        return {'request': self.request, 'view': self}